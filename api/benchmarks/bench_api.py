@@ -0,0 +1,457 @@
+"""
+予約APIのベンチマーク・負荷試験
+ローカル（インメモリ／ファイル）ストレージにN件の予約を投入し、function_app.py の
+ハンドラー経由で各操作のレイテンシ（p50/p95/p99）とスループットを計測
+
+実行方法（api/ ディレクトリで）:
+    python benchmarks/bench_api.py --sizes 1000,10000 --concurrency 16 \\
+        --output results.json
+    python benchmarks/bench_api.py --sizes 1000 --compare results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# function_app の読み込み前にローカルストレージを選択しておく
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import azure.functions as func  # noqa: E402
+
+import function_app  # noqa: E402
+import telemetry  # noqa: E402
+from reservation_manager import ReservationManager  # noqa: E402
+from storage_backends import (  # noqa: E402
+    FileSystemStorageBackend,
+    InMemoryStorageBackend,
+    StorageBackend,
+)
+from storage_manager import StorageManager  # noqa: E402
+
+# 計測中のログ出力を抑止（警告以下）
+logging.disable(logging.WARNING)
+
+OPERATIONS = ["create", "get_by_id", "search", "cancel", "availability"]
+
+
+def handler(name: str) -> Callable[[func.HttpRequest], Awaitable[func.HttpResponse]]:
+    """function_app に登録されたハンドラー関数を取得"""
+    return getattr(function_app, name)._function.get_user_function()
+
+
+def make_request(
+    method: str,
+    url: str,
+    body: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, str]] = None,
+    route_params: Optional[Dict[str, str]] = None,
+) -> func.HttpRequest:
+    return func.HttpRequest(
+        method=method,
+        url=url,
+        headers={"Content-Type": "application/json"},
+        params=params or {},
+        route_params=route_params or {},
+        body=json.dumps(body).encode("utf-8") if body is not None else b"",
+    )
+
+
+def session_dates(days: int = 90) -> List[Tuple[str, str]]:
+    """予約可能な (class_type, 日付) の一覧（明後日以降、キャンセル期限内に収める）"""
+    today = datetime.now(timezone.utc).date()
+    sessions = []
+    for offset in range(2, days + 1):
+        day = today + timedelta(days=offset)
+        for class_type, valid in ReservationManager.CLASS_WEEKDAYS.items():
+            if day.weekday() in valid:
+                sessions.append((class_type, day.isoformat()))
+    return sessions
+
+
+def reservation_body(
+    class_type: str, booking_date: str, customer: int
+) -> Dict[str, Any]:
+    class_info = ReservationManager.CLASS_SCHEDULES[class_type]
+    return {
+        "class_name": class_info["name"],
+        "class_schedule": class_info["schedule"],
+        "booking_date": booking_date,
+        "customer_name": f"顧客{customer}",
+        "customer_email": f"customer{customer}@example.com",
+        "customer_phone": "090-1234-5678",
+        "booking_notes": "",
+    }
+
+
+class LatencyBackend(StorageBackend):
+    """各ストレージ操作に固定の往復遅延を加えるラッパー（ネットワーク待ちの模擬）"""
+
+    def __init__(self, backend: StorageBackend, latency_ms: float):
+        self.backend = backend
+        self.latency = latency_ms / 1000
+        self.name = f"{backend.name}+{latency_ms:g}ms"
+
+    async def download(self, blob_name):
+        await asyncio.sleep(self.latency)
+        return await self.backend.download(blob_name)
+
+    async def upload(self, blob_name, data, metadata=None, etag=None, overwrite=True):
+        await asyncio.sleep(self.latency)
+        return await self.backend.upload(blob_name, data, metadata, etag, overwrite)
+
+    async def append(self, blob_name, data):
+        await asyncio.sleep(self.latency)
+        return await self.backend.append(blob_name, data)
+
+    async def exists(self, blob_name):
+        await asyncio.sleep(self.latency)
+        return await self.backend.exists(blob_name)
+
+    async def list_blobs(self, prefix=None):
+        await asyncio.sleep(self.latency)
+        async for blob in self.backend.list_blobs(prefix):
+            yield blob
+
+    async def delete(self, blob_name):
+        await asyncio.sleep(self.latency)
+        return await self.backend.delete(blob_name)
+
+    async def get_container_properties(self):
+        return await self.backend.get_container_properties()
+
+
+def create_backend(kind: str, latency_ms: float = 0) -> StorageBackend:
+    if kind == "filesystem":
+        backend = FileSystemStorageBackend(tempfile.mkdtemp(prefix="yoga-bench-"))
+    else:
+        backend = InMemoryStorageBackend()
+    return LatencyBackend(backend, latency_ms) if latency_ms else backend
+
+
+async def seed(
+    storage: StorageManager, size: int, customers: int, concurrency: int
+) -> List[Dict[str, Any]]:
+    """N件の予約と対応するカウンターを投入"""
+    sessions = session_dates()
+    semaphore = asyncio.Semaphore(concurrency)
+    counts: Dict[Tuple[str, str], int] = {}
+
+    async def save(index: int) -> Dict[str, Any]:
+        class_type, booking_date = sessions[index % len(sessions)]
+        customer = index % customers
+        counts[(class_type, booking_date)] = (
+            counts.get((class_type, booking_date), 0) + 1
+        )
+        async with semaphore:
+            reservation_id = await storage.save_reservation(
+                reservation_body(class_type, booking_date, customer)
+            )
+        return {
+            "id": reservation_id,
+            "email": f"customer{customer}@example.com",
+            "class_type": class_type,
+            "booking_date": booking_date,
+        }
+
+    seeded = await asyncio.gather(*(save(i) for i in range(size)))
+
+    for (class_type, booking_date), count in counts.items():
+        await storage.reserve_slots(class_type, booking_date, 10**9, count=count)
+
+    return list(seeded)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1)))
+    )
+    return sorted_values[index]
+
+
+async def measure(
+    operation: str,
+    requests: List[Callable[[], Awaitable[func.HttpResponse]]],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """リクエスト群を同時実行数を制限して実行し、レイテンシを集計"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def run(send: Callable[[], Awaitable[func.HttpResponse]]) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await send()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(send) for send in requests))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "operation": operation,
+        "count": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def storage_breakdown(request_count: int) -> Dict[str, Dict[str, float]]:
+    """計測中のストレージ操作を操作ごとに集計（1リクエストあたりの回数・時間・バイト数）"""
+    breakdown: Dict[str, Dict[str, float]] = {}
+    for h in telemetry.metrics.snapshot():
+        if h["kind"] != "storage":
+            continue
+        entry = breakdown.setdefault(
+            h["operation"], {"calls": 0, "sum_ms": 0.0, "bytes": 0}
+        )
+        entry["calls"] += h["count"]
+        entry["sum_ms"] += h["sum_ms"]
+        entry["bytes"] += h["bytes"]
+
+    per_request = max(1, request_count)
+    return {
+        operation: {
+            "calls_per_request": round(entry["calls"] / per_request, 2),
+            "ms_per_request": round(entry["sum_ms"] / per_request, 3),
+            "bytes_per_request": round(entry["bytes"] / per_request),
+        }
+        for operation, entry in breakdown.items()
+    }
+
+
+def build_requests(
+    operation: str,
+    seeded: List[Dict[str, Any]],
+    operations: int,
+    customers: int,
+    rng: random.Random,
+) -> List[Callable[[], Awaitable[func.HttpResponse]]]:
+    sessions = session_dates()
+    requests = []
+
+    if operation == "create":
+        create = handler("create_reservation")
+        for i in range(operations):
+            class_type, booking_date = rng.choice(sessions)
+            body = reservation_body(class_type, booking_date, customers + i)
+            request = make_request("POST", "/api/reservations", body=body)
+            requests.append(lambda request=request: create(request))
+
+    elif operation == "get_by_id":
+        get = handler("get_reservation")
+        for item in rng.sample(seeded, min(operations, len(seeded))):
+            request = make_request(
+                "GET",
+                f"/api/reservations/{item['id']}",
+                route_params={"reservation_id": item["id"]},
+            )
+            requests.append(lambda request=request: get(request))
+
+    elif operation == "search":
+        search = handler("search_reservations")
+        for item in rng.sample(seeded, min(operations, len(seeded))):
+            request = make_request(
+                "GET", "/api/reservations/search", params={"email": item["email"]}
+            )
+            requests.append(lambda request=request: search(request))
+
+    elif operation == "cancel":
+        cancel = handler("cancel_reservation")
+        for item in rng.sample(seeded, min(operations, len(seeded))):
+            request = make_request(
+                "POST",
+                f"/api/reservations/{item['id']}/cancel",
+                body={"email": item["email"]},
+                route_params={"reservation_id": item["id"]},
+            )
+            requests.append(lambda request=request: cancel(request))
+
+    elif operation == "availability":
+        availability = handler("check_availability")
+        for _ in range(operations):
+            class_type, booking_date = rng.choice(sessions)
+            request = make_request(
+                "GET",
+                f"/api/classes/{class_type}/availability",
+                params={"date": booking_date},
+                route_params={"class_type": class_type},
+            )
+            requests.append(lambda request=request: availability(request))
+
+    return requests
+
+
+class BenchReservationManager(ReservationManager):
+    """定員で作成が失敗しないよう、定員だけを引き上げた予約マネージャー"""
+
+    CLASS_SCHEDULES = {
+        class_type: {**class_info, "capacity": 10**9}
+        for class_type, class_info in ReservationManager.CLASS_SCHEDULES.items()
+    }
+
+
+async def run_size(args: argparse.Namespace, size: int) -> List[Dict[str, Any]]:
+    storage = StorageManager(
+        backend=create_backend(args.backend, args.latency_ms),
+        max_concurrency=args.concurrency,
+        write_behind=args.write_behind,
+    )
+    manager = BenchReservationManager(storage)
+
+    function_app.storage_manager = storage
+    function_app.reservation_manager = manager
+
+    customers = max(1, size // args.bookings_per_customer)
+    started = time.perf_counter()
+    seeded = await seed(storage, size, customers, args.concurrency)
+    seed_seconds = time.perf_counter() - started
+    print(f"[{size}] 投入完了: {seed_seconds:.1f}秒", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    results = []
+    for operation in args.operations:
+        requests = build_requests(operation, seeded, args.requests, customers, rng)
+        telemetry.metrics.reset()
+        result = await measure(operation, requests, args.concurrency)
+        result.update(
+            {
+                "size": size,
+                "seed_seconds": round(seed_seconds, 2),
+                "storage_ops": storage_breakdown(result["count"]),
+            }
+        )
+        results.append(result)
+        print(
+            f"[{size}] {operation:<13} p50={result['p50_ms']:.2f}ms "
+            f"p95={result['p95_ms']:.2f}ms p99={result['p99_ms']:.2f}ms "
+            f"{result['throughput_rps']:.0f} req/s errors={result['errors']}",
+            file=sys.stderr,
+        )
+
+    await storage.close()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """以前の結果と比較し、p95とスループットの変化率を表示"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["size"], r["operation"]): r for r in json.load(f)["results"]}
+
+    print(f"{'size':>8} {'operation':<13}{'p95 Δ%':>9}{'rps Δ%':>9}")
+    for r in results:
+        before = baseline.get((r["size"], r["operation"]))
+        if not before:
+            continue
+        p95 = 100 * (r["p95_ms"] / before["p95_ms"] - 1) if before["p95_ms"] else 0
+        rps = (
+            100 * (r["throughput_rps"] / before["throughput_rps"] - 1)
+            if before["throughput_rps"]
+            else 0
+        )
+        print(f"{r['size']:>8} {r['operation']:<13}{p95:>+9.1f}{rps:>+9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="予約APIのベンチマーク")
+    parser.add_argument(
+        "--sizes", default="1000,10000", help="投入する予約件数（カンマ区切り）"
+    )
+    parser.add_argument("--requests", type=int, default=200, help="操作ごとの件数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時実行数")
+    parser.add_argument(
+        "--operations", default=",".join(OPERATIONS), help="計測する操作"
+    )
+    parser.add_argument("--backend", choices=["memory", "filesystem"], default="memory")
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0,
+        help="ストレージ操作ごとに加える遅延（Blob Storageの往復時間の模擬）",
+    )
+    parser.add_argument("--bookings-per-customer", type=int, default=5)
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="読み取りキャッシュを有効にする（既定は無効でストレージ経路を計測）",
+    )
+    parser.add_argument(
+        "--write-behind",
+        action="store_true",
+        help="インデックス更新をまとめて後から書き込む（INDEX_WRITE_BEHIND=true）",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    parser.add_argument("--compare", help="比較対象の結果JSONファイル")
+    args = parser.parse_args()
+
+    args.operations = [op for op in args.operations.split(",") if op]
+    # 同じ顧客への連続リクエストが制限されないようにする
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    if not args.cache:
+        os.environ["RESERVATION_CACHE_TTL_SECONDS"] = "0"
+
+    results: List[Dict[str, Any]] = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        results.extend(asyncio.run(run_size(args, size)))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "backend": args.backend,
+            "latency_ms": args.latency_ms,
+            "concurrency": args.concurrency,
+            "requests_per_operation": args.requests,
+            "cache": args.cache,
+            "write_behind": args.write_behind,
+        },
+        "results": results,
+    }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+シリアライザーのベンチマーク
+従来のインデント付きJSONと比較し、1リクエストあたりのバイト数とCPU時間を計測
+
+実行方法（api/ ディレクトリで）:
+    python benchmarks/bench_serialization.py [--json results.json]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import timeit
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import serializer  # noqa: E402
+
+
+def sample_reservation(index: int) -> Dict[str, Any]:
+    """保存される予約データの例"""
+    return {
+        "id": f"202608-3f1c2b7e-9a4d-4c1e-8b7a-{index:012d}",
+        "class_name": "ハタヨガ",
+        "class_schedule": "月・水・金 10:00-11:00",
+        "booking_date": "2026-08-15",
+        "customer_name": "田中太郎",
+        "customer_email": "tanaka@example.com",
+        "customer_phone": "090-1234-5678",
+        "booking_notes": "初回参加です",
+        "created_at": "2026-08-01T10:00:00.000000+00:00",
+        "status": "confirmed",
+    }
+
+
+def sample_email_index(entries: int) -> Dict[str, Any]:
+    """メール別インデックスの例"""
+    return {
+        "reservations": [
+            {
+                "id": reservation["id"],
+                "blob_name": f"2026/08/{reservation['id']}.json",
+                "created_at": reservation["created_at"],
+                "status": reservation["status"],
+            }
+            for reservation in map(sample_reservation, range(entries))
+        ],
+        "last_updated": "2026-08-01T10:00:00.000000+00:00",
+    }
+
+
+def sample_search_response(count: int) -> Dict[str, Any]:
+    """メール検索APIレスポンスの例"""
+    class_info = {
+        "name": "ハタヨガ",
+        "schedule": "月・水・金 10:00-11:00",
+        "duration": 60,
+        "capacity": 12,
+        "level": "初心者〜中級者",
+    }
+    reservations = []
+    for index in range(count):
+        reservation = sample_reservation(index)
+        reservation.update({"class_type": "hatha", "class_info": class_info})
+        reservations.append(reservation)
+    return {"success": True, "reservations": reservations, "count": count}
+
+
+def legacy_dumps(data: Any) -> bytes:
+    """変更前の形式（indent=2）"""
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def measure(encode: Callable[[Any], bytes], data: Any, number: int) -> Dict[str, Any]:
+    """エンコード結果のバイト数と1回あたりのCPU時間（マイクロ秒）"""
+    encoded = encode(data)
+    seconds = min(timeit.repeat(lambda: encode(data), number=number, repeat=5))
+    return {"bytes": len(encoded), "encode_us": round(seconds / number * 1e6, 2)}
+
+
+def run(number: int) -> List[Dict[str, Any]]:
+    payloads = {
+        "reservation_blob": sample_reservation(0),
+        "email_index_50": sample_email_index(50),
+        "search_response_20": sample_search_response(20),
+    }
+
+    encoders: Dict[str, Callable[[Any], bytes]] = {
+        "legacy_indent2": legacy_dumps,
+        "compact_json": serializer.get_serializer("json").dumps,
+    }
+    if serializer.orjson is not None:
+        encoders["orjson"] = serializer.get_serializer("orjson").dumps
+    encoders["compact_gzip"] = lambda data: gzip.compress(
+        serializer.dumps(data), compresslevel=6
+    )
+
+    results = []
+    for payload_name, data in payloads.items():
+        baseline = None
+        for encoder_name, encode in encoders.items():
+            result = measure(encode, data, number)
+            baseline = baseline or result
+            result.update(
+                {
+                    "payload": payload_name,
+                    "encoder": encoder_name,
+                    "bytes_saved_pct": round(
+                        100 * (1 - result["bytes"] / baseline["bytes"]), 1
+                    ),
+                    "speedup": round(baseline["encode_us"] / result["encode_us"], 2),
+                }
+            )
+            results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="シリアライザーのベンチマーク")
+    parser.add_argument("--number", type=int, default=2000, help="計測の反復回数")
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    args = parser.parse_args()
+
+    results = run(args.number)
+
+    print(
+        f"{'payload':<20}{'encoder':<16}{'bytes':>8}{'saved%':>8}"
+        f"{'encode_us':>11}{'speedup':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['payload']:<20}{r['encoder']:<16}{r['bytes']:>8}"
+            f"{r['bytes_saved_pct']:>8}{r['encode_us']:>11}{r['speedup']:>9}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
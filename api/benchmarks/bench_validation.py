@@ -0,0 +1,262 @@
+"""
+予約バリデーションのマイクロベンチマーク
+変更前の実装（正規表現文字列・線形探索・曜日辞書の再構築）と比較し、
+1回あたりのCPU時間と一時的なメモリ確保量を計測
+
+正規表現のマッチはエンジンの作業領域（約1.2KB）を呼び出しごとに確保するため、
+メールアドレス・電話番号のマッチの確保量を下限として、予約1件のバリデーションが
+それ以上のメモリを確保しないこと・変更前と同じ結果になることを確認する
+（満たさない場合は終了コード1）。
+
+実行方法（api/ ディレクトリで）:
+    python benchmarks/bench_validation.py [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from reservation_manager import ReservationManager  # noqa: E402
+
+
+class LegacyValidator:
+    """変更前のバリデーション実装（比較用）"""
+
+    CLASS_SCHEDULES = ReservationManager.CLASS_SCHEDULES
+
+    def _get_class_type(self, class_name: Optional[str]) -> Optional[str]:
+        for key, info in self.CLASS_SCHEDULES.items():
+            if info["name"] == class_name:
+                return key
+        return None
+
+    def _validate_email(self, email: str) -> bool:
+        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
+        return re.match(pattern, email) is not None
+
+    def _validate_phone(self, phone: str) -> bool:
+        pattern = r"^(\d{2,4}-\d{2,4}-\d{4}|\d{10,11})$"
+        cleaned_phone = re.sub(r"[^\d-]", "", phone)
+        return re.match(pattern, cleaned_phone) is not None
+
+    def _validate_booking_date(
+        self, booking_date: str, class_type: str
+    ) -> Dict[str, Any]:
+        try:
+            date_obj = datetime.strptime(booking_date, "%Y-%m-%d").date()
+            today = datetime.now(timezone.utc).date()
+            if date_obj < today:
+                return {"valid": False, "error": "過去の日付は予約できません"}
+            max_date = today + timedelta(days=90)
+            if date_obj > max_date:
+                return {"valid": False, "error": "3ヶ月先までの予約が可能です"}
+            weekday = date_obj.weekday()
+            class_info = self.CLASS_SCHEDULES.get(class_type)
+            if not class_info:
+                return {"valid": False, "error": "無効なクラスタイプです"}
+            valid_weekdays = {
+                "hatha": [0, 2, 4],
+                "power": [1, 3, 5],
+                "restorative": [6],
+            }
+            if weekday not in valid_weekdays.get(class_type, []):
+                return {
+                    "valid": False,
+                    "error": f"{class_info['name']}は{class_info['schedule']}のスケジュールです",
+                }
+            return {"valid": True, "class_info": class_info, "weekday": weekday}
+        except ValueError:
+            return {"valid": False, "error": "日付形式が正しくありません（YYYY-MM-DD）"}
+
+    def _validate_reservation(self, reservation_data: Dict[str, Any]) -> Dict[str, Any]:
+        required_fields = [
+            "class_name",
+            "class_schedule",
+            "booking_date",
+            "customer_name",
+            "customer_email",
+            "customer_phone",
+        ]
+        for field in required_fields:
+            if not reservation_data.get(field):
+                return {
+                    "valid": False,
+                    "error": f"必須フィールドが不足しています: {field}",
+                }
+        if not self._validate_email(reservation_data["customer_email"]):
+            return {"valid": False, "error": "有効なメールアドレスを入力してください"}
+        if not self._validate_phone(reservation_data["customer_phone"]):
+            return {"valid": False, "error": "有効な電話番号を入力してください"}
+        class_type = self._get_class_type(reservation_data["class_name"])
+        if not class_type:
+            return {"valid": False, "error": "無効なクラス名です"}
+        date_validation = self._validate_booking_date(
+            reservation_data["booking_date"], class_type
+        )
+        if not date_validation["valid"]:
+            return date_validation
+        return {**date_validation, "class_type": class_type}
+
+
+def sample_reservation() -> Dict[str, Any]:
+    """検証が成功する予約データ（次のリストラティブヨガ＝線形探索の最悪ケース）"""
+    booking_date = date.today() + timedelta(days=7)
+    while booking_date.weekday() != 6:
+        booking_date += timedelta(days=1)
+    return {
+        "class_name": "リストラティブヨガ",
+        "class_schedule": "日 17:00-18:30",
+        "booking_date": booking_date.isoformat(),
+        "customer_name": "田中太郎",
+        "customer_email": "tanaka@example.com",
+        "customer_phone": "090-1234-5678",
+    }
+
+
+def peak_allocation(func: Callable[[], Any]) -> int:
+    """1回の呼び出しで一時的に確保されるメモリの最大量（バイト）"""
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - baseline
+
+
+def measure(func: Callable[[], Any], number: int) -> Dict[str, Any]:
+    """1回あたりのCPU時間（ナノ秒）と一時的なメモリ確保量（バイト）"""
+    func()  # 遅延初期化の影響を除く
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+
+    # 計測そのもの（空の関数呼び出し）による確保量を差し引く
+    overhead = min(peak_allocation(lambda: None) for _ in range(5))
+    peak = min(peak_allocation(func) for _ in range(5))
+
+    return {
+        "ns": round(seconds / number * 1e9, 1),
+        "peak_bytes": max(0, peak - overhead),
+    }
+
+
+def outcome(value: Any) -> Any:
+    """実装間で比較する結果（バリデーション結果は成否とクラス情報）"""
+    if isinstance(value, dict):
+        return value.get("valid"), value.get("class_info")
+    return value
+
+
+def run(number: int) -> List[Dict[str, Any]]:
+    data = sample_reservation()
+    implementations = {
+        "legacy": LegacyValidator(),
+        "current": ReservationManager(storage_manager=None),
+    }
+    cases: Dict[str, Callable[[Any], Callable[[], Any]]] = {
+        "get_class_type": lambda v: lambda: v._get_class_type(data["class_name"]),
+        "validate_email": lambda v: lambda: v._validate_email(data["customer_email"]),
+        "validate_phone": lambda v: lambda: v._validate_phone(data["customer_phone"]),
+        "validate_booking_date": lambda v: lambda: v._validate_booking_date(
+            data["booking_date"], "restorative"
+        ),
+        "validate_reservation": lambda v: lambda: v._validate_reservation(data),
+    }
+
+    results = []
+    for case_name, build in cases.items():
+        baseline = None
+        for impl_name, validator in implementations.items():
+            func = build(validator)
+            result = measure(func, number)
+            baseline = baseline or {**result, "outcome": outcome(func())}
+            result.update(
+                {
+                    "case": case_name,
+                    "implementation": impl_name,
+                    "speedup": round(baseline["ns"] / result["ns"], 2),
+                    "same_outcome": outcome(func()) == baseline["outcome"],
+                }
+            )
+            results.append(result)
+    return results
+
+
+def regex_floor(results: List[Dict[str, Any]]) -> int:
+    """現在の実装のメールアドレス・電話番号のマッチで確保されるメモリ（バイト）"""
+    return max(
+        r["peak_bytes"]
+        for r in results
+        if r["implementation"] == "current"
+        and r["case"] in ("validate_email", "validate_phone")
+    )
+
+
+def check(results: List[Dict[str, Any]]) -> List[str]:
+    """
+    結果の確認
+
+    現在の実装が変更前と同じ結果を返し、確保するメモリが変更前以下かつ
+    正規表現のマッチの確保量（regex_floor）以下であることを確認する。
+
+    Returns:
+        List[str]: 満たさなかった条件（すべて満たせば空）
+    """
+    legacy = {r["case"]: r for r in results if r["implementation"] == "legacy"}
+    floor = regex_floor(results)
+    failures = []
+    for r in results:
+        if r["implementation"] != "current":
+            continue
+        if not r["same_outcome"]:
+            failures.append(f"{r['case']}: 変更前と結果が異なります")
+        if r["peak_bytes"] > legacy[r["case"]]["peak_bytes"]:
+            failures.append(
+                f"{r['case']}: 確保量が変更前より増えています"
+                f"（{r['peak_bytes']} > {legacy[r['case']]['peak_bytes']}）"
+            )
+        if r["peak_bytes"] > floor:
+            failures.append(
+                f"{r['case']}: 正規表現の作業領域以外の確保があります"
+                f"（{r['peak_bytes']} > {floor}）"
+            )
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="予約バリデーションのベンチマーク")
+    parser.add_argument("--number", type=int, default=20000, help="計測の反復回数")
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    args = parser.parse_args()
+
+    results = run(args.number)
+
+    print(f"{'case':<24}{'impl':<10}{'ns':>10}{'peak_bytes':>12}{'speedup':>9}")
+    for r in results:
+        print(
+            f"{r['case']:<24}{r['implementation']:<10}{r['ns']:>10}"
+            f"{r['peak_bytes']:>12}{r['speedup']:>9}"
+        )
+
+    print(f"regex_floor_bytes: {regex_floor(results)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    failures = check(results)
+    for failure in failures:
+        print(f"NG: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
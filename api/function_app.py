@@ -4,11 +4,17 @@ HTTPトリガー関数でRESTful APIを提供
 """
 
 import azure.functions as func
+import functools
+import hashlib
 import logging
-import json
 import os
-from typing import Dict, Any
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
 
+import rate_limiter
+import serializer
+import telemetry
 from storage_manager import StorageManager
 from reservation_manager import ReservationManager
 
@@ -16,10 +22,43 @@ from reservation_manager import ReservationManager
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 読み取りエンドポイントのキャッシュ有効期間（秒）
+CLASS_SCHEDULES_MAX_AGE = 3600
+AVAILABILITY_MAX_AGE = 15
+
+# CORSで許可するリクエストヘッダー
+CORS_ALLOW_HEADERS = "Content-Type, Authorization, If-None-Match, Idempotency-Key"
+
+# Idempotency-Key ヘッダーの最大長
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# HTTPでエクスポートできる最大日数（本文をまとめて返すため、1か月分までに制限）
+MAX_HTTP_EXPORT_DAYS = int(os.getenv("MAX_HTTP_EXPORT_DAYS", "31"))
+
+# クライアントごとのレート制限（トークンバケット、毎秒の補充数と最大保持数）
+ip_limiter = rate_limiter.TokenBucketLimiter(
+    rate=float(os.getenv("RATE_LIMIT_IP_PER_SECOND", "5")),
+    burst=float(os.getenv("RATE_LIMIT_IP_BURST", "20")),
+)
+email_limiter = rate_limiter.TokenBucketLimiter(
+    rate=float(os.getenv("RATE_LIMIT_EMAIL_PER_SECOND", "1")),
+    burst=float(os.getenv("RATE_LIMIT_EMAIL_BURST", "5")),
+)
+# インスタンス全体で同時に処理するリクエスト数の上限（超えた分は503）
+concurrency_limiter = rate_limiter.ConcurrencyLimiter(
+    int(os.getenv("MAX_CONCURRENT_REQUESTS", "64"))
+)
+
+# インデックス再構築ジョブの実行間隔（NCRONTAB形式、既定は30分ごと）
+RECONCILE_SCHEDULE = os.getenv("RECONCILE_SCHEDULE", "0 */30 * * * *")
+
 # Azure Functions アプリの初期化
 app = func.FunctionApp()
 
 # グローバル変数（関数間で共有）
+# ストレージクライアントはワーカーのイベントループ上で作られるため、終了時に別の
+# ループから閉じることはしない（コネクションプールはホストのプロセス終了で解放され、
+# write-behind の未反映分は別インスタンスが予約Blobから再構築する）
 storage_manager = None
 reservation_manager = None
 
@@ -31,7 +70,7 @@ def get_managers():
     if storage_manager is None:
         # 環境変数からストレージアカウント名を取得
         storage_account_name = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
-        if not storage_account_name:
+        if not storage_account_name and os.getenv("STORAGE_BACKEND", "blob") == "blob":
             raise ValueError("AZURE_STORAGE_ACCOUNT_NAME環境変数が設定されていません")
 
         storage_manager = StorageManager(storage_account_name)
@@ -40,17 +79,172 @@ def get_managers():
     return storage_manager, reservation_manager
 
 
-def create_response(data: Dict[str, Any], status_code: int = 200) -> func.HttpResponse:
-    """HTTPレスポンスを作成"""
-    return func.HttpResponse(
-        json.dumps(data, ensure_ascii=False, indent=2),
-        status_code=status_code,
-        headers={
-            "Content-Type": "application/json; charset=utf-8",
-            "Access-Control-Allow-Origin": "*",  # CORS対応
-            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
-        },
+def instrumented(handler):
+    """
+    ハンドラーの所要時間を計測するデコレーター
+
+    関数名ごと・ステータスコードごとのヒストグラムに記録する。環境変数
+    SERVER_TIMING_ENABLED=true の場合は、ストレージ操作・シリアライズの内訳を
+    Server-Timing ヘッダーとしてレスポンスに付ける。
+    """
+
+    @functools.wraps(handler)
+    async def wrapper(req: func.HttpRequest) -> func.HttpResponse:
+        token = telemetry.start_request()
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await handler(req)
+            return response
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            breakdown = telemetry.end_request(token)
+            status_code = response.status_code if response is not None else 500
+            telemetry.metrics.record(
+                "http", handler.__name__, elapsed_ms, outcome=str(status_code)
+            )
+            if (
+                response is not None
+                and os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+            ):
+                response.headers["Server-Timing"] = telemetry.format_server_timing(
+                    breakdown, elapsed_ms
+                )
+
+    return wrapper
+
+
+def request_emails(req: func.HttpRequest) -> Tuple[int, Dict[str, int]]:
+    """
+    レート制限で消費するトークン数と、キーにするメールアドレスごとの件数
+
+    クエリまたはJSONボディのメールアドレスを使う。一括予約
+    （{"reservations": [...]}）は予約1件ごとに数え、各件の customer_email を集計する。
+    """
+    items: List[Any] = [{"email": req.params.get("email")}]
+    if not req.params.get("email") and req.method == "POST":
+        try:
+            body = req.get_json()
+        except ValueError:
+            body = None
+        items = [body]
+        if isinstance(body, dict) and isinstance(body.get("reservations"), list):
+            items = body["reservations"] or [None]
+
+    emails: Dict[str, int] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        email = item.get("customer_email") or item.get("email")
+        if isinstance(email, str) and email.strip():
+            email = email.strip().lower()
+            emails[email] = emails.get(email, 0) + 1
+    return len(items), emails
+
+
+def rate_limited(handler):
+    """
+    ストレージにアクセスする前にレート制限と同時実行数の上限を確認するデコレーター
+
+    クライアントIP・メールアドレスごとのトークンバケットが空なら429、
+    インスタンスの処理中リクエストが MAX_CONCURRENT_REQUESTS に達していれば503を
+    Retry-After 付きで返す。環境変数 RATE_LIMIT_ENABLED=false で無効化できる。
+
+    メールアドレスは誰でも指定できるため、メールアドレスのバケットは先にIPの
+    バケットを通過したリクエストだけが、IPアドレスとの組ごとに消費する
+    （他人のメールアドレスを連打しても、本人の検索・キャンセルは制限されない）。
+    一括予約は予約の件数分のトークンを、IPとメールアドレスごとに消費する。
+    """
+
+    @functools.wraps(handler)
+    async def wrapper(req: func.HttpRequest) -> func.HttpResponse:
+        if os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "false":
+            return await handler(req)
+
+        wait = 0.0
+        ip = rate_limiter.client_ip(req.headers)
+        count, emails = request_emails(req)
+        if ip:
+            wait = ip_limiter.acquire(ip, count)
+        for email, email_count in emails.items():
+            if wait:
+                break
+            wait = email_limiter.acquire(f"{ip}/{email}" if ip else email, email_count)
+        if wait:
+            return create_response(
+                {
+                    "success": False,
+                    "error": "リクエストが多すぎます。しばらくしてから再試行してください",
+                },
+                429,
+                headers={"Retry-After": rate_limiter.retry_after_seconds(wait)},
+            )
+
+        if not concurrency_limiter.try_acquire():
+            return create_response(
+                {
+                    "success": False,
+                    "error": "混雑しています。しばらくしてから再試行してください",
+                },
+                503,
+                headers={"Retry-After": "1"},
+            )
+        try:
+            return await handler(req)
+        finally:
+            concurrency_limiter.release()
+
+    return wrapper
+
+
+def create_response(
+    data: Dict[str, Any],
+    status_code: int = 200,
+    req: Optional[func.HttpRequest] = None,
+    max_age: Optional[int] = None,
+    headers: Optional[Dict[str, str]] = None,
+) -> func.HttpResponse:
+    """
+    HTTPレスポンスを作成
+
+    max_age を指定した成功レスポンスには強いETagと Cache-Control を付け、
+    リクエストの If-None-Match がETagと一致する場合は本文なしの304を返す。
+    headers には追加のレスポンスヘッダーを指定する。
+    """
+    with telemetry.timed("serialize"):
+        body = serializer.dumps(data)
+
+    headers = {
+        "Content-Type": "application/json; charset=utf-8",
+        "Access-Control-Allow-Origin": "*",  # CORS対応
+        "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+        "Access-Control-Allow-Headers": CORS_ALLOW_HEADERS,
+        **(headers or {}),
+    }
+
+    if max_age is not None and status_code == 200:
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        headers.update(
+            {
+                "ETag": etag,
+                "Cache-Control": f"public, max-age={max_age}",
+                "Access-Control-Expose-Headers": "ETag",
+            }
+        )
+        if req is not None and etag_matches(req.headers.get("If-None-Match"), etag):
+            del headers["Content-Type"]
+            return func.HttpResponse(status_code=304, headers=headers)
+
+    return func.HttpResponse(body, status_code=status_code, headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match ヘッダー（カンマ区切り・弱いETag・* に対応）とETagの比較"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        tag.removeprefix("W/") == etag for tag in candidates
     )
 
 
@@ -59,11 +253,20 @@ def create_error_response(message: str, status_code: int = 400) -> func.HttpResp
     return create_response({"success": False, "error": message}, status_code)
 
 
+def create_busy_response(result: Dict[str, Any]) -> func.HttpResponse:
+    """予約枠カウンターの更新競合が解消しなかった場合の503（Retry-After 付き）"""
+    return create_response(result, 503, headers={"Retry-After": "1"})
+
+
 @app.route(route="health", methods=["GET"])
+@instrumented
+@rate_limited
 async def health_check(req: func.HttpRequest) -> func.HttpResponse:
     """
     ヘルスチェックエンドポイント
     GET /api/health
+
+    匿名でストレージにアクセスするため、他のエンドポイントと同じくIPごとに制限する。
     """
     try:
         storage_manager, _ = get_managers()
@@ -74,7 +277,7 @@ async def health_check(req: func.HttpRequest) -> func.HttpResponse:
                 "success": True,
                 "status": "healthy",
                 "storage": health_status,
-                "timestamp": func.utcnow().isoformat(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
             }
         )
 
@@ -83,7 +286,31 @@ async def health_check(req: func.HttpRequest) -> func.HttpResponse:
         return create_error_response("サービスが利用できません", 503)
 
 
+@app.route(route="warmup", methods=["GET"])
+@instrumented
+@rate_limited
+async def warm_up(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    ウォームアップエンドポイント（コールドスタート対策）
+    GET /api/warmup
+
+    新しいインスタンスの認証情報・ストレージクライアントを事前に初期化する。
+    匿名でストレージにアクセスするため、IPごとのレート制限を通す。
+    """
+    try:
+        storage_manager, _ = get_managers()
+        timings = await storage_manager.warm_up()
+
+        return create_response({"success": True, "timings": timings})
+
+    except Exception as e:
+        logger.error(f"ウォームアップエラー: {e}")
+        return create_error_response("サービスが利用できません", 503)
+
+
 @app.route(route="reservations", methods=["POST"])
+@instrumented
+@rate_limited
 async def create_reservation(req: func.HttpRequest) -> func.HttpResponse:
     """
     新規予約作成エンドポイント
@@ -99,8 +326,21 @@ async def create_reservation(req: func.HttpRequest) -> func.HttpResponse:
         "customer_phone": "090-1234-5678",
         "booking_notes": "初回参加です"
     }
+
+    Idempotency-Key ヘッダーを付けた再送には、予約を作成できていれば最初の
+    リクエストと同じ結果を返す（Idempotent-Replayed: true）。同じキーを別の内容で使うと422、
+    最初のリクエストが処理中の場合は409、同じレッスン回への予約が集中して
+    予約枠を確保できなかった場合は503を Retry-After 付きで返す。
     """
     try:
+        idempotency_key = req.headers.get("Idempotency-Key")
+        if idempotency_key is not None and not (
+            0 < len(idempotency_key.strip()) <= MAX_IDEMPOTENCY_KEY_LENGTH
+        ):
+            return create_error_response(
+                f"Idempotency-Keyは1〜{MAX_IDEMPOTENCY_KEY_LENGTH}文字で指定してください"
+            )
+
         # リクエストボディの解析
         try:
             req_body = req.get_json()
@@ -112,20 +352,164 @@ async def create_reservation(req: func.HttpRequest) -> func.HttpResponse:
 
         # 予約作成
         _, reservation_manager = get_managers()
-        result = await reservation_manager.create_reservation(req_body)
+        result = await reservation_manager.create_reservation(
+            req_body, idempotency_key and idempotency_key.strip()
+        )
+
+        headers = None
+        if result.pop("replayed", False):
+            headers = {
+                "Idempotent-Replayed": "true",
+                "Access-Control-Expose-Headers": "Idempotent-Replayed",
+            }
 
         if result["success"]:
             logger.info(f"予約作成成功: {result.get('reservation_id')}")
+            return create_response(result, 201, headers=headers)
+        elif result.get("idempotency_error") == "mismatch":
+            return create_error_response(result["error"], 422)
+        elif result.get("idempotency_error") == "in_progress":
+            return create_response(result, 409, headers={"Retry-After": "1"})
+        elif result.get("retryable"):
+            return create_busy_response(result)
+        else:
+            return create_response(result, 400, headers=headers)
+
+    except Exception as e:
+        logger.error(f"予約作成エラー: {e}")
+        return create_error_response("内部サーバーエラー", 500)
+
+
+@app.route(route="reservations/batch", methods=["POST"])
+@instrumented
+@rate_limited
+async def create_reservations(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    一括予約作成エンドポイント（グループ予約・定期予約）
+    POST /api/reservations/batch
+
+    Body:
+    {
+        "reservations": [
+            {"class_name": "ハタヨガ", "booking_date": "2025-08-15", ...},
+            {"class_name": "ハタヨガ", "booking_date": "2025-08-18", ...}
+        ]
+    }
+
+    1件ごとの結果を results に返す（全件成功: 201、一部成功: 207、全件失敗: 400）。
+    予約枠の更新競合で確保できなかった場合は503を Retry-After 付きで返す。
+    """
+    try:
+        # リクエストボディの解析
+        try:
+            req_body = req.get_json()
+        except ValueError:
+            return create_error_response("無効なJSONフォーマットです")
+
+        if not isinstance(req_body, dict) or "reservations" not in req_body:
+            return create_error_response("reservations パラメータが必要です")
+
+        # 一括予約作成
+        _, reservation_manager = get_managers()
+        result = await reservation_manager.create_reservations(req_body["reservations"])
+
+        if result.get("retryable"):
+            return create_busy_response(result)
+        if "results" not in result:
+            return create_error_response(result.get("error", "予約作成に失敗しました"))
+
+        if not result["success"]:
+            return create_response(result, 400)
+
+        logger.info(f"一括予約作成成功: {result['created']}件")
+        return create_response(result, 207 if result["failed"] else 201)
+
+    except Exception as e:
+        logger.error(f"一括予約作成エラー: {e}")
+        return create_error_response("内部サーバーエラー", 500)
+
+
+@app.route(route="series", methods=["POST"])
+@instrumented
+@rate_limited
+async def create_series(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    定期予約作成エンドポイント
+    POST /api/series
+
+    Body:
+    {
+        "class_name": "ハタヨガ",
+        "class_schedule": "月・水・金 10:00-11:00",
+        "weekdays": [2],
+        "start_date": "2025-08-01",
+        "end_date": "2025-10-31",
+        "skip_full": false,
+        "customer_name": "田中太郎",
+        "customer_email": "tanaka@example.com",
+        "customer_phone": "090-1234-5678"
+    }
+    """
+    try:
+        # リクエストボディの解析
+        try:
+            req_body = req.get_json()
+        except ValueError:
+            return create_error_response("無効なJSONフォーマットです")
+
+        if not isinstance(req_body, dict) or not req_body:
+            return create_error_response("リクエストボディが必要です")
+
+        # 定期予約作成
+        _, reservation_manager = get_managers()
+        result = await reservation_manager.create_series(req_body)
+
+        if result["success"]:
+            logger.info(f"定期予約作成成功: {result.get('series_id')}")
             return create_response(result, 201)
+        elif "full_dates" in result:
+            return create_response(result, 409)
+        elif result.get("retryable"):
+            return create_busy_response(result)
         else:
             return create_error_response(result.get("error", "予約作成に失敗しました"))
 
     except Exception as e:
-        logger.error(f"予約作成エラー: {e}")
+        logger.error(f"定期予約作成エラー: {e}")
+        return create_error_response("内部サーバーエラー", 500)
+
+
+@app.route(route="series/{series_id}", methods=["GET"])
+@instrumented
+@rate_limited
+async def get_series(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    定期予約取得エンドポイント
+    GET /api/series/{series_id}
+    """
+    try:
+        series_id = req.route_params.get("series_id")
+        if not series_id:
+            return create_error_response("定期予約IDが必要です")
+
+        _, reservation_manager = get_managers()
+        result = await reservation_manager.get_series(series_id)
+
+        if result["success"]:
+            return create_response(result)
+        else:
+            return create_error_response(
+                result.get("error", "定期予約が見つかりません"), 404
+            )
+
+    except Exception as e:
+        logger.error(f"定期予約取得エラー: {e}")
         return create_error_response("内部サーバーエラー", 500)
 
 
 @app.route(route="reservations/{reservation_id}", methods=["GET"])
+@instrumented
+@rate_limited
 async def get_reservation(req: func.HttpRequest) -> func.HttpResponse:
     """
     予約ID検索エンドポイント
@@ -152,18 +536,30 @@ async def get_reservation(req: func.HttpRequest) -> func.HttpResponse:
 
 
 @app.route(route="reservations/search", methods=["GET"])
+@instrumented
+@rate_limited
 async def search_reservations(req: func.HttpRequest) -> func.HttpResponse:
     """
     メールアドレスで予約検索エンドポイント
-    GET /api/reservations/search?email=customer@example.com
+    GET /api/reservations/search?email=customer@example.com&limit=20&cursor=...
+
+    作成日時の新しい順に limit 件ずつ返す。続きがある場合は next_cursor を
+    cursor に指定して次のページを取得する。
     """
     try:
         email = req.params.get("email")
         if not email:
             return create_error_response("emailパラメータが必要です")
 
+        try:
+            limit = int(req.params["limit"]) if req.params.get("limit") else None
+        except ValueError:
+            return create_error_response("limitは整数で指定してください")
+
         _, reservation_manager = get_managers()
-        result = await reservation_manager.get_reservations_by_email(email)
+        result = await reservation_manager.get_reservations_by_email(
+            email, limit, req.params.get("cursor")
+        )
 
         if result["success"]:
             return create_response(result)
@@ -176,6 +572,8 @@ async def search_reservations(req: func.HttpRequest) -> func.HttpResponse:
 
 
 @app.route(route="reservations/{reservation_id}/cancel", methods=["POST"])
+@instrumented
+@rate_limited
 async def cancel_reservation(req: func.HttpRequest) -> func.HttpResponse:
     """
     予約キャンセルエンドポイント
@@ -185,6 +583,9 @@ async def cancel_reservation(req: func.HttpRequest) -> func.HttpResponse:
     {
         "email": "customer@example.com"
     }
+
+    定期予約IDを指定した場合は、キャンセル期限を過ぎていないレッスン回を
+    まとめてキャンセルする。
     """
     try:
         reservation_id = req.route_params.get("reservation_id")
@@ -207,6 +608,8 @@ async def cancel_reservation(req: func.HttpRequest) -> func.HttpResponse:
 
         if result["success"]:
             return create_response(result)
+        elif result.get("retryable"):
+            return create_busy_response(result)
         else:
             return create_error_response(
                 result.get("error", "キャンセルに失敗しました")
@@ -218,6 +621,7 @@ async def cancel_reservation(req: func.HttpRequest) -> func.HttpResponse:
 
 
 @app.route(route="classes", methods=["GET"])
+@instrumented
 async def get_class_schedules(req: func.HttpRequest) -> func.HttpResponse:
     """
     クラススケジュール取得エンドポイント
@@ -227,14 +631,44 @@ async def get_class_schedules(req: func.HttpRequest) -> func.HttpResponse:
         _, reservation_manager = get_managers()
         result = reservation_manager.get_class_schedules()
 
-        return create_response(result)
+        return create_response(result, req=req, max_age=CLASS_SCHEDULES_MAX_AGE)
 
     except Exception as e:
         logger.error(f"スケジュール取得エラー: {e}")
         return create_error_response("内部サーバーエラー", 500)
 
 
+@app.route(route="classes/calendar", methods=["GET"])
+@instrumented
+@rate_limited
+async def get_calendar(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    期間内の空き状況カレンダーエンドポイント
+    GET /api/classes/calendar?start=2025-08-01&end=2025-10-31&class_type=hatha
+    """
+    try:
+        _, reservation_manager = get_managers()
+        result = await reservation_manager.get_calendar(
+            req.params.get("start"),
+            req.params.get("end"),
+            req.params.get("class_type"),
+        )
+
+        if result["success"]:
+            return create_response(result, req=req, max_age=AVAILABILITY_MAX_AGE)
+        else:
+            return create_error_response(
+                result.get("error", "空き状況確認に失敗しました")
+            )
+
+    except Exception as e:
+        logger.error(f"カレンダー取得エラー: {e}")
+        return create_error_response("内部サーバーエラー", 500)
+
+
 @app.route(route="classes/{class_type}/availability", methods=["GET"])
+@instrumented
+@rate_limited
 async def check_availability(req: func.HttpRequest) -> func.HttpResponse:
     """
     クラス空き状況確認エンドポイント
@@ -251,7 +685,7 @@ async def check_availability(req: func.HttpRequest) -> func.HttpResponse:
         result = await reservation_manager.get_availability(class_type, date)
 
         if result["success"]:
-            return create_response(result)
+            return create_response(result, req=req, max_age=AVAILABILITY_MAX_AGE)
         else:
             return create_error_response(
                 result.get("error", "空き状況確認に失敗しました")
@@ -262,12 +696,149 @@ async def check_availability(req: func.HttpRequest) -> func.HttpResponse:
         return create_error_response("内部サーバーエラー", 500)
 
 
-@app.route(route="reservations", methods=["OPTIONS"])
-@app.route(route="reservations/{reservation_id}", methods=["OPTIONS"])
-@app.route(route="reservations/search", methods=["OPTIONS"])
-@app.route(route="reservations/{reservation_id}/cancel", methods=["OPTIONS"])
-@app.route(route="classes", methods=["OPTIONS"])
-@app.route(route="classes/{class_type}/availability", methods=["OPTIONS"])
+@app.route(route="manage/roster", methods=["GET"], auth_level=func.AuthLevel.ADMIN)
+@instrumented
+async def get_roster(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    受付名簿エンドポイント（管理者向け、マスターキーが必要）
+    GET /api/manage/roster?date=2026-11-03&class_type=power
+
+    （"admin" で始まるルートは Functions ホストが予約しているため "manage" を使う）
+    """
+    try:
+        date = req.params.get("date")
+        if not date:
+            return create_error_response("dateパラメータが必要です")
+
+        _, reservation_manager = get_managers()
+        result = await reservation_manager.get_roster(
+            date, req.params.get("class_type")
+        )
+
+        if result["success"]:
+            return create_response(result)
+        else:
+            return create_error_response(
+                result.get("error", "予約一覧の取得に失敗しました")
+            )
+
+    except Exception as e:
+        logger.error(f"名簿取得エラー: {e}")
+        return create_error_response("内部サーバーエラー", 500)
+
+
+@app.route(route="manage/export", methods=["GET"], auth_level=func.AuthLevel.ADMIN)
+@instrumented
+async def export_reservations(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    予約エクスポートエンドポイント（管理者向け、マスターキーが必要）
+    GET /api/manage/export?month=2026-10&format=csv
+    GET /api/manage/export?start=2026-10-01&end=2026-10-31&class_type=hatha&format=ndjson
+
+    本文をまとめて返すため、期間は MAX_HTTP_EXPORT_DAYS 日以内に制限する
+    （それより長い期間は分けて取得する）。
+    """
+    try:
+        _, reservation_manager = get_managers()
+        result = reservation_manager.export_reservations(
+            start_date=req.params.get("start"),
+            end_date=req.params.get("end"),
+            month=req.params.get("month"),
+            class_type=req.params.get("class_type"),
+            export_format=req.params.get("format", "csv"),
+            max_days=MAX_HTTP_EXPORT_DAYS,
+        )
+
+        if not result["success"]:
+            return create_error_response(
+                result.get("error", "エクスポートに失敗しました")
+            )
+
+        # HttpResponse は本文をまとめて返すため、ここで行を連結する
+        body = b"".join([chunk async for chunk in result["chunks"]])
+
+        return func.HttpResponse(
+            body,
+            status_code=200,
+            headers={
+                "Content-Type": result["content_type"],
+                "Content-Disposition": f'attachment; filename="{result["filename"]}"',
+                "Cache-Control": "no-store",
+            },
+        )
+
+    except Exception as e:
+        logger.error(f"エクスポートエラー: {e}")
+        return create_error_response("内部サーバーエラー", 500)
+
+
+@app.route(route="metrics", methods=["GET"])
+async def get_metrics(req: func.HttpRequest) -> func.HttpResponse:
+    """
+    計測値取得エンドポイント
+    GET /api/metrics
+
+    環境変数 METRICS_ENDPOINT_ENABLED=true の場合のみ有効。
+    ?reset=true で取得後に計測値をリセットする。
+    """
+    if os.getenv("METRICS_ENDPOINT_ENABLED", "false").lower() != "true":
+        return create_error_response("見つかりません", 404)
+
+    try:
+        storage_manager, _ = get_managers()
+        snapshot = telemetry.metrics.snapshot()
+        if req.params.get("reset", "").lower() == "true":
+            telemetry.metrics.reset()
+
+        return create_response(
+            {
+                "success": True,
+                "metrics": snapshot,
+                "concurrency": storage_manager.concurrency_stats,
+                "cache": storage_manager.cache_stats(),
+                "write_behind": storage_manager.write_behind_stats,
+                "rate_limit": {
+                    "ip": ip_limiter.stats,
+                    "email": email_limiter.stats,
+                    "concurrency": {
+                        **concurrency_limiter.stats,
+                        "in_flight": concurrency_limiter.in_flight,
+                    },
+                },
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"計測値取得エラー: {e}")
+        return create_error_response("内部サーバーエラー", 500)
+
+
+@app.timer_trigger(
+    schedule=RECONCILE_SCHEDULE,
+    arg_name="timer",
+    run_on_startup=False,
+    use_monitor=True,
+)
+async def reconcile_indexes(timer: func.TimerRequest) -> None:
+    """
+    インデックス再構築ジョブ（タイマートリガー）
+
+    前回の実行以降に更新された予約Blobからインデックス・予約枠カウンター・
+    カレンダーを突き合わせて修正する。CLIからは reconcile.py で実行できる。
+    """
+    if timer.past_due:
+        logger.warning("インデックス再構築ジョブの実行が遅延しています")
+
+    _, reservation_manager = get_managers()
+    with telemetry.timed("reconcile", kind="job"):
+        result = await reservation_manager.reconcile()
+
+    if result["success"]:
+        logger.info(f"インデックス再構築ジョブ完了: {result}")
+    else:
+        logger.error(f"インデックス再構築ジョブ失敗: {result.get('error')}")
+
+
 async def handle_options(req: func.HttpRequest) -> func.HttpResponse:
     """
     CORS プリフライトリクエスト対応
@@ -278,7 +849,28 @@ async def handle_options(req: func.HttpRequest) -> func.HttpResponse:
         headers={
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization",
+            "Access-Control-Allow-Headers": CORS_ALLOW_HEADERS,
             "Access-Control-Max-Age": "86400",
         },
     )
+
+
+# プリフライトに応答するルート（1つの関数に登録できるトリガーは1つのため、
+# ルートごとに関数名を分けて登録する）
+PREFLIGHT_ROUTES = {
+    "reservations_options": "reservations",
+    "batch_options": "reservations/batch",
+    "series_options": "series",
+    "series_item_options": "series/{series_id}",
+    "reservation_options": "reservations/{reservation_id}",
+    "search_options": "reservations/search",
+    "cancel_options": "reservations/{reservation_id}/cancel",
+    "classes_options": "classes",
+    "calendar_options": "classes/calendar",
+    "availability_options": "classes/{class_type}/availability",
+}
+
+for _function_name, _route in PREFLIGHT_ROUTES.items():
+    app.function_name(name=_function_name)(
+        app.route(route=_route, methods=["OPTIONS"])(handle_options)
+    )
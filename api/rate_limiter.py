@@ -0,0 +1,109 @@
+"""
+レート制限と負荷制御
+クライアント（IPアドレス・メールアドレス）ごとのトークンバケットと、
+インスタンス全体の同時実行数の上限でストレージへのアクセスを保護する
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucketLimiter:
+    """
+    キーごとのトークンバケット
+
+    バケットは最大 burst 個のトークンを持ち、毎秒 rate 個ずつ補充される
+    （rate が0以下なら補充せず、使い切ったキーには NO_REFILL_WAIT 秒後の再試行を促す）。
+    状態はインスタンス内のメモリに保持し、最近使われていないキーから
+    max_keys 件を超えた分を破棄する（破棄されたキーは満タンから再開）。
+    """
+
+    # 補充しない設定で使い切った場合に返す待ち時間（秒）
+    NO_REFILL_WAIT = 60.0
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.stats = {"allowed": 0, "limited": 0}
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """
+        トークンを消費
+
+        Args:
+            key: バケットのキー
+            cost: 消費するトークン数（burst を超える分は burst として扱う）
+
+        Returns:
+            float: 0なら許可、それ以外はトークンが貯まるまでの秒数
+        """
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        if self.rate > 0:
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+            self.stats["allowed"] += 1
+        else:
+            wait = (cost - tokens) / self.rate if self.rate > 0 else self.NO_REFILL_WAIT
+            self.stats["limited"] += 1
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """処理中のリクエスト数の上限（待たせずに即座に拒否する）"""
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.stats = {"admitted": 0, "shed": 0, "peak": 0}
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            self.stats["shed"] += 1
+            return False
+        self.in_flight += 1
+        self.stats["admitted"] += 1
+        self.stats["peak"] = max(self.stats["peak"], self.in_flight)
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+
+def retry_after_seconds(wait: float) -> str:
+    """Retry-After ヘッダーの値（切り上げた秒数、最低1秒）"""
+    return str(max(1, math.ceil(wait)))
+
+
+def client_ip(headers: Dict[str, str]) -> Optional[str]:
+    """
+    リクエストヘッダーからクライアントのIPアドレスを取得
+
+    Azure Functions のフロントエンドが X-Forwarded-For の末尾に追加する接続元
+    （"IP:ポート" の場合はポートを除く）を使う。それより前の値はクライアントが
+    自由に送れるため、レート制限のキーには使わない。
+    """
+    forwarded = headers.get("x-forwarded-for")
+    if not forwarded:
+        return None
+
+    address = forwarded.split(",")[-1].strip()
+    if address.startswith("["):
+        # [IPv6]:ポート
+        return address[1:].split("]")[0]
+    if address.count(":") == 1:
+        # IPv4:ポート
+        return address.split(":")[0]
+    return address or None
@@ -0,0 +1,49 @@
+"""
+インデックス再構築ジョブのCLI
+予約Blobから日付別・メール別インデックス、予約枠カウンター、カレンダーを再構築する
+（Functions ではタイマートリガー reconcile_indexes が同じ処理を定期実行する）
+
+実行方法（api/ ディレクトリで）:
+    python reconcile.py            # 前回の実行以降に更新された予約だけを処理
+    python reconcile.py --full     # 全件を再構築
+    python reconcile.py --full --start-month 2024-04
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from reservation_manager import ReservationManager
+from storage_manager import StorageManager
+
+
+async def run(full: bool, start_month: str = None) -> dict:
+    storage_manager = StorageManager(os.getenv("AZURE_STORAGE_ACCOUNT_NAME"))
+    try:
+        reservation_manager = ReservationManager(storage_manager)
+        return await reservation_manager.reconcile(full=full, start_month=start_month)
+    finally:
+        await storage_manager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="インデックス再構築ジョブ")
+    parser.add_argument(
+        "--full", action="store_true", help="前回の実行に関係なく全件を再構築する"
+    )
+    parser.add_argument(
+        "--start-month",
+        help="走査を開始する月（YYYY-MM、省略時は初回・全件なら24か月前から）",
+    )
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.full, args.start_month))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if not result["success"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,62 @@
 ビジネスロジックとバリデーションを担当
 """
 
+import asyncio
+import calendar
+import csv
+import hashlib
+import io
+import json
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Any
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 import re
 
-from storage_manager import StorageManager, ReservationModel
+import serializer
+from storage_manager import ConcurrentUpdateError, StorageManager, ReservationModel
 from pydantic import ValidationError
 
 # ログ設定
 logger = logging.getLogger(__name__)
 
+# バリデーション用の正規表現（読み込み時に1回だけコンパイル）
+_EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+_PHONE_PATTERN = re.compile(r"^(\d{2,4}-\d{2,4}-\d{4}|\d{10,11})$")
+_PHONE_NOISE_PATTERN = re.compile(r"[^\d-]")
+
+# 成功時のバリデーション結果（読み取り専用として共有）
+_VALID = {"valid": True}
+
+# 表計算ソフトで数式として解釈されるセルの先頭文字（CSVエクスポートで無効化する）
+_CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _parse_date(text: str) -> Optional[date]:
+    """
+    YYYY-MM-DD形式の日付を解析（不正な場合はNone）
+
+    予約日の文字列はそのままカウンター・日付別インデックス・カレンダーのキーに
+    なるため、ゼロ埋めしない日付（2026-11-3 など）は同じ日の別キーにならないよう
+    受け付けない。
+    """
+    if not isinstance(text, str) or len(text) != 10 or text[4] != "-" or text[7] != "-":
+        return None
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _escape_csv_formula(value: Any) -> Any:
+    """数式として解釈される文字で始まるセルの先頭に ' を付ける（CSVインジェクション対策）"""
+    if isinstance(value, str) and value.startswith(_CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class SaveOutcomeUnknownError(Exception):
+    """予約の保存がエラーになったが、ストレージに書き込まれた可能性がある"""
+
 
 class ReservationManager:
     """
@@ -51,6 +96,62 @@ class ReservationManager:
         },
     }
 
+    # クラス別の開催曜日（0=月曜日, 6=日曜日）
+    CLASS_WEEKDAYS = {
+        "hatha": (0, 2, 4),  # 月・水・金
+        "power": (1, 3, 5),  # 火・木・土
+        "restorative": (6,),  # 日
+    }
+
+    # 必須フィールド（定期予約は予約日の代わりに期間・曜日を指定する）
+    SERIES_REQUIRED_FIELDS = (
+        "class_name",
+        "class_schedule",
+        "customer_name",
+        "customer_email",
+        "customer_phone",
+    )
+    RESERVATION_REQUIRED_FIELDS = (
+        "class_name",
+        "class_schedule",
+        "booking_date",
+        "customer_name",
+        "customer_email",
+        "customer_phone",
+    )
+
+    # 予約を受け付ける期間（今日から何日先まで）
+    BOOKING_WINDOW_DAYS = 90
+
+    # 一括予約で受け付ける最大件数
+    MAX_BATCH_SIZE = 50
+
+    # 予約一覧のエクスポートで指定できる最大日数
+    MAX_EXPORT_DAYS = 366
+
+    # エクスポートするCSVの列
+    EXPORT_COLUMNS = (
+        "id",
+        "series_id",
+        "booking_date",
+        "class_type",
+        "class_name",
+        "customer_name",
+        "customer_email",
+        "customer_phone",
+        "booking_notes",
+        "status",
+        "created_at",
+    )
+
+    # メール検索の1ページの件数
+    DEFAULT_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    # 冪等キーの記録を有効とする時間と、処理中の記録を放棄されたとみなすまでの秒数
+    IDEMPOTENCY_TTL_HOURS = 24
+    IDEMPOTENCY_PENDING_SECONDS = 60
+
     def __init__(self, storage_manager: StorageManager):
         """
         予約マネージャーの初期化
@@ -60,17 +161,42 @@ class ReservationManager:
         """
         self.storage = storage_manager
 
+        # スケジュール登録情報（表示名からの逆引きと、クラスごとの成功時の
+        # バリデーション結果・曜日エラーメッセージを事前に作成しておく）
+        self._class_types_by_name: Dict[str, str] = {}
+        self._valid_bookings: Dict[str, Dict[str, Any]] = {}
+        self._weekday_errors: Dict[str, Dict[str, Any]] = {}
+        for key, info in self.CLASS_SCHEDULES.items():
+            self._class_types_by_name[info["name"]] = key
+            self._valid_bookings[key] = {
+                "valid": True,
+                "class_type": key,
+                "class_info": info,
+            }
+            self._weekday_errors[key] = {
+                "valid": False,
+                "error": f"{info['name']}は{info['schedule']}のスケジュールです",
+            }
+
+    def _get_class_type(self, class_name: Optional[str]) -> Optional[str]:
+        """表示名からクラスタイプを取得"""
+        return self._class_types_by_name.get(class_name)
+
     def _validate_email(self, email: str) -> bool:
         """メールアドレスのバリデーション"""
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(pattern, email) is not None
+        return isinstance(email, str) and _EMAIL_PATTERN.match(email) is not None
 
     def _validate_phone(self, phone: str) -> bool:
         """電話番号のバリデーション（日本の形式）"""
-        # ハイフンあり・なし両方対応
-        pattern = r"^(\d{2,4}-\d{2,4}-\d{4}|\d{10,11})$"
-        cleaned_phone = re.sub(r"[^\d-]", "", phone)
-        return re.match(pattern, cleaned_phone) is not None
+        # ハイフンあり・なし両方対応（数字・ハイフン以外の文字は取り除いて判定）
+        if not isinstance(phone, str):
+            return False
+        if _PHONE_PATTERN.match(phone):
+            return True
+        cleaned_phone = _PHONE_NOISE_PATTERN.sub("", phone)
+        return (
+            cleaned_phone != phone and _PHONE_PATTERN.match(cleaned_phone) is not None
+        )
 
     def _validate_booking_date(
         self, booking_date: str, class_type: str
@@ -83,130 +209,628 @@ class ReservationManager:
             class_type: クラスタイプ
 
         Returns:
-            Dict: バリデーション結果
+            Dict: バリデーション結果（成功時はクラスタイプとクラス情報を含む）
         """
-        try:
-            date_obj = datetime.strptime(booking_date, "%Y-%m-%d").date()
-            today = datetime.now(timezone.utc).date()
-
-            # 過去の日付チェック
-            if date_obj < today:
-                return {"valid": False, "error": "過去の日付は予約できません"}
-
-            # 3ヶ月先までの制限
-            max_date = today + timedelta(days=90)
-            if date_obj > max_date:
-                return {"valid": False, "error": "3ヶ月先までの予約が可能です"}
-
-            # 曜日チェック
-            weekday = date_obj.weekday()  # 0=月曜日, 6=日曜日
-
-            class_info = self.CLASS_SCHEDULES.get(class_type)
-            if not class_info:
-                return {"valid": False, "error": "無効なクラスタイプです"}
-
-            # クラス別曜日チェック
-            valid_weekdays = {
-                "hatha": [0, 2, 4],  # 月・水・金
-                "power": [1, 3, 5],  # 火・木・土
-                "restorative": [6],  # 日
-            }
+        date_obj = _parse_date(booking_date)
+        if date_obj is None:
+            return {"valid": False, "error": "日付形式が正しくありません（YYYY-MM-DD）"}
+
+        today = datetime.now(timezone.utc).date()
+
+        # 過去の日付チェック
+        if date_obj < today:
+            return {"valid": False, "error": "過去の日付は予約できません"}
+
+        # 3ヶ月先までの制限
+        if (date_obj - today).days > self.BOOKING_WINDOW_DAYS:
+            return {"valid": False, "error": "3ヶ月先までの予約が可能です"}
+
+        valid_booking = self._valid_bookings.get(class_type)
+        if valid_booking is None:
+            return {"valid": False, "error": "無効なクラスタイプです"}
+
+        # クラス別曜日チェック（0=月曜日, 6=日曜日）
+        if date_obj.weekday() not in self.CLASS_WEEKDAYS.get(class_type, ()):
+            return self._weekday_errors[class_type]
+
+        return valid_booking
+
+    def _validate_customer(
+        self, data: Dict[str, Any], required_fields: Tuple[str, ...]
+    ) -> Dict[str, Any]:
+        """
+        クラス名・予約者情報の必須チェックとバリデーション
 
-            if weekday not in valid_weekdays.get(class_type, []):
+        Args:
+            data: 予約データ
+            required_fields: 必須とするフィールド
+
+        Returns:
+            Dict: バリデーション結果
+        """
+        # 必須フィールドチェック
+        for field in required_fields:
+            value = data.get(field)
+            if not value:
+                return {
+                    "valid": False,
+                    "error": f"必須フィールドが不足しています: {field}",
+                }
+            if not isinstance(value, str):
                 return {
                     "valid": False,
-                    "error": f"{class_info['name']}は{class_info['schedule']}のスケジュールです",
+                    "error": f"文字列で指定してください: {field}",
                 }
 
-            return {"valid": True, "class_info": class_info, "weekday": weekday}
+        # メールアドレスバリデーション
+        if not self._validate_email(data["customer_email"]):
+            return {"valid": False, "error": "有効なメールアドレスを入力してください"}
 
-        except ValueError:
-            return {"valid": False, "error": "日付形式が正しくありません（YYYY-MM-DD）"}
+        # 電話番号バリデーション
+        if not self._validate_phone(data["customer_phone"]):
+            return {"valid": False, "error": "有効な電話番号を入力してください"}
+
+        return _VALID
+
+    def _validate_reservation(self, reservation_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        予約データ1件のバリデーション
+
+        Args:
+            reservation_data: 予約データ
+
+        Returns:
+            Dict: バリデーション結果（成功時はクラスタイプとクラス情報を含む）
+        """
+        validation = self._validate_customer(
+            reservation_data, self.RESERVATION_REQUIRED_FIELDS
+        )
+        if not validation["valid"]:
+            return validation
+
+        # クラスタイプの取得
+        class_type = self._get_class_type(reservation_data["class_name"])
+
+        if not class_type:
+            return {"valid": False, "error": "無効なクラス名です"}
+
+        # 予約日バリデーション
+        return self._validate_booking_date(reservation_data["booking_date"], class_type)
 
     async def create_reservation(
-        self, reservation_data: Dict[str, Any]
+        self, reservation_data: Dict[str, Any], idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         新規予約作成
 
+        冪等キーを指定した場合、作成済みのキーの再送には最初の結果を1回の読み取り
+        だけで返す（再バリデーション・書き込みは行わない）。満席などで作成できなかった
+        場合はキーを解放するため、同じキーで再送すると改めて作成を試みる。
+
         Args:
             reservation_data: 予約データ
+            idempotency_key: 冪等キー（Idempotency-Key ヘッダー）
 
         Returns:
-            Dict: 作成結果
+            Dict: 作成結果（再送の場合は "replayed": True、冪等キーを別の内容で
+            使い回した場合・処理中の場合は "idempotency_error" を含む）
         """
+        if idempotency_key:
+            return await self._create_reservation_idempotent(
+                reservation_data, idempotency_key
+            )
+
         try:
-            # 必須フィールドチェック
-            required_fields = [
-                "class_name",
-                "class_schedule",
-                "booking_date",
-                "customer_name",
-                "customer_email",
-                "customer_phone",
-            ]
+            return await self._create_reservation(reservation_data)
 
-            for field in required_fields:
-                if not reservation_data.get(field):
-                    return {
-                        "success": False,
-                        "error": f"必須フィールドが不足しています: {field}",
-                    }
+        except ConcurrentUpdateError as e:
+            logger.warning(f"予約枠の更新競合: {e}")
+            return self._busy_error()
+        except ValidationError as e:
+            logger.error(f"データバリデーションエラー: {e}")
+            return {"success": False, "error": "入力データが正しくありません"}
+        except Exception as e:
+            logger.error(f"予約作成エラー: {e}")
+            return {"success": False, "error": "予約の作成に失敗しました"}
 
-            # メールアドレスバリデーション
-            if not self._validate_email(reservation_data["customer_email"]):
-                return {
-                    "success": False,
-                    "error": "有効なメールアドレスを入力してください",
+    async def _create_reservation(
+        self, reservation_data: Dict[str, Any], reservation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        予約枠を確保して予約を保存（ストレージのエラーはそのまま送出）
+
+        Args:
+            reservation_data: 予約データ
+            reservation_id: 払い出し済みの予約ID
+
+        Raises:
+            SaveOutcomeUnknownError: 払い出し済みの予約IDでの保存がエラーになった場合
+                （応答のタイムアウトなどで書き込まれた可能性があるため、枠は解放しない）
+        """
+        validation = self._validate_reservation(reservation_data)
+        if not validation["valid"]:
+            return {"success": False, "error": validation["error"]}
+
+        # 定員チェック（予約枠をカウンターで確保）
+        class_type = validation["class_type"]
+        booking_date = reservation_data["booking_date"]
+        capacity = validation["class_info"]["capacity"]
+        if not await self.storage.reserve_slots(class_type, booking_date, capacity):
+            return {"success": False, "error": "このクラスは満席です"}
+
+        # 予約保存（失敗時は確保した枠を解放）
+        try:
+            reservation_id = await self.storage.save_reservation(
+                reservation_data, reservation_id
+            )
+        except ValidationError:
+            await self.storage.release_slots(class_type, booking_date)
+            raise
+        except Exception as e:
+            if reservation_id:
+                raise SaveOutcomeUnknownError(str(e)) from e
+            await self.storage.release_slots(class_type, booking_date)
+            raise
+
+        logger.info(f"新規予約作成: {reservation_id}")
+
+        return self._created_result(reservation_id, validation["class_info"])
+
+    def _created_result(
+        self, reservation_id: str, class_info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """予約作成成功時の結果"""
+        return {
+            "success": True,
+            "reservation_id": reservation_id,
+            "message": "予約が正常に作成されました",
+            "class_info": class_info,
+        }
+
+    async def _create_reservation_idempotent(
+        self, reservation_data: Dict[str, Any], idempotency_key: str
+    ) -> Dict[str, Any]:
+        """
+        冪等キー付きの予約作成
+
+        先にキーを処理中として確保（作成のみ許可の条件付き書き込み）してから
+        予約を作成し、結果をキーの記録に残す。確保したまま停止した記録は
+        IDEMPOTENCY_PENDING_SECONDS 秒後に引き継ぎ、払い出し済みの予約IDで
+        予約が保存済みならその予約を結果とする（二重予約にならない）。
+
+        キーを解放して再送で作り直せるのは、予約が書き込まれていないことが
+        確かな場合（バリデーションエラー・満席・保存前のエラー）だけ。
+        保存がタイムアウトなどで結果不明の場合は処理中の記録と予約IDを残し、
+        再送は引き継ぎで解決する（保存されていなければ同じIDで作り直すため、
+        先に確保した枠が残った場合は定期的な再集計で補正される）。
+        """
+        # 保存時に予約IDなどが追加される前の内容で照合する
+        fingerprint = hashlib.sha256(
+            json.dumps(reservation_data, sort_keys=True, ensure_ascii=False).encode(
+                "utf-8"
+            )
+        ).hexdigest()
+        record = None
+        keep_claim = False
+
+        try:
+            loaded = await self.storage.get_idempotency_record(idempotency_key)
+            etag, reservation_id = None, None
+            if loaded:
+                current, info = loaded
+                now = datetime.now(timezone.utc)
+                age = now - datetime.fromisoformat(current["created_at"])
+                if age <= timedelta(hours=self.IDEMPOTENCY_TTL_HOURS):
+                    if current["fingerprint"] != fingerprint:
+                        return self._idempotency_error("mismatch")
+                    if current["status"] == "completed":
+                        return {**current["result"], "replayed": True}
+                    if age <= timedelta(seconds=self.IDEMPOTENCY_PENDING_SECONDS):
+                        return self._idempotency_error("in_progress")
+                    # 放棄された処理を同じ予約IDで引き継ぐ
+                    reservation_id = current["reservation_id"]
+                etag = info.etag
+
+            record = await self.storage.claim_idempotency_key(
+                idempotency_key, fingerprint, etag, reservation_id
+            )
+            if record is None:
+                # 同じキーのリクエストが同時に届き、先に確保された
+                return self._idempotency_error("in_progress")
+
+            existing = (
+                await self.storage.get_reservation(reservation_id)
+                if reservation_id
+                else None
+            )
+            if existing:
+                class_type = self._get_class_type(existing.get("class_name"))
+                result = self._created_result(
+                    reservation_id, self.CLASS_SCHEDULES.get(class_type)
+                )
+            else:
+                result = await self._create_reservation(
+                    reservation_data, record["reservation_id"]
+                )
+            if result["success"]:
+                # 作成できた場合は、記録に失敗しても処理中の記録を後で引き継ぐ
+                keep_claim = True
+                await self.storage.complete_idempotency_key(
+                    idempotency_key, record, result
+                )
+                return result
+
+        except SaveOutcomeUnknownError as e:
+            logger.error(f"予約作成エラー（保存結果不明）: {e}")
+            keep_claim = True
+            result = {"success": False, "error": "予約の作成に失敗しました"}
+        except ConcurrentUpdateError as e:
+            logger.warning(f"予約枠の更新競合: {e}")
+            result = self._busy_error()
+        except ValidationError as e:
+            logger.error(f"データバリデーションエラー: {e}")
+            result = {"success": False, "error": "入力データが正しくありません"}
+        except Exception as e:
+            logger.error(f"予約作成エラー: {e}")
+            result = {"success": False, "error": "予約の作成に失敗しました"}
+
+        # 予約が書き込まれていない場合はキーを解放し、再送で作り直せるようにする
+        if record is not None and not keep_claim:
+            try:
+                await self.storage.release_idempotency_key(idempotency_key)
+            except Exception as e:
+                logger.warning(f"冪等キーの解放失敗: {e}")
+        return result
+
+    def _busy_error(self) -> Dict[str, Any]:
+        """予約枠カウンターの更新競合が解消しなかった場合の結果（再試行できる）"""
+        return {
+            "success": False,
+            "error": "混雑しています。しばらくしてから再試行してください",
+            "retryable": True,
+        }
+
+    def _idempotency_error(self, reason: str) -> Dict[str, Any]:
+        """冪等キーを使えない場合の結果（mismatch: 別の内容で使用済み、in_progress: 処理中）"""
+        errors = {
+            "mismatch": "この冪等キーは別の内容のリクエストで使用済みです",
+            "in_progress": "同じ冪等キーのリクエストを処理中です",
+        }
+        return {"success": False, "error": errors[reason], "idempotency_error": reason}
+
+    async def create_reservations(
+        self, reservations_data: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        複数予約の一括作成（グループ予約・定期予約向け）
+
+        全件をバリデーションしてから、レッスン回ごとに1回だけ予約枠を確保し、
+        予約Blobの保存とインデックス更新をまとめて行う。レッスン回の枠が
+        足りない場合、そのレッスン回の予約はすべて満席として失敗する。
+
+        Args:
+            reservations_data: 予約データのリスト
+
+        Returns:
+            Dict: 作成結果（results に入力と同じ順序で1件ごとの結果）
+        """
+        if not isinstance(reservations_data, list) or not reservations_data:
+            return {"success": False, "error": "予約データのリストが必要です"}
+
+        if len(reservations_data) > self.MAX_BATCH_SIZE:
+            return {
+                "success": False,
+                "error": f"一度に予約できるのは{self.MAX_BATCH_SIZE}件までです",
+            }
+
+        results: List[Dict[str, Any]] = [{} for _ in reservations_data]
+        sessions: Dict[tuple, List[int]] = {}
+        capacities: Dict[tuple, int] = {}
+
+        # 全件のバリデーション
+        for index, reservation_data in enumerate(reservations_data):
+            if not isinstance(reservation_data, dict):
+                results[index] = {"success": False, "error": "予約データが不正です"}
+                continue
+
+            try:
+                validation = self._validate_reservation(reservation_data)
+            except (TypeError, AttributeError) as e:
+                logger.error(f"データバリデーションエラー: {e}")
+                validation = {"valid": False, "error": "入力データが正しくありません"}
+            if not validation["valid"]:
+                results[index] = {"success": False, "error": validation["error"]}
+                continue
+
+            session = (validation["class_type"], reservation_data["booking_date"])
+            sessions.setdefault(session, []).append(index)
+            capacities[session] = validation["class_info"]["capacity"]
+
+        # レッスン回ごとに予約枠をまとめて確保
+        reserved = await asyncio.gather(
+            *(
+                self.storage.reserve_slots(
+                    *session, capacities[session], count=len(indexes)
+                )
+                for session, indexes in sessions.items()
+            ),
+            return_exceptions=True,
+        )
+
+        errors = [result for result in reserved if isinstance(result, Exception)]
+        if errors:
+            # 確保できた他のレッスン回の枠も解放して全体を失敗とする
+            logger.error(f"一括予約の枠確保エラー: {errors[0]}")
+            await self._release_sessions(
+                {
+                    session: len(indexes)
+                    for (session, indexes), is_reserved in zip(
+                        sessions.items(), reserved
+                    )
+                    if is_reserved is True
                 }
+            )
+            if all(isinstance(error, ConcurrentUpdateError) for error in errors):
+                return self._busy_error()
+            return {"success": False, "error": "予約の作成に失敗しました"}
+
+        accepted: Dict[int, tuple] = {}
+        for (session, indexes), is_reserved in zip(sessions.items(), reserved):
+            if is_reserved:
+                accepted.update((index, session) for index in indexes)
+            else:
+                for index in indexes:
+                    results[index] = {"success": False, "error": "このクラスは満席です"}
+
+        # 予約の一括保存（保存できなかった分の枠は解放）
+        try:
+            reservation_ids = await self.storage.save_reservations(
+                [reservations_data[index] for index in accepted]
+            )
+        except Exception as e:
+            logger.error(f"一括予約の保存エラー: {e}")
+            reservation_ids = [None] * len(accepted)
+
+        released: Dict[tuple, int] = {}
+        for (index, session), reservation_id in zip(accepted.items(), reservation_ids):
+            if reservation_id:
+                results[index] = {"success": True, "reservation_id": reservation_id}
+                continue
+
+            results[index] = {"success": False, "error": "予約の作成に失敗しました"}
+            released[session] = released.get(session, 0) + 1
+
+        await self._release_sessions(released)
 
-            # 電話番号バリデーション
-            if not self._validate_phone(reservation_data["customer_phone"]):
-                return {"success": False, "error": "有効な電話番号を入力してください"}
+        created = sum(1 for result in results if result["success"])
+        logger.info(f"一括予約作成: {created}/{len(results)}件")
 
-            # クラスタイプの取得
-            class_type = None
-            for key, info in self.CLASS_SCHEDULES.items():
-                if info["name"] == reservation_data["class_name"]:
-                    class_type = key
-                    break
+        return {
+            "success": created > 0,
+            "results": [{"index": i, **result} for i, result in enumerate(results)],
+            "created": created,
+            "failed": len(results) - created,
+        }
+
+    def _expand_series(
+        self, class_type: str, series_data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        定期予約の条件を予約期間内の具体的なレッスン日に展開
+
+        Args:
+            class_type: クラスタイプ
+            series_data: start_date（省略時は今日）、end_date（省略時は予約期間の最終日、
+                期間を超える場合は最終日まで）、weekdays（省略時はクラスの全開催曜日）
+
+        Returns:
+            Dict: 展開結果（成功時は booking_dates にレッスン日のリスト）
+        """
+        class_weekdays = self.CLASS_WEEKDAYS.get(class_type, ())
+        today = datetime.now(timezone.utc).date()
+        window_end = today + timedelta(days=self.BOOKING_WINDOW_DAYS)
+
+        try:
+            start = (
+                datetime.strptime(series_data["start_date"], "%Y-%m-%d").date()
+                if series_data.get("start_date")
+                else today
+            )
+            end = (
+                datetime.strptime(series_data["end_date"], "%Y-%m-%d").date()
+                if series_data.get("end_date")
+                else window_end
+            )
+        except (TypeError, ValueError):
+            return {"valid": False, "error": "日付形式が正しくありません（YYYY-MM-DD）"}
+
+        if start < today:
+            return {"valid": False, "error": "過去の日付は予約できません"}
+        if end < start:
+            return {"valid": False, "error": "終了日は開始日以降を指定してください"}
+
+        weekdays = series_data.get("weekdays") or list(class_weekdays)
+        if not isinstance(weekdays, list) or any(
+            weekday not in class_weekdays for weekday in weekdays
+        ):
+            return self._weekday_errors[class_type]
+
+        booking_dates = []
+        current = start
+        while current <= min(end, window_end):
+            if current.weekday() in weekdays:
+                booking_dates.append(current.isoformat())
+            current += timedelta(days=1)
+
+        if not booking_dates:
+            return {
+                "valid": False,
+                "error": "指定した期間に予約可能なレッスンがありません",
+            }
+
+        return {"valid": True, "booking_dates": booking_dates}
+
+    async def create_series(self, series_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        定期予約（例: 毎週水曜のハタヨガを指定日まで）の作成
+
+        条件を予約期間内のレッスン日に展開し、全レッスン回の予約枠を並行して
+        確保したうえで、定期予約レコード1件として保存する。
+        いずれかのレッスン回が満席の場合は、skip_full が真なら空きのある回だけを
+        予約し、そうでなければ確保した枠を解放して全体を失敗とする。
+
+        Args:
+            series_data: 予約者情報・class_name・start_date・end_date・weekdays・
+                skip_full を含む定期予約データ
+
+        Returns:
+            Dict: 作成結果
+        """
+        try:
+            validation = self._validate_customer(
+                series_data, self.SERIES_REQUIRED_FIELDS
+            )
+            if not validation["valid"]:
+                return {"success": False, "error": validation["error"]}
 
+            class_type = self._get_class_type(series_data["class_name"])
             if not class_type:
                 return {"success": False, "error": "無効なクラス名です"}
 
-            # 予約日バリデーション
-            date_validation = self._validate_booking_date(
-                reservation_data["booking_date"], class_type
+            expansion = self._expand_series(class_type, series_data)
+            if not expansion["valid"]:
+                return {"success": False, "error": expansion["error"]}
+
+            # 全レッスン回の予約枠を並行して確保
+            class_info = self.CLASS_SCHEDULES[class_type]
+            booking_dates = expansion["booking_dates"]
+            reserved = await asyncio.gather(
+                *(
+                    self.storage.reserve_slots(
+                        class_type, booking_date, class_info["capacity"]
+                    )
+                    for booking_date in booking_dates
+                ),
+                return_exceptions=True,
             )
 
-            if not date_validation["valid"]:
-                return {"success": False, "error": date_validation["error"]}
-
-            # 定員チェック（将来実装）
-            # capacity_check = await self._check_capacity(
-            #     reservation_data["booking_date"],
-            #     class_type
-            # )
+            reserved_dates = [
+                booking_date
+                for booking_date, is_reserved in zip(booking_dates, reserved)
+                if is_reserved is True
+            ]
+            full_dates = [
+                booking_date
+                for booking_date, is_reserved in zip(booking_dates, reserved)
+                if is_reserved is False
+            ]
+            errors = [result for result in reserved if isinstance(result, Exception)]
+
+            if (
+                errors
+                or not reserved_dates
+                or (full_dates and not series_data.get("skip_full"))
+            ):
+                await self._release_dates(class_type, reserved_dates)
+                if errors:
+                    logger.error(f"定期予約の枠確保エラー: {errors[0]}")
+                    if all(
+                        isinstance(error, ConcurrentUpdateError) for error in errors
+                    ):
+                        return self._busy_error()
+                    return {"success": False, "error": "予約の作成に失敗しました"}
+                return {
+                    "success": False,
+                    "error": "満席のレッスンがあります",
+                    "full_dates": full_dates,
+                }
 
-            # 予約保存
-            reservation_id = await self.storage.save_reservation(reservation_data)
+            # 定期予約の保存（失敗時は確保した枠を解放）
+            record = {
+                key: series_data.get(key)
+                for key in (
+                    "class_name",
+                    "class_schedule",
+                    "customer_name",
+                    "customer_email",
+                    "customer_phone",
+                    "booking_notes",
+                )
+                if series_data.get(key) is not None
+            }
+            record["booking_dates"] = reserved_dates
+            try:
+                series_id = await self.storage.save_series(record)
+            except Exception:
+                await self._release_dates(class_type, reserved_dates)
+                raise
 
-            logger.info(f"新規予約作成: {reservation_id}")
+            logger.info(f"定期予約作成: {series_id} ({len(reserved_dates)}回)")
 
             return {
                 "success": True,
-                "reservation_id": reservation_id,
-                "message": "予約が正常に作成されました",
-                "class_info": date_validation["class_info"],
+                "series_id": series_id,
+                "booking_dates": reserved_dates,
+                "skipped_dates": full_dates,
+                "message": "定期予約が正常に作成されました",
+                "class_info": class_info,
             }
 
         except ValidationError as e:
             logger.error(f"データバリデーションエラー: {e}")
             return {"success": False, "error": "入力データが正しくありません"}
         except Exception as e:
-            logger.error(f"予約作成エラー: {e}")
+            logger.error(f"定期予約作成エラー: {e}")
             return {"success": False, "error": "予約の作成に失敗しました"}
 
+    async def _release_sessions(self, counts: Dict[tuple, int]) -> None:
+        """複数のレッスン回（クラスタイプ, 予約日）の予約枠を指定数ずつ解放"""
+        results = await asyncio.gather(
+            *(
+                self.storage.release_slots(class_type, booking_date, count)
+                for (class_type, booking_date), count in counts.items()
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"定員カウンター更新失敗: {result}")
+
+    async def _release_dates(self, class_type: str, booking_dates: List[str]) -> None:
+        """複数のレッスン回の予約枠を1枠ずつ解放"""
+        results = await asyncio.gather(
+            *(
+                self.storage.release_slots(class_type, booking_date)
+                for booking_date in booking_dates
+            ),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"定員カウンター更新失敗: {result}")
+
+    async def get_series(self, series_id: str) -> Dict[str, Any]:
+        """
+        定期予約の取得
+
+        Args:
+            series_id: 定期予約ID
+
+        Returns:
+            Dict: 検索結果
+        """
+        try:
+            series = await self.storage.get_series(series_id)
+
+            if not series:
+                return {"success": False, "error": "定期予約が見つかりません"}
+
+            return {"success": True, "series": series}
+
+        except Exception as e:
+            logger.error(f"定期予約検索エラー: {e}")
+            return {"success": False, "error": "予約の検索に失敗しました"}
+
     async def get_reservation_by_id(self, reservation_id: str) -> Dict[str, Any]:
         """
         予約ID検索
@@ -229,15 +853,19 @@ class ReservationManager:
             logger.error(f"予約検索エラー: {e}")
             return {"success": False, "error": "予約の検索に失敗しました"}
 
-    async def get_reservations_by_email(self, email: str) -> Dict[str, Any]:
+    async def get_reservations_by_email(
+        self, email: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        メールアドレスで予約検索
+        メールアドレスで予約検索（作成日時の新しい順、1ページ分）
 
         Args:
             email: 顧客メールアドレス
+            limit: 1ページの件数（省略時は DEFAULT_PAGE_SIZE、上限 MAX_PAGE_SIZE）
+            cursor: 前のページの next_cursor
 
         Returns:
-            Dict: 検索結果
+            Dict: 検索結果（続きがある場合は next_cursor を含む）
         """
         try:
             if not self._validate_email(email):
@@ -246,16 +874,27 @@ class ReservationManager:
                     "error": "有効なメールアドレスを入力してください",
                 }
 
-            reservations = await self.storage.get_reservations_by_email(email)
+            if limit is None:
+                limit = self.DEFAULT_PAGE_SIZE
+            if not 1 <= limit <= self.MAX_PAGE_SIZE:
+                return {
+                    "success": False,
+                    "error": f"limitは1〜{self.MAX_PAGE_SIZE}で指定してください",
+                }
+
+            try:
+                reservations, next_cursor = (
+                    await self.storage.get_reservations_by_email_page(
+                        email, limit, cursor
+                    )
+                )
+            except ValueError:
+                return {"success": False, "error": "継続トークンが正しくありません"}
 
             # 予約データに追加情報を付与
             enriched_reservations = []
             for reservation in reservations:
-                class_type = None
-                for key, info in self.CLASS_SCHEDULES.items():
-                    if info["name"] == reservation.get("class_name"):
-                        class_type = key
-                        break
+                class_type = self._get_class_type(reservation.get("class_name"))
 
                 reservation["class_type"] = class_type
                 reservation["class_info"] = self.CLASS_SCHEDULES.get(class_type, {})
@@ -264,6 +903,7 @@ class ReservationManager:
             return {
                 "success": True,
                 "reservations": enriched_reservations,
+                "next_cursor": next_cursor,
                 "count": len(enriched_reservations),
             }
 
@@ -277,18 +917,22 @@ class ReservationManager:
         """
         予約キャンセル
 
+        定期予約IDを指定した場合は、定期予約のうちキャンセル期限を過ぎていない
+        レッスン回をまとめてキャンセルする。
+
         Args:
-            reservation_id: 予約ID
+            reservation_id: 予約ID（または定期予約ID）
             email: 予約者のメールアドレス（認証用）
 
         Returns:
             Dict: キャンセル結果
         """
         try:
-            # 予約存在確認
-            reservation = await self.storage.get_reservation(reservation_id)
-            if not reservation:
-                return {"success": False, "error": "予約が見つかりません"}
+            # 予約存在確認（ETag付きで1回だけ読み取り、そのETagを条件に更新する）
+            loaded = await self.storage.load_reservation(reservation_id)
+            if not loaded:
+                return await self._cancel_series(reservation_id, email)
+            reservation, blob_info = loaded
 
             # メールアドレス確認（セキュリティ）
             if reservation.get("customer_email", "").lower() != email.lower():
@@ -314,9 +958,12 @@ class ReservationManager:
                     "error": "レッスンの24時間前を過ぎているため、キャンセルできません",
                 }
 
-            # ステータス更新
-            success = await self.storage.update_reservation_status(
-                reservation_id, "cancelled"
+            # ステータス更新（インデックス更新・予約枠の解放まで同じ流れで行う）
+            success = await self.storage.update_loaded_reservation_status(
+                reservation,
+                blob_info,
+                "cancelled",
+                release_class_type=self._get_class_type(reservation.get("class_name")),
             )
 
             if success:
@@ -325,10 +972,55 @@ class ReservationManager:
             else:
                 return {"success": False, "error": "キャンセル処理に失敗しました"}
 
+        except ConcurrentUpdateError as e:
+            logger.warning(f"定期予約の更新競合: {e}")
+            return self._busy_error()
         except Exception as e:
             logger.error(f"キャンセルエラー: {e}")
             return {"success": False, "error": "キャンセル処理に失敗しました"}
 
+    async def _cancel_series(self, series_id: str, email: str) -> Dict[str, Any]:
+        """
+        定期予約のキャンセル（レッスンの24時間前を過ぎていない回だけ）
+
+        Args:
+            series_id: 定期予約ID
+            email: 予約者のメールアドレス（認証用）
+
+        Returns:
+            Dict: キャンセル結果（cancelled_dates にキャンセルしたレッスン日）
+        """
+        loaded = await self.storage.load_series(series_id)
+        if not loaded:
+            return {"success": False, "error": "予約が見つかりません"}
+        series, _ = loaded
+
+        if series.get("customer_email", "").lower() != email.lower():
+            return {"success": False, "error": "予約者のメールアドレスと一致しません"}
+
+        if series.get("status") == "cancelled":
+            return {"success": False, "error": "この予約は既にキャンセルされています"}
+
+        # 予約日の0時が24時間後より後のレッスン回だけキャンセルできる
+        deadline = (datetime.now(timezone.utc) + timedelta(hours=24)).date()
+        cancelled_dates = await self.storage.cancel_series_dates(
+            series_id,
+            deadline.isoformat(),
+            release_class_type=self._get_class_type(series.get("class_name")),
+        )
+        if not cancelled_dates:
+            return {
+                "success": False,
+                "error": "レッスンの24時間前を過ぎているため、キャンセルできません",
+            }
+
+        logger.info(f"定期予約キャンセル完了: {series_id}")
+        return {
+            "success": True,
+            "message": "定期予約をキャンセルしました",
+            "cancelled_dates": cancelled_dates,
+        }
+
     def get_class_schedules(self) -> Dict[str, Any]:
         """
         クラススケジュール情報を取得
@@ -340,7 +1032,7 @@ class ReservationManager:
 
     async def get_availability(self, class_type: str, date: str) -> Dict[str, Any]:
         """
-        クラスの空き状況確認（将来実装）
+        クラスの空き状況確認
 
         Args:
             class_type: クラスタイプ
@@ -349,16 +1041,325 @@ class ReservationManager:
         Returns:
             Dict: 空き状況
         """
-        # 現在は常に空きありとして返す
-        # 実際の実装では、その日の予約数をカウントして定員と比較
         class_info = self.CLASS_SCHEDULES.get(class_type)
         if not class_info:
             return {"success": False, "error": "無効なクラスタイプです"}
 
+        if _parse_date(date) is None:
+            return {
+                "success": False,
+                "error": "日付形式が正しくありません（YYYY-MM-DD）",
+            }
+
+        try:
+            # レッスン回のカウンターを1回読むだけで予約数を取得
+            booked = await self.storage.get_booked_count(class_type, date)
+        except Exception as e:
+            logger.error(f"空き状況確認エラー: {e}")
+            return {"success": False, "error": "空き状況の確認に失敗しました"}
+
+        remaining = max(0, class_info["capacity"] - booked)
+
         return {
             "success": True,
-            "available": True,
+            "available": remaining > 0,
             "capacity": class_info["capacity"],
-            "booked": 0,  # 実装時に実際の予約数を取得
-            "remaining": class_info["capacity"],
+            "booked": booked,
+            "remaining": remaining,
         }
+
+    async def get_calendar(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        class_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        期間内の全レッスン回と空き状況を取得
+
+        レッスン回はクラススケジュールと開催曜日から求め、予約数は
+        カレンダー文書を1回読むだけで取得する。
+
+        Args:
+            start_date: 開始日（省略時は今日）
+            end_date: 終了日（省略時は予約期間の最終日）
+            class_type: クラスタイプ（省略時は全クラス）
+
+        Returns:
+            Dict: レッスン回ごとの空き状況
+        """
+        if class_type and class_type not in self.CLASS_SCHEDULES:
+            return {"success": False, "error": "無効なクラスタイプです"}
+
+        today = datetime.now(timezone.utc).date()
+        try:
+            start = (
+                datetime.strptime(start_date, "%Y-%m-%d").date()
+                if start_date
+                else today
+            )
+            end = (
+                datetime.strptime(end_date, "%Y-%m-%d").date()
+                if end_date
+                else today + timedelta(days=self.BOOKING_WINDOW_DAYS)
+            )
+        except ValueError:
+            return {
+                "success": False,
+                "error": "日付形式が正しくありません（YYYY-MM-DD）",
+            }
+
+        if end < start:
+            return {"success": False, "error": "終了日は開始日以降を指定してください"}
+        if (end - start).days > self.BOOKING_WINDOW_DAYS:
+            return {
+                "success": False,
+                "error": f"期間は{self.BOOKING_WINDOW_DAYS}日以内で指定してください",
+            }
+
+        try:
+            booked_counts = await self.storage.get_calendar()
+        except Exception as e:
+            logger.error(f"カレンダー取得エラー: {e}")
+            return {"success": False, "error": "空き状況の確認に失敗しました"}
+
+        class_types = [class_type] if class_type else list(self.CLASS_SCHEDULES)
+        sessions = []
+        current = start
+        while current <= end:
+            date = current.isoformat()
+            for key in class_types:
+                if current.weekday() not in self.CLASS_WEEKDAYS.get(key, ()):
+                    continue
+
+                class_info = self.CLASS_SCHEDULES[key]
+                session = booked_counts.get(f"{key}/{date}")
+                booked = session["booked"] if session else 0
+                remaining = max(0, class_info["capacity"] - booked)
+                sessions.append(
+                    {
+                        "class_type": key,
+                        "class_name": class_info["name"],
+                        "date": date,
+                        "capacity": class_info["capacity"],
+                        "booked": booked,
+                        "remaining": remaining,
+                        "available": remaining > 0,
+                    }
+                )
+            current += timedelta(days=1)
+
+        return {
+            "success": True,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "sessions": sessions,
+            "count": len(sessions),
+        }
+
+    async def get_roster(
+        self, date: str, class_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        レッスン日の受付名簿（管理者向け）
+
+        Args:
+            date: レッスン日（YYYY-MM-DD形式）
+            class_type: クラスタイプ（省略時は全クラス）
+
+        Returns:
+            Dict: 予約一覧（作成日時順）
+        """
+        if class_type and class_type not in self.CLASS_SCHEDULES:
+            return {"success": False, "error": "無効なクラスタイプです"}
+
+        if _parse_date(date) is None:
+            return {
+                "success": False,
+                "error": "日付形式が正しくありません（YYYY-MM-DD）",
+            }
+
+        try:
+            class_name = (
+                self.CLASS_SCHEDULES[class_type]["name"] if class_type else None
+            )
+            reservations = [
+                self._with_class_type(reservation)
+                async for reservation in self.storage.iter_bookings([date], class_name)
+            ]
+        except Exception as e:
+            logger.error(f"名簿取得エラー: {e}")
+            return {"success": False, "error": "予約一覧の取得に失敗しました"}
+
+        return {
+            "success": True,
+            "date": date,
+            "class_type": class_type,
+            "reservations": reservations,
+            "count": len(reservations),
+            "confirmed": sum(1 for r in reservations if r.get("status") == "confirmed"),
+        }
+
+    def export_reservations(
+        self,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        month: Optional[str] = None,
+        class_type: Optional[str] = None,
+        export_format: str = "csv",
+        max_days: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        期間内の予約をレッスン日順にエクスポート（管理者向け）
+
+        出力は非同期イテレータとして1行ずつ作るため、期間が長くても
+        全件をメモリに載せない。
+
+        Args:
+            start_date: 開始日（YYYY-MM-DD形式）
+            end_date: 終了日（YYYY-MM-DD形式）
+            month: 月（YYYY-MM形式、start_date・end_date の代わりに指定）
+            class_type: クラスタイプ（省略時は全クラス）
+            export_format: "csv" または "ndjson"
+            max_days: 指定できる最大日数（省略時は MAX_EXPORT_DAYS）
+
+        Returns:
+            Dict: 成功時は content_type・filename・chunks（bytesの非同期イテレータ）
+        """
+        if export_format not in ("csv", "ndjson"):
+            return {
+                "success": False,
+                "error": "formatはcsvまたはndjsonを指定してください",
+            }
+
+        if class_type and class_type not in self.CLASS_SCHEDULES:
+            return {"success": False, "error": "無効なクラスタイプです"}
+
+        if month:
+            first = _parse_date(f"{month}-01")
+            if first is None:
+                return {
+                    "success": False,
+                    "error": "月の形式が正しくありません（YYYY-MM）",
+                }
+            start = first
+            end = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+        else:
+            start, end = _parse_date(start_date), _parse_date(end_date)
+            if start is None or end is None:
+                return {
+                    "success": False,
+                    "error": "日付形式が正しくありません（YYYY-MM-DD）",
+                }
+
+        if end < start:
+            return {"success": False, "error": "終了日は開始日以降を指定してください"}
+        max_days = min(max_days or self.MAX_EXPORT_DAYS, self.MAX_EXPORT_DAYS)
+        if (end - start).days >= max_days:
+            return {
+                "success": False,
+                "error": f"期間は{max_days}日以内で指定してください",
+            }
+
+        booking_dates = [
+            (start + timedelta(days=offset)).isoformat()
+            for offset in range((end - start).days + 1)
+        ]
+        class_name = self.CLASS_SCHEDULES[class_type]["name"] if class_type else None
+        reservations = self.storage.iter_bookings(booking_dates, class_name)
+
+        suffix = f"{class_type}_" if class_type else ""
+        filename = f"reservations_{suffix}{start.isoformat()}_{end.isoformat()}"
+        if export_format == "csv":
+            return {
+                "success": True,
+                "content_type": "text/csv; charset=utf-8",
+                "filename": f"{filename}.csv",
+                "chunks": self._iter_csv(reservations),
+            }
+        return {
+            "success": True,
+            "content_type": "application/x-ndjson; charset=utf-8",
+            "filename": f"{filename}.ndjson",
+            "chunks": self._iter_ndjson(reservations),
+        }
+
+    def _with_class_type(self, reservation: Dict[str, Any]) -> Dict[str, Any]:
+        """予約データにクラスタイプを付与"""
+        reservation["class_type"] = self._get_class_type(reservation.get("class_name"))
+        return reservation
+
+    async def _iter_csv(
+        self, reservations: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[bytes]:
+        """
+        予約をCSVの行に変換（Excelで文字化けしないようBOM付きUTF-8）
+
+        予約者が入力した値は =・+・-・@ などで始まると表計算ソフトで数式として
+        実行されるため、先頭に ' を付けて文字列として出力する。
+        """
+        buffer = io.StringIO()
+        writer = csv.DictWriter(
+            buffer, fieldnames=self.EXPORT_COLUMNS, extrasaction="ignore"
+        )
+        writer.writeheader()
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+        async for reservation in reservations:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow(
+                {
+                    key: _escape_csv_formula(value)
+                    for key, value in self._with_class_type(reservation).items()
+                }
+            )
+            yield buffer.getvalue().encode("utf-8")
+
+    async def _iter_ndjson(
+        self, reservations: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[bytes]:
+        """予約をNDJSONの行に変換"""
+        async for reservation in reservations:
+            yield serializer.dumps(self._with_class_type(reservation)) + b"\n"
+
+    async def reconcile(
+        self, full: bool = False, start_month: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        予約Blobからインデックス・予約枠カウンター・カレンダーを再構築
+
+        前回の実行以降に更新された予約Blobだけを処理する（初回と full=True の
+        場合は全件）。停止したインスタンスの write-behind 未反映分も先に反映する。
+
+        Args:
+            full: 前回の実行に関係なく全件を再構築するか
+            start_month: 走査を開始する月（YYYY-MM形式）
+
+        Returns:
+            Dict: 再構築の結果
+        """
+        if start_month and (
+            len(start_month) != 7 or _parse_date(f"{start_month}-01") is None
+        ):
+            return {"success": False, "error": "月の形式が正しくありません（YYYY-MM）"}
+
+        async def recount(sessions):
+            # クラス名からクラスタイプと定員を引いて予約枠カウンターを数え直す
+            targets = []
+            for class_name, booking_date in sorted(sessions):
+                class_type = self._get_class_type(class_name)
+                if class_type:
+                    capacity = self.CLASS_SCHEDULES[class_type]["capacity"]
+                    targets.append((class_type, class_name, booking_date, capacity))
+            deferred = await self.storage.recount_slots(targets)
+            return [(session[1], session[2]) for session in deferred]
+
+        try:
+            write_behind = await self.storage.reconcile_index_updates()
+            result = await self.storage.rebuild_indexes(recount, full, start_month)
+        except Exception as e:
+            logger.error(f"インデックス再構築エラー: {e}")
+            return {"success": False, "error": "インデックスの再構築に失敗しました"}
+
+        return {"success": True, **result, "write_behind": write_behind}
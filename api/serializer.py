@@ -0,0 +1,121 @@
+"""
+JSONシリアライザー
+保存するBlobとAPIレスポンスのエンコード・デコードを一元管理
+"""
+
+import gzip
+import json
+import logging
+import os
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # orjsonは任意の依存関係
+    orjson = None
+
+# ログ設定
+logger = logging.getLogger(__name__)
+
+# gzipストリームの先頭2バイト
+GZIP_MAGIC = b"\x1f\x8b"
+
+# この大きさ以上のインデックスBlobをgzip圧縮する（0で圧縮しない）
+DEFAULT_GZIP_THRESHOLD_BYTES = 4096
+
+
+class JsonSerializer:
+    """標準ライブラリのjsonによるコンパクトなシリアライザー"""
+
+    name = "json"
+
+    def dumps(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer:
+    """orjsonによる高速なシリアライザー（インストールされている場合のみ）"""
+
+    name = "orjson"
+
+    def dumps(self, data: Any) -> bytes:
+        return orjson.dumps(data)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+_serializer = None
+
+
+def get_serializer(name: Optional[str] = None):
+    """
+    シリアライザーを取得
+
+    Args:
+        name: "json" / "orjson" / "auto"（省略時は環境変数 JSON_SERIALIZER、
+            未設定ならorjsonがあればorjson）
+
+    Returns:
+        シリアライザー
+    """
+    global _serializer
+
+    if name is None and _serializer is not None:
+        return _serializer
+
+    requested = (name or os.getenv("JSON_SERIALIZER", "auto")).lower()
+    if requested == "orjson" and orjson is None:
+        logger.warning("orjsonがインストールされていないため標準jsonを使用します")
+
+    if requested in ("orjson", "auto") and orjson is not None:
+        serializer = OrjsonSerializer()
+    else:
+        serializer = JsonSerializer()
+
+    if name is None:
+        _serializer = serializer
+    return serializer
+
+
+def dumps(data: Any) -> bytes:
+    """データをコンパクトなJSON（UTF-8）にエンコード"""
+    return get_serializer().dumps(data)
+
+
+def loads(data: bytes) -> Any:
+    """
+    JSONをデコード
+
+    gzip圧縮されたBlobや、以前のインデント付きJSONもそのまま読み込める。
+    """
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    return get_serializer().loads(data)
+
+
+def dumps_blob(data: Any, compress: bool = False) -> bytes:
+    """
+    Blob保存用にエンコード
+
+    Args:
+        data: 保存するデータ
+        compress: Trueの場合、閾値（環境変数 BLOB_GZIP_THRESHOLD_BYTES）以上の
+            大きさならgzip圧縮する
+
+    Returns:
+        bytes: 保存するバイト列
+    """
+    encoded = dumps(data)
+    if compress:
+        threshold = int(
+            os.getenv("BLOB_GZIP_THRESHOLD_BYTES", DEFAULT_GZIP_THRESHOLD_BYTES)
+        )
+        if 0 < threshold <= len(encoded):
+            return gzip.compress(encoded, compresslevel=6)
+    return encoded
@@ -0,0 +1,580 @@
+"""
+ストレージバックエンド
+StorageManagerが使うBlob操作を抽象化し、Azure Blob Storage・ローカルファイル・
+インメモリの実装を切り替え可能にする
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from uuid import uuid4
+
+from azure.storage.blob.aio import BlobServiceClient
+from azure.identity.aio import DefaultAzureCredential, ManagedIdentityCredential
+from azure.core import MatchConditions
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+from pydantic import BaseModel
+
+# ログ設定
+logger = logging.getLogger(__name__)
+
+
+# 認証情報の判定結果・確認済みコンテナ（プロセス内でメモ化し、再初期化時の往復を省く）
+_credential_kind_cache: Dict[str, str] = {}
+_verified_containers: set = set()
+
+
+class BlobInfo(BaseModel):
+    """Blobのプロパティ"""
+
+    name: str
+    etag: Optional[str] = None
+    metadata: Dict[str, str] = {}
+    last_modified: Optional[datetime] = None
+
+
+class StorageBackend(ABC):
+    """
+    ストレージバックエンドのインターフェース
+
+    どの実装もAzure Blob Storageと同じ意味論で動作する:
+    - 存在しないBlobの読み取りは ResourceNotFoundError
+    - ETag不一致の条件付き書き込みは ResourceModifiedError
+    - 作成のみ（overwrite=False）で既存Blobがある場合は ResourceExistsError
+    - 一覧はBlob名の辞書順
+    """
+
+    name = "abstract"
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """接続の事前初期化（各段階の所要時間をミリ秒で返す）"""
+        return {}
+
+    @abstractmethod
+    async def download(self, blob_name: str) -> Tuple[bytes, BlobInfo]:
+        """Blobの内容とプロパティを取得"""
+
+    @abstractmethod
+    async def upload(
+        self,
+        blob_name: str,
+        data: bytes,
+        metadata: Optional[Dict[str, str]] = None,
+        etag: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> BlobInfo:
+        """
+        Blobを書き込み
+
+        Args:
+            blob_name: Blob名
+            data: 内容
+            metadata: メタデータ
+            etag: 指定した場合、現在のETagと一致する場合のみ書き込む
+            overwrite: Falseの場合、Blobが存在しない場合のみ書き込む
+        """
+
+    @abstractmethod
+    async def append(self, blob_name: str, data: bytes) -> None:
+        """追記用Blobに追記（存在しない場合は作成してから追記）"""
+
+    @abstractmethod
+    async def exists(self, blob_name: str) -> bool:
+        """Blobが存在するか"""
+
+    @abstractmethod
+    def list_blobs(self, prefix: Optional[str] = None) -> AsyncIterator[BlobInfo]:
+        """Blobの一覧（メタデータ付き）"""
+
+    @abstractmethod
+    async def delete(self, blob_name: str) -> None:
+        """Blobを削除（存在しない場合は何もしない）"""
+
+    @abstractmethod
+    async def get_container_properties(self) -> Dict[str, Any]:
+        """コンテナのプロパティ"""
+
+    async def close(self) -> None:
+        """コネクションを閉じる"""
+
+
+class BlobStorageBackend(StorageBackend):
+    """
+    Azure Blob Storageバックエンド
+
+    セキュリティ機能:
+    - Managed Identityによる認証
+    - 暗号化された通信
+    """
+
+    name = "blob"
+
+    def __init__(self, storage_account_name: str, container_name: str):
+        if not storage_account_name:
+            raise ValueError("ストレージアカウント名が設定されていません")
+
+        self.storage_account_name = storage_account_name
+        self.container_name = container_name
+
+        # 非同期クライアントは最初のストレージ操作時に初期化し、ワーカー内で共有する
+        # （aiohttpのコネクションプールを使い回すため）
+        self.credential = None
+        self.blob_service_client: Optional[BlobServiceClient] = None
+        self._init_lock = asyncio.Lock()
+
+    async def _ensure_initialized(self) -> None:
+        """認証情報・Blob Service Client・コンテナを初期化（初回のみ）"""
+        if self.blob_service_client is not None:
+            return
+
+        async with self._init_lock:
+            if self.blob_service_client is not None:
+                return
+
+            credential = await self._create_credential()
+
+            # Blob Service Clientの初期化
+            account_url = f"https://{self.storage_account_name}.blob.core.windows.net"
+            blob_service_client = BlobServiceClient(
+                account_url=account_url, credential=credential
+            )
+
+            # コンテナの初期化（確認済みの場合は省略）
+            container_key = f"{self.storage_account_name}/{self.container_name}"
+            skip_check = os.getenv("AZURE_STORAGE_CONTAINER_VERIFIED", "").lower() in (
+                "1",
+                "true",
+            )
+            if not skip_check and container_key not in _verified_containers:
+                try:
+                    await self._ensure_container_exists(blob_service_client)
+                except Exception:
+                    await blob_service_client.close()
+                    await credential.close()
+                    raise
+                _verified_containers.add(container_key)
+
+            self.credential = credential
+            self.blob_service_client = blob_service_client
+
+    async def _create_credential(self):
+        """
+        認証情報を作成
+
+        判定結果はプロセス内でメモ化する。環境変数 AZURE_STORAGE_CREDENTIAL
+        （managed_identity / default）で指定された場合や、Managed Identityの
+        エンドポイントが存在しない環境ではトークン取得による判定を省略する。
+        """
+        kind = os.getenv("AZURE_STORAGE_CREDENTIAL") or _credential_kind_cache.get(
+            self.storage_account_name
+        )
+        if not kind and not (
+            os.getenv("IDENTITY_ENDPOINT") or os.getenv("MSI_ENDPOINT")
+        ):
+            # ローカル開発環境: IMDSのタイムアウト待ちを避ける
+            kind = "default"
+
+        if kind == "managed_identity":
+            return ManagedIdentityCredential()
+        if kind == "default":
+            _credential_kind_cache[self.storage_account_name] = kind
+            return DefaultAzureCredential()
+
+        # Managed Identityを使用した認証（セキュリティベストプラクティス）
+        # 判定で取得したトークンは認証情報内にキャッシュされ、最初の操作で再利用される
+        try:
+            credential = ManagedIdentityCredential()
+            # フォールバック: ローカル開発環境用
+            if not await self._test_credential(credential):
+                await credential.close()
+                _credential_kind_cache[self.storage_account_name] = "default"
+                return DefaultAzureCredential()
+        except Exception:
+            _credential_kind_cache[self.storage_account_name] = "default"
+            return DefaultAzureCredential()
+
+        _credential_kind_cache[self.storage_account_name] = "managed_identity"
+        return credential
+
+    async def _test_credential(self, credential: ManagedIdentityCredential) -> bool:
+        """認証情報のテスト"""
+        try:
+            # 簡単な認証テスト
+            await credential.get_token("https://storage.azure.com/.default")
+            return True
+        except Exception:
+            return False
+
+    async def _ensure_container_exists(
+        self, blob_service_client: BlobServiceClient
+    ) -> None:
+        """コンテナが存在することを確認し、なければ作成"""
+        try:
+            container_client = blob_service_client.get_container_client(
+                self.container_name
+            )
+            await container_client.get_container_properties()
+            logger.info(f"コンテナ '{self.container_name}' が存在します")
+        except ResourceNotFoundError:
+            try:
+                await blob_service_client.create_container(self.container_name)
+                logger.info(f"コンテナ '{self.container_name}' を作成しました")
+            except Exception as e:
+                logger.error(f"コンテナ作成エラー: {e}")
+                raise
+        except Exception as e:
+            logger.error(f"コンテナ確認エラー: {e}")
+            raise
+
+    async def _blob_client(self, blob_name: str):
+        await self._ensure_initialized()
+        return self.blob_service_client.get_blob_client(
+            container=self.container_name, blob=blob_name
+        )
+
+    async def warm_up(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        await self._ensure_initialized()
+        initialized = time.perf_counter()
+
+        container_client = self.blob_service_client.get_container_client(
+            self.container_name
+        )
+        await container_client.get_container_properties()
+        connected = time.perf_counter()
+
+        return {
+            "initialize_ms": round((initialized - started) * 1000, 1),
+            "connect_ms": round((connected - initialized) * 1000, 1),
+        }
+
+    async def download(self, blob_name: str) -> Tuple[bytes, BlobInfo]:
+        blob_client = await self._blob_client(blob_name)
+        downloader = await blob_client.download_blob()
+        data = await downloader.readall()
+        return data, BlobInfo(
+            name=blob_name,
+            etag=downloader.properties.etag,
+            metadata=downloader.properties.metadata or {},
+            last_modified=downloader.properties.last_modified,
+        )
+
+    async def upload(
+        self,
+        blob_name: str,
+        data: bytes,
+        metadata: Optional[Dict[str, str]] = None,
+        etag: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> BlobInfo:
+        blob_client = await self._blob_client(blob_name)
+        if etag:
+            result = await blob_client.upload_blob(
+                data,
+                overwrite=True,
+                metadata=metadata,
+                etag=etag,
+                match_condition=MatchConditions.IfNotModified,
+            )
+        else:
+            result = await blob_client.upload_blob(
+                data, overwrite=overwrite, metadata=metadata
+            )
+        return BlobInfo(
+            name=blob_name,
+            etag=result.get("etag"),
+            metadata=metadata or {},
+            last_modified=result.get("last_modified"),
+        )
+
+    async def append(self, blob_name: str, data: bytes) -> None:
+        blob_client = await self._blob_client(blob_name)
+        try:
+            await blob_client.append_block(data)
+        except ResourceNotFoundError:
+            try:
+                await blob_client.create_append_blob(
+                    etag="*", match_condition=MatchConditions.IfMissing
+                )
+            except ResourceExistsError:
+                # 他のインスタンスが先に作成済み
+                pass
+            await blob_client.append_block(data)
+
+    async def exists(self, blob_name: str) -> bool:
+        blob_client = await self._blob_client(blob_name)
+        try:
+            await blob_client.get_blob_properties()
+            return True
+        except ResourceNotFoundError:
+            return False
+
+    async def list_blobs(self, prefix: Optional[str] = None) -> AsyncIterator[BlobInfo]:
+        await self._ensure_initialized()
+        container_client = self.blob_service_client.get_container_client(
+            self.container_name
+        )
+        async for blob in container_client.list_blobs(
+            name_starts_with=prefix, include=["metadata"]
+        ):
+            yield BlobInfo(
+                name=blob.name,
+                etag=blob.etag,
+                metadata=blob.metadata or {},
+                last_modified=blob.last_modified,
+            )
+
+    async def delete(self, blob_name: str) -> None:
+        blob_client = await self._blob_client(blob_name)
+        try:
+            await blob_client.delete_blob()
+        except ResourceNotFoundError:
+            pass
+
+    async def get_container_properties(self) -> Dict[str, Any]:
+        await self._ensure_initialized()
+        container_client = self.blob_service_client.get_container_client(
+            self.container_name
+        )
+        properties = await container_client.get_container_properties()
+        return {
+            "storage_account": self.storage_account_name,
+            "last_modified": (
+                properties.last_modified.isoformat()
+                if properties.last_modified
+                else None
+            ),
+        }
+
+    async def close(self) -> None:
+        """Blob Service Clientと認証情報のコネクションを閉じる（シャットダウン時）"""
+        if self.blob_service_client is not None:
+            await self.blob_service_client.close()
+            self.blob_service_client = None
+        if self.credential is not None:
+            await self.credential.close()
+            self.credential = None
+
+
+class InMemoryStorageBackend(StorageBackend):
+    """
+    インメモリバックエンド（テスト・ベンチマーク用）
+
+    各操作の中に待機点が無いため、同じイベントループ上では操作単位で原子的。
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._blobs: Dict[str, Tuple[bytes, BlobInfo]] = {}
+
+    def _store(
+        self, blob_name: str, data: bytes, metadata: Optional[Dict[str, str]]
+    ) -> BlobInfo:
+        info = BlobInfo(
+            name=blob_name,
+            etag=f'"{uuid4().hex}"',
+            metadata=dict(metadata or {}),
+            last_modified=datetime.now(timezone.utc),
+        )
+        self._blobs[blob_name] = (bytes(data), info)
+        return info
+
+    async def download(self, blob_name: str) -> Tuple[bytes, BlobInfo]:
+        if blob_name not in self._blobs:
+            raise ResourceNotFoundError(f"Blobが見つかりません: {blob_name}")
+        data, info = self._blobs[blob_name]
+        return data, info.model_copy(deep=True)
+
+    async def upload(
+        self,
+        blob_name: str,
+        data: bytes,
+        metadata: Optional[Dict[str, str]] = None,
+        etag: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> BlobInfo:
+        current = self._blobs.get(blob_name)
+        if etag:
+            if current is None or current[1].etag != etag:
+                raise ResourceModifiedError(f"ETagが一致しません: {blob_name}")
+        elif not overwrite and current is not None:
+            raise ResourceExistsError(f"Blobが既に存在します: {blob_name}")
+        return self._store(blob_name, data, metadata).model_copy(deep=True)
+
+    async def append(self, blob_name: str, data: bytes) -> None:
+        current = self._blobs.get(blob_name)
+        if current is None:
+            self._store(blob_name, data, None)
+        else:
+            self._store(blob_name, current[0] + data, current[1].metadata)
+
+    async def exists(self, blob_name: str) -> bool:
+        return blob_name in self._blobs
+
+    async def list_blobs(self, prefix: Optional[str] = None) -> AsyncIterator[BlobInfo]:
+        for blob_name in sorted(self._blobs):
+            if prefix and not blob_name.startswith(prefix):
+                continue
+            blob = self._blobs.get(blob_name)
+            if blob is not None:
+                yield blob[1].model_copy(deep=True)
+
+    async def delete(self, blob_name: str) -> None:
+        self._blobs.pop(blob_name, None)
+
+    async def get_container_properties(self) -> Dict[str, Any]:
+        return {"last_modified": None, "blob_count": len(self._blobs)}
+
+
+class FileSystemStorageBackend(StorageBackend):
+    """
+    ローカルファイルシステムバックエンド（オフラインでの開発・負荷試験用）
+
+    Blobは <root>/<Blob名> に、ETag・メタデータは <root>/.meta/<Blob名>.json に
+    保存する。排他制御は1プロセス内のみ（複数プロセスでの共有は想定しない）。
+    """
+
+    name = "filesystem"
+
+    META_DIR = ".meta"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(os.path.join(self.root, self.META_DIR), exist_ok=True)
+
+    def _path(self, blob_name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, blob_name))
+        if not path.startswith(self.root + os.sep) or blob_name.startswith(
+            self.META_DIR
+        ):
+            raise ValueError(f"不正なBlob名です: {blob_name}")
+        return path
+
+    def _meta_path(self, blob_name: str) -> str:
+        return os.path.join(self.root, self.META_DIR, blob_name + ".json")
+
+    def _read_info(self, blob_name: str) -> BlobInfo:
+        try:
+            with open(self._meta_path(blob_name), "r", encoding="utf-8") as f:
+                return BlobInfo(name=blob_name, **json.load(f))
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"Blobが見つかりません: {blob_name}")
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _store(
+        self, blob_name: str, data: bytes, metadata: Optional[Dict[str, str]]
+    ) -> BlobInfo:
+        info = BlobInfo(
+            name=blob_name,
+            etag=f'"{uuid4().hex}"',
+            metadata=dict(metadata or {}),
+            last_modified=datetime.now(timezone.utc),
+        )
+        self._write_atomic(self._path(blob_name), data)
+        self._write_atomic(
+            self._meta_path(blob_name),
+            info.model_dump_json(exclude={"name"}).encode("utf-8"),
+        )
+        return info
+
+    async def download(self, blob_name: str) -> Tuple[bytes, BlobInfo]:
+        try:
+            with open(self._path(blob_name), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"Blobが見つかりません: {blob_name}")
+        return data, self._read_info(blob_name)
+
+    async def upload(
+        self,
+        blob_name: str,
+        data: bytes,
+        metadata: Optional[Dict[str, str]] = None,
+        etag: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> BlobInfo:
+        exists = os.path.exists(self._path(blob_name))
+        if etag:
+            if not exists or self._read_info(blob_name).etag != etag:
+                raise ResourceModifiedError(f"ETagが一致しません: {blob_name}")
+        elif not overwrite and exists:
+            raise ResourceExistsError(f"Blobが既に存在します: {blob_name}")
+        return self._store(blob_name, data, metadata)
+
+    async def append(self, blob_name: str, data: bytes) -> None:
+        try:
+            current, info = await self.download(blob_name)
+            self._store(blob_name, current + data, info.metadata)
+        except ResourceNotFoundError:
+            self._store(blob_name, data, None)
+
+    async def exists(self, blob_name: str) -> bool:
+        return os.path.exists(self._path(blob_name))
+
+    async def list_blobs(self, prefix: Optional[str] = None) -> AsyncIterator[BlobInfo]:
+        blob_names = []
+        for directory, subdirectories, files in os.walk(self.root):
+            if directory == self.root:
+                subdirectories[:] = [d for d in subdirectories if d != self.META_DIR]
+            for file_name in files:
+                if file_name.endswith(".tmp"):
+                    continue
+                path = os.path.join(directory, file_name)
+                blob_name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if not prefix or blob_name.startswith(prefix):
+                    blob_names.append(blob_name)
+
+        for blob_name in sorted(blob_names):
+            try:
+                yield self._read_info(blob_name)
+            except ResourceNotFoundError:
+                continue
+
+    async def delete(self, blob_name: str) -> None:
+        for path in (self._path(blob_name), self._meta_path(blob_name)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def get_container_properties(self) -> Dict[str, Any]:
+        return {"root": self.root, "last_modified": None}
+
+
+def create_backend(
+    storage_account_name: Optional[str], container_name: str
+) -> StorageBackend:
+    """
+    環境変数 STORAGE_BACKEND に応じたバックエンドを作成
+
+    - blob（デフォルト）: Azure Blob Storage
+    - filesystem: STORAGE_LOCAL_PATH（デフォルト: .localstorage）配下のファイル
+    - memory: プロセス内のメモリ
+    """
+    kind = os.getenv("STORAGE_BACKEND", "blob").lower()
+
+    if kind == "memory":
+        return InMemoryStorageBackend()
+    if kind == "filesystem":
+        root = os.getenv("STORAGE_LOCAL_PATH", ".localstorage")
+        return FileSystemStorageBackend(os.path.join(root, container_name))
+    if kind == "blob":
+        return BlobStorageBackend(storage_account_name, container_name)
+
+    raise ValueError(f"不明なストレージバックエンドです: {kind}")
@@ -3,27 +3,180 @@ Azure Blob Storage管理クラス
 ヨガレッスン予約データをJSON形式で安全に管理
 """
 
-import json
+import asyncio
+import base64
+import copy
+import hashlib
 import logging
 import os
-from datetime import datetime, timezone
-from typing import Dict, List, Optional, Any
+import random
+import re
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Any,
+    Set,
+    Tuple,
+)
 from uuid import uuid4
 
-from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
-from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
 from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
     ResourceNotFoundError,
     ServiceRequestError,
     ClientAuthenticationError,
 )
 from pydantic import BaseModel, ValidationError
 
+import serializer
+from storage_backends import BlobInfo, StorageBackend, create_backend
+from telemetry import InstrumentedBackend
+
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# 予約ID: "<作成年月YYYYMM>-<uuid4>"（旧形式は作成年月なしのuuid4）
+_RESERVATION_ID_PATTERN = re.compile(
+    r"^(?:(?P<year>\d{4})(?P<month>\d{2})-)?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}"
+    r"-[0-9a-f]{4}-[0-9a-f]{12}$"
+)
+
+
+def _normalize_email(email: str) -> str:
+    """インデックスキー用にメールアドレスを正規化"""
+    return (email or "").strip().lower()
+
+
+def _fold_index_lines(blob_data: bytes) -> List[Dict[str, Any]]:
+    """
+    日付別インデックス（NDJSON）のイベント行を予約ごとの最新状態に畳み込む
+
+    "add" 行で予約エントリを登録し、"status" 行で後からステータスを上書きする。
+    同じ予約の "add" 行が重複しても結果は変わらない。
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    statuses: Dict[str, str] = {}
+
+    for line in blob_data.splitlines():
+        if not line.strip():
+            continue
+        record = serializer.loads(line)
+        op = record.pop("op", "add")
+        if op == "status":
+            statuses[record["id"]] = record["status"]
+        else:
+            entries.setdefault(record["id"], {}).update(record)
+
+    for reservation_id, status in statuses.items():
+        if reservation_id in entries:
+            entries[reservation_id]["status"] = status
+
+    return list(entries.values())
+
+
+def _booking_status(data: Dict[str, Any], booking_date: str) -> str:
+    """予約日ごとのステータス（定期予約はキャンセル済みのレッスン日だけ cancelled）"""
+    if booking_date in data.get("cancelled_dates", ()):
+        return "cancelled"
+    return data.get("status", "confirmed")
+
+
+def _encode_cursor(created_at: str, reservation_id: str) -> str:
+    """ページングの継続トークン（最後に返した予約の作成日時とID）を作成"""
+    token = base64.urlsafe_b64encode(serializer.dumps([created_at, reservation_id]))
+    return token.decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """継続トークンを (作成日時, 予約ID) に戻す（不正な場合はValueError）"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, reservation_id = serializer.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+        )
+    except Exception:
+        raise ValueError("継続トークンが正しくありません")
+    if not isinstance(created_at, str) or not isinstance(reservation_id, str):
+        raise ValueError("継続トークンが正しくありません")
+    return created_at, reservation_id
+
+
+async def _azip(items: Iterable[Any], results: AsyncIterator[Any]):
+    """同期イテラブルと非同期イテレータを先頭から対にして返す"""
+    iterator = iter(items)
+    async for result in results:
+        yield next(iterator), result
+
+
+class TTLCache:
+    """
+    件数上限付きのLRU/TTLキャッシュ（Functionインスタンス内）
+
+    取得時・格納時にディープコピーするため、呼び出し側で値を変更しても
+    キャッシュの内容には影響しない。
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """キャッシュから取得（無い・期限切れの場合はNone）"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: str, value: Any) -> None:
+        """キャッシュに格納（上限を超えた場合は最も古いエントリを破棄）"""
+        if not self.enabled:
+            return
+
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str) -> None:
+        """エントリを削除"""
+        self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {**self.stats, "size": len(self._entries)}
+
+
+class ConcurrentUpdateError(Exception):
+    """条件付き書き込みがリトライ上限まで競合し続けた場合の例外"""
+
+
 class ReservationModel(BaseModel):
     """予約データのバリデーションモデル"""
 
@@ -39,6 +192,22 @@ class ReservationModel(BaseModel):
     status: str = "confirmed"  # confirmed, cancelled, completed
 
 
+class ReservationSeriesModel(BaseModel):
+    """定期予約データのバリデーションモデル"""
+
+    id: str
+    class_name: str
+    class_schedule: str
+    booking_dates: List[str]
+    customer_name: str
+    customer_email: str
+    customer_phone: str
+    booking_notes: Optional[str] = ""
+    created_at: str
+    status: str = "confirmed"  # confirmed, cancelled（全レッスン回をキャンセル済み）
+    cancelled_dates: List[str] = []  # キャンセル済みのレッスン日
+
+
 class StorageManager:
     """
     Azure Blob Storageを使用した予約データ管理クラス
@@ -47,10 +216,50 @@ class StorageManager:
     - Managed Identityによる認証
     - 暗号化された通信
     - アクセス制御
+
+    Blobの読み書きは StorageBackend に委譲するため、ローカルファイル・
+    インメモリのバックエンドに差し替えてオフラインで動かすこともできる。
     """
 
+    # 条件付き書き込み（ETag）のリトライ設定
+    CONDITIONAL_MAX_ATTEMPTS = 5
+    CONDITIONAL_BACKOFF_BASE = 0.05  # 秒
+    CONDITIONAL_BACKOFF_MAX = 1.0  # 秒
+
+    # 旧形式の予約IDを探索する過去の月数
+    LEGACY_ID_PROBE_MONTHS = 12
+
+    # 複数予約を取得する際の同時ダウンロード数
+    DEFAULT_MAX_CONCURRENCY = 8
+
+    # 読み取りキャッシュのデフォルト設定
+    DEFAULT_CACHE_MAX_ENTRIES = 1024
+    DEFAULT_CACHE_TTL_SECONDS = 30.0
+
+    # インデックス更新の write-behind 設定
+    DEFAULT_INDEX_FLUSH_INTERVAL_SECONDS = 0.5
+    DEFAULT_INDEX_FLUSH_MAX_PENDING = 200
+    WRITE_BEHIND_STATE_PREFIX = "index/write_behind/"
+    # 未反映の更新を記録したインスタンスが停止したとみなすまでの時間（秒）
+    WRITE_BEHIND_STALE_SECONDS = 30.0
+    # 再構築対象の予約Blobを選ぶ際に見込むインスタンスとストレージの時計のずれ（秒）
+    WRITE_BEHIND_CLOCK_SKEW_SECONDS = 60.0
+
+    # インデックス再構築ジョブの設定
+    # 初回・全件再構築で走査する過去の月数
+    RECONCILE_FULL_MONTHS = 24
+    # 差分再構築で走査する月の範囲（前回実行より前に作成された予約のキャンセルを拾う）
+    RECONCILE_LOOKBACK_DAYS = 120
+    # 直近に更新されたカウンターは処理中の予約があり得るため数え直さない（秒）
+    RECONCILE_SETTLE_SECONDS = 300.0
+
     def __init__(
-        self, storage_account_name: str = None, container_name: str = "reservations"
+        self,
+        storage_account_name: str = None,
+        container_name: str = "reservations",
+        max_concurrency: Optional[int] = None,
+        backend: Optional[StorageBackend] = None,
+        write_behind: Optional[bool] = None,
     ):
         """
         ストレージマネージャーの初期化
@@ -58,76 +267,211 @@ class StorageManager:
         Args:
             storage_account_name: ストレージアカウント名（環境変数から取得も可能）
             container_name: コンテナ名（デフォルト: reservations）
+            max_concurrency: 複数予約取得時の同時ダウンロード数
+                （環境変数 AZURE_STORAGE_MAX_CONCURRENCY からも設定可能）
+            backend: ストレージバックエンド（省略時は環境変数 STORAGE_BACKEND に従う）
+            write_behind: インデックス・検索用データの更新をまとめて後から書き込むか
+                （環境変数 INDEX_WRITE_BEHIND からも設定可能）
         """
         self.storage_account_name = storage_account_name or os.getenv(
             "AZURE_STORAGE_ACCOUNT_NAME"
         )
         self.container_name = container_name
+        self.max_concurrency = max(
+            1,
+            max_concurrency
+            or int(
+                os.getenv("AZURE_STORAGE_MAX_CONCURRENCY", self.DEFAULT_MAX_CONCURRENCY)
+            ),
+        )
 
-        if not self.storage_account_name:
-            raise ValueError("ストレージアカウント名が設定されていません")
-
-        # Managed Identityを使用した認証（セキュリティベストプラクティス）
-        try:
-            self.credential = ManagedIdentityCredential()
-            # フォールバック: ローカル開発環境用
-            if not self._test_credential():
-                self.credential = DefaultAzureCredential()
-        except Exception:
-            self.credential = DefaultAzureCredential()
-
-        # Blob Service Clientの初期化
-        account_url = f"https://{self.storage_account_name}.blob.core.windows.net"
-        self.blob_service_client = BlobServiceClient(
-            account_url=account_url, credential=self.credential
+        # 予約データ・メール検索結果の読み取りキャッシュ
+        # （他インスタンスでの更新はTTLの範囲で反映が遅れる）
+        cache_max_entries = int(
+            os.getenv("RESERVATION_CACHE_MAX_ENTRIES", self.DEFAULT_CACHE_MAX_ENTRIES)
+        )
+        cache_ttl_seconds = float(
+            os.getenv("RESERVATION_CACHE_TTL_SECONDS", self.DEFAULT_CACHE_TTL_SECONDS)
+        )
+        self._reservation_cache = TTLCache(cache_max_entries, cache_ttl_seconds)
+        self._search_cache = TTLCache(cache_max_entries, cache_ttl_seconds)
+
+        # 条件付き書き込みの競合統計
+        self.concurrency_stats = {
+            "writes": 0,
+            "conflicts": 0,
+            "retries": 0,
+            "exhausted": 0,
+        }
+
+        self.backend = backend or create_backend(
+            self.storage_account_name, self.container_name
+        )
+        # 各ストレージ操作のレイテンシ計測（STORAGE_METRICS_ENABLED=false で無効化）
+        if os.getenv("STORAGE_METRICS_ENABLED", "true").lower() != "false":
+            self.backend = InstrumentedBackend(self.backend)
+
+        # カレンダー文書への反映待ちのカウンター（同時に来た更新を1回の書き込みにまとめる）
+        self._pending_calendar: Dict[str, Dict[str, Any]] = {}
+        self._calendar_lock = asyncio.Lock()
+
+        # write-behind: 予約Blobだけを同期的に書き込み、日付別・メール別インデックスと
+        # カレンダーの更新はインスタンス内に溜めて一定間隔・一定件数ごとにまとめて書き込む
+        if write_behind is None:
+            write_behind = os.getenv("INDEX_WRITE_BEHIND", "false").lower() == "true"
+        self.write_behind = write_behind
+        self.index_flush_interval = float(
+            os.getenv(
+                "INDEX_FLUSH_INTERVAL_SECONDS",
+                self.DEFAULT_INDEX_FLUSH_INTERVAL_SECONDS,
+            )
+        )
+        self.index_flush_max_pending = int(
+            os.getenv("INDEX_FLUSH_MAX_PENDING", self.DEFAULT_INDEX_FLUSH_MAX_PENDING)
         )
+        self._instance_id = uuid4().hex
+        self._pending_lines: Dict[str, List[bytes]] = {}
+        self._pending_email: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._pending_count = 0
+        # 書き込み中のバッファ（書き込みが終わるまで読み取りに反映する）
+        self._flushing_lines: Dict[str, List[bytes]] = {}
+        self._flushing_email: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._background_tasks: Set[asyncio.Task] = set()
+        # 未反映の更新がある間、再構築の手がかり（開始時刻と予約Blobのプレフィックス）を
+        # 状態Blobに記録しておく（インスタンスが停止しても他のインスタンスが再構築できる）
+        self._pending_since: Optional[str] = None
+        self._pending_prefixes: Set[str] = set()
+        self._inflight_writes = 0
+        self._state_written_at = 0.0
+        self._state_lock = asyncio.Lock()
+        self._reconciled = False
+        self.write_behind_stats = {
+            "queued": 0,
+            "flushes": 0,
+            "shard_writes": 0,
+            "email_writes": 0,
+            "requeued": 0,
+            "reconciled": 0,
+        }
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        コールドスタート対策のウォームアップ
 
-        # コンテナの初期化
-        self._ensure_container_exists()
+        認証情報・クライアントの初期化とコネクションの確立を先に済ませ、
+        最初の利用者リクエストに初期化の待ち時間が乗らないようにする。
 
-    def _test_credential(self) -> bool:
-        """認証情報のテスト"""
-        try:
-            # 簡単な認証テスト
-            self.credential.get_token("https://storage.azure.com/.default")
-            return True
-        except Exception:
-            return False
+        Returns:
+            Dict: 各段階の所要時間（ミリ秒）
+        """
+        timings = await self.backend.warm_up()
+        if self.write_behind and not self._reconciled:
+            started = time.perf_counter()
+            self._reconciled = True
+            await self.reconcile_index_updates()
+            timings["reconcile_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return timings
+
+    async def close(self) -> None:
+        """未反映のインデックス更新を書き込み、バックエンドのコネクションを閉じる"""
+        if self.write_behind:
+            await self.flush_index_updates()
+        await self.backend.close()
+
+    def _generate_reservation_id(self, created_at: datetime) -> str:
+        """作成年月を埋め込んだ予約IDを生成（IDだけでBlobの位置が決まる）"""
+        return f"{created_at.strftime('%Y%m')}-{uuid4()}"
+
+    def _get_blob_name(self, reservation_id: str) -> Optional[str]:
+        """
+        予約IDからBlob名を生成
 
-    def _ensure_container_exists(self) -> None:
-        """コンテナが存在することを確認し、なければ作成"""
-        try:
-            container_client = self.blob_service_client.get_container_client(
-                self.container_name
-            )
-            container_client.get_container_properties()
-            logger.info(f"コンテナ '{self.container_name}' が存在します")
-        except ResourceNotFoundError:
-            try:
-                self.blob_service_client.create_container(self.container_name)
-                logger.info(f"コンテナ '{self.container_name}' を作成しました")
-            except Exception as e:
-                logger.error(f"コンテナ作成エラー: {e}")
-                raise
-        except Exception as e:
-            logger.error(f"コンテナ確認エラー: {e}")
-            raise
+        Returns:
+            Optional[str]: Blob名（作成年月を含まない旧形式・不正なIDの場合はNone）
+        """
+        match = _RESERVATION_ID_PATTERN.match(reservation_id or "")
+        if not match or not match.group("year"):
+            return None
+        return f"{match.group('year')}/{match.group('month')}/{reservation_id}.json"
 
-    def _get_blob_name(self, reservation_id: str) -> str:
-        """予約IDからBlob名を生成"""
-        date_prefix = datetime.now(timezone.utc).strftime("%Y/%m")
-        return f"{date_prefix}/{reservation_id}.json"
+    async def _resolve_blob_name(self, reservation_id: str) -> Optional[str]:
+        """
+        予約IDから既存のBlob名を解決
 
-    def _get_index_blob_name(self) -> str:
-        """インデックスファイルのBlob名"""
-        return "index/reservations_index.json"
+        新形式のIDはIDから直接求める。作成年月を含まない旧形式のIDは
+        直近 LEGACY_ID_PROBE_MONTHS か月分のパスを並行して確認する。
 
-    async def save_reservation(self, reservation_data: Dict[str, Any]) -> str:
+        Returns:
+            Optional[str]: Blob名（見つからない場合はNone）
+        """
+        blob_name = self._get_blob_name(reservation_id)
+        if blob_name:
+            return blob_name
+
+        if not _RESERVATION_ID_PATTERN.match(reservation_id or ""):
+            return None
+
+        now = datetime.now(timezone.utc)
+        candidates = []
+        for offset in range(self.LEGACY_ID_PROBE_MONTHS):
+            year, month = divmod(now.year * 12 + now.month - 1 - offset, 12)
+            candidates.append(f"{year:04d}/{month + 1:02d}/{reservation_id}.json")
+
+        found = await asyncio.gather(*(self.backend.exists(c) for c in candidates))
+        for candidate, is_found in zip(candidates, found):
+            if is_found:
+                return candidate
+        return None
+
+    def _get_series_blob_name(self, series_id: str) -> Optional[str]:
+        """定期予約IDからBlob名を生成（不正なIDの場合はNone）"""
+        match = _RESERVATION_ID_PATTERN.match(series_id or "")
+        if not match or not match.group("year"):
+            return None
+        return f"series/{match.group('year')}/{match.group('month')}/{series_id}.json"
+
+    def _get_date_index_blob_name(self, booking_date: str) -> str:
+        """予約日別インデックスシャード（Append Blob）のBlob名"""
+        return f"index/dates/{booking_date}.ndjson"
+
+    def _get_counter_blob_name(self, class_type: str, booking_date: str) -> str:
+        """レッスン回（クラス×日付）ごとの予約数カウンターのBlob名"""
+        return f"counters/{class_type}/{booking_date}.json"
+
+    def _get_calendar_blob_name(self) -> str:
+        """全レッスン回の予約数をまとめたカレンダー文書のBlob名"""
+        return "index/calendar.json"
+
+    def _get_write_behind_state_blob_name(self, instance_id: str) -> str:
+        """write-behind の未反映状態を記録するBlob名（インスタンスごと）"""
+        return f"{self.WRITE_BEHIND_STATE_PREFIX}{instance_id}.json"
+
+    def _get_reconcile_checkpoint_blob_name(self) -> str:
+        """インデックス再構築ジョブのチェックポイントのBlob名"""
+        return "index/reconcile/checkpoint.json"
+
+    def _get_idempotency_blob_name(self, idempotency_key: str) -> str:
+        """冪等キーの記録のBlob名（キーのハッシュ）"""
+        key_hash = hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()
+        return f"idempotency/{key_hash}.json"
+
+    def _get_email_index_blob_name(self, email: str) -> str:
+        """メールアドレス別インデックスのBlob名（正規化したメールのハッシュ）"""
+        email_hash = hashlib.sha256(_normalize_email(email).encode("utf-8")).hexdigest()
+        return f"index/email/{email_hash}.json"
+
+    async def save_reservation(
+        self, reservation_data: Dict[str, Any], reservation_id: Optional[str] = None
+    ) -> str:
         """
         予約データを保存
 
         Args:
             reservation_data: 予約データ辞書
+            reservation_id: 予約ID（冪等キーの記録で払い出し済みの場合に指定。
+                同じIDの予約が既にあれば上書きせずエラーにする）
 
         Returns:
             str: 予約ID
@@ -137,50 +481,356 @@ class StorageManager:
             ServiceRequestError: Azure Storage エラー
         """
         try:
-            # 予約IDの生成
-            reservation_id = str(uuid4())
+            reservation, blob_name = self._prepare_reservation(
+                reservation_data, datetime.now(timezone.utc), reservation_id
+            )
 
-            # 現在時刻の追加
-            current_time = datetime.now(timezone.utc).isoformat()
-            reservation_data.update({"id": reservation_id, "created_at": current_time})
+            json_data = reservation.model_dump()
+            async with self._index_write_scope([blob_name]):
+                # JSON形式でシリアライズしてBlobに保存
+                await self.backend.upload(
+                    blob_name,
+                    serializer.dumps_blob(json_data),
+                    metadata=self._get_blob_metadata(reservation),
+                    overwrite=reservation_id is None,
+                )
 
-            # データバリデーション
-            reservation = ReservationModel(**reservation_data)
+                # インデックスの更新
+                await self._write_index_updates(
+                    {
+                        reservation.booking_date: [
+                            self._get_index_line(reservation, blob_name)
+                        ]
+                    },
+                    {
+                        _normalize_email(reservation.customer_email): [
+                            self._get_email_index_entry(reservation, blob_name)
+                        ]
+                    },
+                )
 
-            # JSON形式でシリアライズ
-            json_data = reservation.model_dump()
-            blob_data = json.dumps(json_data, ensure_ascii=False, indent=2)
+            # キャッシュの更新
+            self._reservation_cache.set(reservation.id, json_data)
+            self._search_cache.invalidate(_normalize_email(reservation.customer_email))
 
-            # Blobに保存
-            blob_name = self._get_blob_name(reservation_id)
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, blob=blob_name
-            )
+            logger.info(f"予約保存完了: {reservation.id}")
+            return reservation.id
 
-            # メタデータの追加
-            metadata = {
-                "customer_email": reservation.customer_email,
-                "class_name": reservation.class_name,
-                "booking_date": reservation.booking_date,
-                "created_at": current_time,
-            }
+        except ValidationError as e:
+            logger.error(f"データバリデーションエラー: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"予約保存エラー: {e}")
+            raise ServiceRequestError(f"予約の保存に失敗しました: {e}")
 
-            blob_client.upload_blob(
-                blob_data, metadata=metadata, overwrite=True, encoding="utf-8"
-            )
+    async def save_reservations(
+        self, reservations_data: List[Dict[str, Any]]
+    ) -> List[Optional[str]]:
+        """
+        複数の予約データをまとめて保存
 
-            # インデックスの更新
-            await self._update_index(reservation)
+        予約Blobは同時実行数を制限して並行アップロードし、インデックスは
+        予約日シャードごとに1回の追記、メールアドレスごとに1回の更新で反映する。
 
-            logger.info(f"予約保存完了: {reservation_id}")
-            return reservation_id
+        Args:
+            reservations_data: 予約データ辞書のリスト
+
+        Returns:
+            List[Optional[str]]: 予約ID（入力と同じ順序、保存に失敗した場合はNone）
+        """
+        now = datetime.now(timezone.utc)
+        prepared: List[Optional[Tuple[ReservationModel, str]]] = []
+        for reservation_data in reservations_data:
+            try:
+                prepared.append(self._prepare_reservation(reservation_data, now))
+            except ValidationError as e:
+                logger.error(f"データバリデーションエラー: {e}")
+                prepared.append(None)
+
+        async def upload(
+            item: Optional[Tuple[ReservationModel, str]],
+        ) -> Optional[Tuple[ReservationModel, str]]:
+            if item is None:
+                return None
+            reservation, blob_name = item
+            try:
+                await self.backend.upload(
+                    blob_name,
+                    serializer.dumps_blob(reservation.model_dump()),
+                    metadata=self._get_blob_metadata(reservation),
+                )
+            except Exception as e:
+                logger.error(f"予約保存エラー: {e}")
+                return None
+            return item
+
+        async with self._index_write_scope(item[1] for item in filter(None, prepared)):
+            saved = [
+                item async for item in self._bounded_in_order(map(upload, prepared))
+            ]
+
+            # インデックス行・エントリを予約日・メールアドレスごとにまとめる
+            lines_by_date: Dict[str, List[bytes]] = {}
+            entries_by_email: Dict[str, List[Dict[str, Any]]] = {}
+            for reservation, blob_name in filter(None, saved):
+                lines_by_date.setdefault(reservation.booking_date, []).append(
+                    self._get_index_line(reservation, blob_name)
+                )
+                entries_by_email.setdefault(
+                    _normalize_email(reservation.customer_email), []
+                ).append(self._get_email_index_entry(reservation, blob_name))
+
+            await self._write_index_updates(lines_by_date, entries_by_email)
+
+        # キャッシュの更新
+        for reservation, _ in filter(None, saved):
+            self._reservation_cache.set(reservation.id, reservation.model_dump())
+        for email in entries_by_email:
+            self._search_cache.invalidate(email)
+
+        saved_count = sum(1 for item in saved if item)
+        logger.info(f"予約一括保存完了: {saved_count}/{len(reservations_data)}件")
+        return [item[0].id if item else None for item in saved]
+
+    async def save_series(self, series_data: Dict[str, Any]) -> str:
+        """
+        定期予約を1件のレコードとして保存
+
+        各レッスン日の日付別インデックスに1行ずつ追記し、メール別インデックスには
+        定期予約1件として登録する。
+
+        Args:
+            series_data: 定期予約データ（booking_dates にレッスン日のリスト）
+
+        Returns:
+            str: 定期予約ID
+
+        Raises:
+            ValidationError: データバリデーションエラー
+            ServiceRequestError: Azure Storage エラー
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            series_id = self._generate_reservation_id(now)
+            series_data.update({"id": series_id, "created_at": now.isoformat()})
+
+            # データバリデーション
+            series = ReservationSeriesModel(**series_data)
+            blob_name = self._get_series_blob_name(series_id)
+
+            async with self._index_write_scope([blob_name]):
+                await self.backend.upload(
+                    blob_name,
+                    serializer.dumps_blob(series.model_dump()),
+                    metadata={
+                        "customer_email": series.customer_email,
+                        "class_name": series.class_name,
+                        "created_at": series.created_at,
+                    },
+                )
+
+                # インデックスの更新（レッスン日ごとに1行、メール別には1件）
+                await self._write_index_updates(
+                    {
+                        booking_date: [
+                            self._get_index_line(
+                                ReservationModel(
+                                    **series_data, booking_date=booking_date
+                                ),
+                                blob_name,
+                            )
+                        ]
+                        for booking_date in series.booking_dates
+                    },
+                    {
+                        _normalize_email(series.customer_email): [
+                            {
+                                "id": series.id,
+                                "blob_name": blob_name,
+                                "created_at": series.created_at,
+                                "status": series.status,
+                            }
+                        ]
+                    },
+                )
+            self._search_cache.invalidate(_normalize_email(series.customer_email))
+
+            logger.info(f"定期予約保存完了: {series_id}")
+            return series_id
 
         except ValidationError as e:
             logger.error(f"データバリデーションエラー: {e}")
             raise
         except Exception as e:
-            logger.error(f"予約保存エラー: {e}")
-            raise ServiceRequestError(f"予約の保存に失敗しました: {e}")
+            logger.error(f"定期予約保存エラー: {e}")
+            raise ServiceRequestError(f"定期予約の保存に失敗しました: {e}")
+
+    async def get_series(self, series_id: str) -> Optional[Dict[str, Any]]:
+        """
+        定期予約データを取得
+
+        Args:
+            series_id: 定期予約ID
+
+        Returns:
+            Optional[Dict]: 定期予約データ（見つからない場合はNone）
+        """
+        blob_name = self._get_series_blob_name(series_id)
+        if not blob_name:
+            logger.warning(f"定期予約が見つかりません: {series_id}")
+            return None
+        return await self._download_json(blob_name)
+
+    async def load_series(
+        self, series_id: str
+    ) -> Optional[Tuple[Dict[str, Any], BlobInfo]]:
+        """
+        定期予約データをETag付きで取得（キャンセル前の読み取り用）
+
+        Args:
+            series_id: 定期予約ID
+
+        Returns:
+            Optional[Tuple[Dict, BlobInfo]]: 定期予約データとBlobのプロパティ
+            （見つからない場合はNone）
+        """
+        blob_name = self._get_series_blob_name(series_id)
+        if not blob_name:
+            return None
+        try:
+            blob_data, info = await self.backend.download(blob_name)
+        except ResourceNotFoundError:
+            logger.warning(f"定期予約が見つかりません: {series_id}")
+            return None
+        return serializer.loads(blob_data), info
+
+    async def cancel_series_dates(
+        self, series_id: str, after_date: str, release_class_type: Optional[str]
+    ) -> List[str]:
+        """
+        定期予約のうち after_date より後のレッスン回をキャンセル
+
+        キャンセルしたレッスン日を cancelled_dates に加え（全レッスン回が
+        キャンセル済みになれば定期予約のステータスも cancelled にする）、
+        ETagを条件に1回の書き込みで保存する。続けてレッスン日ごとの
+        日付別インデックスとメール別インデックスを更新し、
+        release_class_type を指定した場合は各レッスン回の予約枠を解放する。
+
+        Args:
+            series_id: 定期予約ID
+            after_date: この日（YYYY-MM-DD形式）より後のレッスン回だけをキャンセル
+            release_class_type: 予約枠を解放するクラスタイプ
+
+        Returns:
+            List[str]: 新たにキャンセルしたレッスン日（無い場合は空）
+
+        Raises:
+            ConcurrentUpdateError: リトライ上限まで競合が続いた場合
+        """
+        blob_name = self._get_series_blob_name(series_id)
+        cancelled: List[str] = []
+
+        def cancel_dates(current: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            nonlocal cancelled
+            if not current:
+                return None
+            done = set(current.get("cancelled_dates", []))
+            cancelled = [
+                booking_date
+                for booking_date in current["booking_dates"]
+                if booking_date > after_date and booking_date not in done
+            ]
+            if not cancelled:
+                return None
+
+            current = {
+                **current,
+                "cancelled_dates": sorted(done.union(cancelled)),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            if set(current["booking_dates"]) <= set(current["cancelled_dates"]):
+                current["status"] = "cancelled"
+            return ReservationSeriesModel(**current).model_dump()
+
+        async with self._index_write_scope([blob_name]):
+            series_data = await self._conditional_update(blob_name, cancel_dates)
+            if series_data is None:
+                return []
+
+            # インデックス更新と予約枠の解放を並行して行う
+            lines_by_date = {
+                booking_date: [
+                    self._get_index_line(
+                        ReservationModel(
+                            **{
+                                **series_data,
+                                "booking_date": booking_date,
+                                "status": "cancelled",
+                            }
+                        ),
+                        blob_name,
+                        "status",
+                    )
+                ]
+                for booking_date in cancelled
+            }
+            email = _normalize_email(series_data["customer_email"])
+            follow_ups = [
+                self._write_index_updates(
+                    lines_by_date,
+                    {
+                        email: [
+                            {
+                                "id": series_data["id"],
+                                "blob_name": blob_name,
+                                "created_at": series_data["created_at"],
+                                "status": series_data["status"],
+                            }
+                        ]
+                    },
+                )
+            ]
+            if release_class_type:
+                follow_ups.extend(
+                    self.release_slots(release_class_type, booking_date)
+                    for booking_date in cancelled
+                )
+            for result in await asyncio.gather(*follow_ups, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.warning(f"定員カウンター更新失敗: {result}")
+
+        self._search_cache.invalidate(email)
+        logger.info(f"定期予約キャンセル完了: {series_id} ({len(cancelled)}回)")
+        return cancelled
+
+    def _prepare_reservation(
+        self,
+        reservation_data: Dict[str, Any],
+        now: datetime,
+        reservation_id: Optional[str] = None,
+    ) -> Tuple[ReservationModel, str]:
+        """
+        予約IDと作成日時を付与してバリデーションし、保存先のBlob名を決める
+
+        Raises:
+            ValidationError: データバリデーションエラー
+        """
+        # 予約IDの生成（作成年月を埋め込む）
+        reservation_id = reservation_id or self._generate_reservation_id(now)
+        reservation_data.update({"id": reservation_id, "created_at": now.isoformat()})
+
+        # データバリデーション
+        reservation = ReservationModel(**reservation_data)
+        return reservation, self._get_blob_name(reservation_id)
+
+    def _get_blob_metadata(self, reservation: ReservationModel) -> Dict[str, str]:
+        """予約Blobのメタデータ"""
+        return {
+            "customer_email": reservation.customer_email,
+            "class_name": reservation.class_name,
+            "booking_date": reservation.booking_date,
+            "created_at": reservation.created_at,
+        }
 
     async def get_reservation(self, reservation_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -193,13 +843,20 @@ class StorageManager:
             Optional[Dict]: 予約データ（見つからない場合はNone）
         """
         try:
-            blob_name = self._get_blob_name(reservation_id)
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, blob=blob_name
-            )
+            cached = self._reservation_cache.get(reservation_id)
+            if cached is not None:
+                return cached
+
+            blob_name = await self._resolve_blob_name(reservation_id)
+            if not blob_name:
+                logger.warning(f"予約が見つかりません: {reservation_id}")
+                return None
 
-            blob_data = blob_client.download_blob().readall()
-            return json.loads(blob_data.decode("utf-8"))
+            blob_data, _ = await self.backend.download(blob_name)
+            reservation_data = serializer.loads(blob_data)
+
+            self._reservation_cache.set(reservation_id, reservation_data)
+            return reservation_data
 
         except ResourceNotFoundError:
             logger.warning(f"予約が見つかりません: {reservation_id}")
@@ -210,45 +867,193 @@ class StorageManager:
 
     async def get_reservations_by_email(self, email: str) -> List[Dict[str, Any]]:
         """
-        メールアドレスで予約を検索
+        メールアドレスで予約を検索（全件）
 
         Args:
             email: 顧客のメールアドレス
 
         Returns:
-            List[Dict]: 予約データのリスト
+            List[Dict]: 予約データのリスト（作成日時の新しい順）
         """
-        try:
-            reservations = []
-            container_client = self.blob_service_client.get_container_client(
-                self.container_name
-            )
+        reservations, _ = await self.get_reservations_by_email_page(email)
+        return reservations
+
+    async def get_reservations_by_email_page(
+        self, email: str, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        メールアドレスで予約を作成日時の新しい順に1ページ分検索
+
+        メール別インデックスの (created_at, id) の順序で位置を決め、
+        そのページに含まれる予約Blobだけをダウンロードする。
+
+        Args:
+            email: 顧客のメールアドレス
+            limit: 1ページの件数（省略時は全件）
+            cursor: 前のページが返した継続トークン
+
+        Returns:
+            Tuple[List[Dict], Optional[str]]: 予約データのリストと次ページの
+            継続トークン（最後のページの場合はNone）
 
-            # メタデータでフィルタリング
-            blob_list = container_client.list_blobs(include=["metadata"])
+        Raises:
+            ValueError: 継続トークンが不正な場合
+        """
+        position = _decode_cursor(cursor) if cursor else None
 
-            for blob in blob_list:
-                if (
-                    blob.metadata
-                    and blob.metadata.get("customer_email", "").lower() == email.lower()
-                    and not blob.name.startswith("index/")
-                ):
+        try:
+            entries = await self._get_sorted_email_entries(email)
+            if position:
+                entries = [
+                    entry
+                    for entry in entries
+                    if (entry.get("created_at", ""), entry["id"]) < position
+                ]
+
+            page = entries if limit is None else entries[:limit]
+            next_cursor = None
+            if len(page) < len(entries):
+                next_cursor = _encode_cursor(
+                    page[-1].get("created_at", ""), page[-1]["id"]
+                )
 
-                    blob_client = container_client.get_blob_client(blob.name)
-                    blob_data = blob_client.download_blob().readall()
-                    reservation_data = json.loads(blob_data.decode("utf-8"))
-                    reservations.append(reservation_data)
+            # 読み取りキャッシュに無い予約Blobだけをダウンロード
+            # （定期予約はIDで予約として取得されないようキャッシュしない）
+            cached = {}
+            for entry in page:
+                if not entry["blob_name"].startswith("series/"):
+                    reservation_data = self._reservation_cache.get(entry["id"])
+                    if reservation_data is not None:
+                        cached[entry["id"]] = reservation_data
+
+            missing = [entry for entry in page if entry["id"] not in cached]
+            async for entry, reservation_data in _azip(
+                missing,
+                self._iter_json_blobs(entry["blob_name"] for entry in missing),
+            ):
+                cached[entry["id"]] = reservation_data
+                if reservation_data and not entry["blob_name"].startswith("series/"):
+                    self._reservation_cache.set(entry["id"], reservation_data)
 
-            # 作成日時でソート（新しい順）
-            reservations.sort(key=lambda x: x.get("created_at", ""), reverse=True)
+            reservations = []
+            for entry in page:
+                reservation_data = cached.get(entry["id"])
+                if reservation_data is None:
+                    logger.warning(f"インデックスの予約が見つかりません: {entry['id']}")
+                    continue
+                reservations.append(reservation_data)
 
             logger.info(f"メール検索結果: {email} - {len(reservations)}件")
-            return reservations
+            return reservations, next_cursor
 
         except Exception as e:
             logger.error(f"メール検索エラー: {e}")
             raise ServiceRequestError(f"予約の検索に失敗しました: {e}")
 
+    async def _get_sorted_email_entries(self, email: str) -> List[Dict[str, Any]]:
+        """メール別インデックスのエントリを作成日時の新しい順で取得（キャッシュ付き）"""
+        cache_key = _normalize_email(email)
+        entries = self._search_cache.get(cache_key)
+        if entries is None:
+            index_data = await self._read_email_index(email)
+            entries = sorted(
+                index_data["reservations"],
+                key=lambda x: (x.get("created_at", ""), x["id"]),
+                reverse=True,
+            )
+            self._search_cache.set(cache_key, entries)
+
+        # write-behind で未反映のエントリも反映して返す
+        pending = {
+            **self._flushing_email.get(cache_key, {}),
+            **self._pending_email.get(cache_key, {}),
+        }
+        if pending:
+            entries = sorted(
+                [entry for entry in entries if entry["id"] not in pending]
+                + list(pending.values()),
+                key=lambda x: (x.get("created_at", ""), x["id"]),
+                reverse=True,
+            )
+        return entries
+
+    async def get_reservations(
+        self, reservation_ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        複数の予約データを並行して取得
+
+        Args:
+            reservation_ids: 予約IDのリスト
+
+        Returns:
+            List[Optional[Dict]]: 予約データのリスト（IDと同じ順序、見つからない場合はNone）
+        """
+        return [
+            reservation async for reservation in self.iter_reservations(reservation_ids)
+        ]
+
+    async def iter_reservations(
+        self, reservation_ids: Iterable[str]
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        複数の予約データを同時実行数を制限して並行取得し、IDの順に返す
+
+        Args:
+            reservation_ids: 予約IDのリスト
+
+        Yields:
+            Optional[Dict]: 予約データ（見つからない場合はNone）
+        """
+
+        async def download(reservation_id: str) -> Optional[Dict[str, Any]]:
+            blob_name = await self._resolve_blob_name(reservation_id)
+            if not blob_name:
+                return None
+            return await self._download_json(blob_name)
+
+        async for reservation in self._bounded_in_order(
+            download(reservation_id) for reservation_id in reservation_ids
+        ):
+            yield reservation
+
+    async def _iter_json_blobs(
+        self, blob_names: Iterable[str]
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Blob名のリストから並行ダウンロードし、指定順にJSONを返す"""
+        async for data in self._bounded_in_order(
+            self._download_json(blob_name) for blob_name in blob_names
+        ):
+            yield data
+
+    async def _bounded_in_order(self, coroutines: Iterable) -> AsyncIterator[Any]:
+        """
+        最大 max_concurrency 件のコルーチンを同時に実行し、投入順に結果を返す
+
+        先頭の結果が揃い次第返すため、全件のダウンロード完了を待たずに
+        呼び出し側で処理を始められる。
+        """
+        pending: deque = deque()
+        try:
+            for coroutine in coroutines:
+                pending.append(asyncio.ensure_future(coroutine))
+                if len(pending) >= self.max_concurrency:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            # 途中で中断された場合は残りのダウンロードを取り消す
+            for task in pending:
+                task.cancel()
+
+    async def _download_json(self, blob_name: str) -> Optional[Dict[str, Any]]:
+        """JSON Blobをダウンロード（存在しない場合はNone）"""
+        try:
+            blob_data, _ = await self.backend.download(blob_name)
+        except ResourceNotFoundError:
+            return None
+        return serializer.loads(blob_data)
+
     async def update_reservation_status(self, reservation_id: str, status: str) -> bool:
         """
         予約ステータスを更新
@@ -261,28 +1066,34 @@ class StorageManager:
             bool: 更新成功フラグ
         """
         try:
-            # 既存データを取得
-            reservation_data = await self.get_reservation(reservation_id)
-            if not reservation_data:
+            blob_name = await self._resolve_blob_name(reservation_id)
+            if not blob_name:
+                logger.warning(f"予約が見つかりません: {reservation_id}")
                 return False
 
-            # ステータス更新
-            reservation_data["status"] = status
-            reservation_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+            def apply_status(
+                reservation_data: Optional[Dict[str, Any]],
+            ) -> Optional[Dict[str, Any]]:
+                if not reservation_data:
+                    return None
 
-            # データバリデーション
-            reservation = ReservationModel(**reservation_data)
+                # ステータス更新
+                reservation_data["status"] = status
+                reservation_data["updated_at"] = datetime.now(timezone.utc).isoformat()
 
-            # 保存
-            blob_name = self._get_blob_name(reservation_id)
-            blob_client = self.blob_service_client.get_blob_client(
-                container=self.container_name, blob=blob_name
-            )
+                # データバリデーション
+                return ReservationModel(**reservation_data).model_dump()
 
-            json_data = reservation.model_dump()
-            blob_data = json.dumps(json_data, ensure_ascii=False, indent=2)
+            async with self._index_write_scope([blob_name]):
+                # ETagによる条件付き更新（同時更新の上書きを防止）
+                json_data = await self._conditional_update(blob_name, apply_status)
+                if json_data is None:
+                    logger.warning(f"予約が見つかりません: {reservation_id}")
+                    return False
 
-            blob_client.upload_blob(blob_data, overwrite=True, encoding="utf-8")
+                await self._after_status_update(
+                    ReservationModel(**json_data), blob_name
+                )
 
             logger.info(f"ステータス更新完了: {reservation_id} -> {status}")
             return True
@@ -291,41 +1102,1196 @@ class StorageManager:
             logger.error(f"ステータス更新エラー: {e}")
             return False
 
-    async def _update_index(self, reservation: ReservationModel) -> None:
-        """インデックスファイルの更新（検索性能向上のため）"""
+    async def load_reservation(
+        self, reservation_id: str
+    ) -> Optional[Tuple[Dict[str, Any], BlobInfo]]:
+        """
+        予約データをETag付きで取得（条件付き更新の前の読み取り用、キャッシュは使わない）
+
+        Args:
+            reservation_id: 予約ID
+
+        Returns:
+            Optional[Tuple[Dict, BlobInfo]]: 予約データとBlobのプロパティ
+            （見つからない場合はNone）
+        """
+        try:
+            blob_name = await self._resolve_blob_name(reservation_id)
+            if not blob_name:
+                logger.warning(f"予約が見つかりません: {reservation_id}")
+                return None
+
+            blob_data, info = await self.backend.download(blob_name)
+            return serializer.loads(blob_data), info
+
+        except ResourceNotFoundError:
+            logger.warning(f"予約が見つかりません: {reservation_id}")
+            return None
+        except Exception as e:
+            logger.error(f"予約取得エラー: {e}")
+            raise ServiceRequestError(f"予約の取得に失敗しました: {e}")
+
+    async def update_loaded_reservation_status(
+        self,
+        reservation_data: Dict[str, Any],
+        info: BlobInfo,
+        status: str,
+        release_class_type: Optional[str] = None,
+    ) -> bool:
+        """
+        load_reservation で取得済みの予約のステータスを、取得時のETagを
+        条件として1回の書き込みで更新
+
+        他のリクエストに先に更新されていた場合は最新の内容を読み直し、
+        まだ同じステータスになっていなければ通常の条件付き更新で反映する。
+        続けてインデックスを更新し、release_class_type を指定した場合は
+        そのレッスン回の予約枠も解放する。
+
+        Args:
+            reservation_data: 取得済みの予約データ
+            info: 取得時のBlobのプロパティ（ETag）
+            status: 新しいステータス
+            release_class_type: 予約枠を解放するクラスタイプ
+
+        Returns:
+            bool: 更新成功フラグ（既に同じステータスだった場合はFalse）
+        """
+
+        def apply_status(
+            current: Optional[Dict[str, Any]],
+        ) -> Optional[Dict[str, Any]]:
+            if not current or current.get("status") == status:
+                return None
+            current = {
+                **current,
+                "status": status,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            return ReservationModel(**current).model_dump()
+
+        try:
+            json_data = apply_status(reservation_data)
+            if json_data is None:
+                return False
+
+            async with self._index_write_scope([info.name]):
+                self.concurrency_stats["writes"] += 1
+                try:
+                    await self.backend.upload(
+                        info.name,
+                        serializer.dumps_blob(json_data),
+                        metadata=info.metadata,
+                        etag=info.etag,
+                    )
+                except ResourceModifiedError:
+                    self.concurrency_stats["conflicts"] += 1
+                    json_data = await self._conditional_update(info.name, apply_status)
+                    if json_data is None:
+                        return False
+
+                # インデックス更新と予約枠の解放を並行して行う
+                reservation = ReservationModel(**json_data)
+                follow_ups = [self._after_status_update(reservation, info.name)]
+                if release_class_type:
+                    follow_ups.append(
+                        self.release_slots(release_class_type, reservation.booking_date)
+                    )
+                for result in await asyncio.gather(*follow_ups, return_exceptions=True):
+                    if isinstance(result, Exception):
+                        logger.warning(f"定員カウンター更新失敗: {result}")
+
+            logger.info(f"ステータス更新完了: {reservation.id} -> {status}")
+            return True
+
+        except Exception as e:
+            logger.error(f"ステータス更新エラー: {e}")
+            return False
+
+    async def _after_status_update(
+        self, reservation: ReservationModel, blob_name: str
+    ) -> None:
+        """ステータス変更後のインデックス・キャッシュの更新"""
+        await self._write_index_updates(
+            {
+                reservation.booking_date: [
+                    self._get_index_line(reservation, blob_name, "status")
+                ]
+            },
+            {
+                _normalize_email(reservation.customer_email): [
+                    self._get_email_index_entry(reservation, blob_name)
+                ]
+            },
+        )
+
+        self._reservation_cache.set(reservation.id, reservation.model_dump())
+        self._search_cache.invalidate(_normalize_email(reservation.customer_email))
+
+    async def _write_index_updates(
+        self,
+        lines_by_date: Dict[str, List[bytes]],
+        entries_by_email: Dict[str, List[Dict[str, Any]]],
+    ) -> None:
+        """
+        日付別シャードへの追記行とメール別インデックスのエントリを反映
+
+        write-behind が有効な場合はバッファに溜めて後からまとめて書き込み、
+        無効な場合はその場で予約日ごと・メールアドレスごとに1回ずつ書き込む。
+
+        Args:
+            lines_by_date: 予約日ごとのシャード追記行
+            entries_by_email: 正規化したメールアドレスごとのインデックスエントリ
+        """
+        if not self.write_behind:
+            await self._apply_index_updates(lines_by_date, entries_by_email)
+            return
+
+        for booking_date, lines in lines_by_date.items():
+            self._pending_lines.setdefault(booking_date, []).extend(lines)
+            self._pending_count += len(lines)
+        for email, entries in entries_by_email.items():
+            pending = self._pending_email.setdefault(email, {})
+            for entry in entries:
+                # 同じ予約の更新は最新のエントリだけを書き込む
+                pending[entry["id"]] = entry
+            self._pending_count += len(entries)
+        self.write_behind_stats["queued"] += 1
+
+        self._ensure_index_flusher()
+        if self._pending_count >= self.index_flush_max_pending:
+            task = asyncio.get_running_loop().create_task(self.flush_index_updates())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _apply_index_updates(
+        self,
+        lines_by_date: Dict[str, List[bytes]],
+        entries_by_email: Dict[str, List[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, List[bytes]], Dict[str, List[Dict[str, Any]]]]:
+        """
+        インデックス更新を予約日ごと・メールアドレスごとに1回ずつ並行して書き込む
+
+        Returns:
+            Tuple[Dict, Dict]: 書き込みに失敗した追記行とエントリ
+        """
+        dates = list(lines_by_date)
+        emails = list(entries_by_email)
+        results = await asyncio.gather(
+            *(
+                self._append_index_lines(booking_date, lines_by_date[booking_date])
+                for booking_date in dates
+            ),
+            *(
+                self._upsert_email_index(email, entries_by_email[email])
+                for email in emails
+            ),
+            return_exceptions=True,
+        )
+
+        failed_lines: Dict[str, List[bytes]] = {}
+        failed_entries: Dict[str, List[Dict[str, Any]]] = {}
+        for i, result in enumerate(results):
+            if not isinstance(result, Exception):
+                continue
+            # インデックス更新失敗は警告レベル（予約自体は成功）
+            if i < len(dates):
+                logger.warning(f"インデックス更新失敗: {result}")
+                failed_lines[dates[i]] = lines_by_date[dates[i]]
+            else:
+                email = emails[i - len(dates)]
+                logger.warning(f"メールインデックス更新失敗: {result}")
+                failed_entries[email] = entries_by_email[email]
+        return failed_lines, failed_entries
+
+    @asynccontextmanager
+    async def _index_write_scope(self, blob_names: Iterable[str]):
+        """
+        write-behind 有効時、予約Blobの書き込みからインデックス更新を
+        バッファに積むまでの区間を囲む
+
+        Blobを書き込む前に、そのプレフィックス（YYYY/MM/ など）と未反映の
+        開始時刻を状態Blobに記録する。区間内の処理が残っている間は
+        状態Blobを消さないため、途中でインスタンスが停止しても
+        reconcile_index_updates で予約Blobから再構築できる。
+        """
+        if not self.write_behind:
+            yield
+            return
+
+        self._inflight_writes += 1
         try:
-            index_blob_name = self._get_index_blob_name()
+            prefixes = {blob_name.rsplit("/", 1)[0] + "/" for blob_name in blob_names}
+            if self._pending_since is None or not prefixes <= self._pending_prefixes:
+                async with self._state_lock:
+                    if (
+                        self._pending_since is None
+                        or not prefixes <= self._pending_prefixes
+                    ):
+                        self._pending_since = (
+                            self._pending_since
+                            or datetime.now(timezone.utc).isoformat()
+                        )
+                        self._pending_prefixes |= prefixes
+                        await self._write_pending_state()
+            yield
+        finally:
+            self._inflight_writes -= 1
+
+    async def _write_pending_state(self) -> None:
+        """未反映の開始時刻と予約Blobのプレフィックスを状態Blobに書き込む"""
+        await self.backend.upload(
+            self._get_write_behind_state_blob_name(self._instance_id),
+            serializer.dumps_blob(
+                {
+                    "instance_id": self._instance_id,
+                    "pending_since": self._pending_since,
+                    "prefixes": sorted(self._pending_prefixes),
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                }
+            ),
+        )
+        self._state_written_at = time.monotonic()
+
+    def _has_pending_index_updates(self) -> bool:
+        return bool(
+            self._pending_lines
+            or self._pending_email
+            or self._pending_calendar
+            or self._inflight_writes
+        )
+
+    def _ensure_index_flusher(self) -> None:
+        """バッファを定期的に書き込むタスクを起動（起動済みなら何もしない）"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._run_index_flusher()
+            )
+
+    async def _run_index_flusher(self) -> None:
+        """未反映の更新が無くなるまで一定間隔でバッファを書き込む"""
+        if not self._reconciled:
+            # 起動後最初の書き込み時に、停止したインスタンスの未反映分を再構築
+            self._reconciled = True
+            try:
+                await self.reconcile_index_updates()
+            except Exception as e:
+                logger.warning(f"インデックス再構築失敗: {e}")
+
+        while True:
+            await asyncio.sleep(self.index_flush_interval)
+            try:
+                await self.flush_index_updates()
+            except Exception as e:
+                logger.warning(f"インデックス一括更新失敗: {e}")
+            if not self._has_pending_index_updates() and self._pending_since is None:
+                return
+
+    async def flush_index_updates(self) -> None:
+        """
+        バッファに溜めたインデックス・カレンダーの更新をまとめて書き込む
+
+        予約日ごとに1回の追記、メールアドレスごとに1回の条件付き更新、
+        カレンダー全体で1回の条件付き更新にまとめる。書き込みに失敗した分は
+        （カレンダーの更新も含めて）バッファに戻して次回に再試行し、
+        全て反映し終えたら状態Blobを削除する。
+        """
+        async with self._flush_lock:
+            lines_by_date, self._pending_lines = self._pending_lines, {}
+            entries_by_email, self._pending_email = self._pending_email, {}
+            self._pending_count = 0
+            self._flushing_lines, self._flushing_email = lines_by_date, entries_by_email
+
+            try:
+                if lines_by_date or entries_by_email:
+                    self.write_behind_stats["flushes"] += 1
+                    self.write_behind_stats["shard_writes"] += len(lines_by_date)
+                    self.write_behind_stats["email_writes"] += len(entries_by_email)
+                    failed_lines, failed_entries = await self._apply_index_updates(
+                        lines_by_date,
+                        {
+                            email: list(entries.values())
+                            for email, entries in entries_by_email.items()
+                        },
+                    )
+
+                    # 失敗した分をバッファに戻す（その間に積まれた新しいエントリを優先）
+                    for booking_date, lines in failed_lines.items():
+                        self._pending_lines.setdefault(booking_date, [])[:0] = lines
+                        self._pending_count += len(lines)
+                    for email, entries in failed_entries.items():
+                        pending = self._pending_email.setdefault(email, {})
+                        for entry in entries:
+                            pending.setdefault(entry["id"], entry)
+                        self._pending_count += len(entries)
+                    self.write_behind_stats["requeued"] += len(failed_lines) + len(
+                        failed_entries
+                    )
+
+                    for email in entries_by_email:
+                        self._search_cache.invalidate(email)
+
+                if self._pending_calendar:
+                    await self._flush_calendar()
+
+            finally:
+                self._flushing_lines, self._flushing_email = {}, {}
+
+        async with self._state_lock:
+            if self._pending_since is None:
+                return
+            if self._has_pending_index_updates():
+                # 書き込みが続いている間は状態Blobを定期的に書き直し、
+                # 停止したインスタンスと誤認されないようにする
+                stale_after = self.WRITE_BEHIND_STALE_SECONDS / 3
+                if time.monotonic() - self._state_written_at > stale_after:
+                    await self._write_pending_state()
+                return
 
-            # 既存インデックスを取得
             try:
-                blob_client = self.blob_service_client.get_blob_client(
-                    container=self.container_name, blob=index_blob_name
+                await self.backend.delete(
+                    self._get_write_behind_state_blob_name(self._instance_id)
+                )
+            except ResourceNotFoundError:
+                pass
+            self._pending_since = None
+            self._pending_prefixes = set()
+
+    async def reconcile_index_updates(self) -> Dict[str, int]:
+        """
+        反映前に停止したインスタンスの write-behind 更新を予約Blobから再構築
+
+        一定時間更新されていない他インスタンスの状態Blobについて、記録された
+        プレフィックス配下で未反映の開始時刻以降に更新された予約Blobを読み、
+        日付別・メール別インデックスに欠けている行・エントリだけを書き込む。
+        カレンダーは予約枠カウンターから作り直す。何度実行しても結果は同じ。
+
+        Returns:
+            Dict[str, int]: 再構築したインスタンス数と予約Blob数
+        """
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=self.WRITE_BEHIND_STALE_SECONDS)
+        own_state = self._get_write_behind_state_blob_name(self._instance_id)
+        states = [
+            blob
+            async for blob in self.backend.list_blobs(self.WRITE_BEHIND_STATE_PREFIX)
+            if blob.name != own_state
+            and (blob.last_modified is None or blob.last_modified <= stale_before)
+        ]
+
+        result = {"instances": 0, "reservations": 0}
+        for blob in states:
+            state = await self._download_json(blob.name)
+            if state and state.get("pending_since"):
+                since = datetime.fromisoformat(state["pending_since"]) - timedelta(
+                    seconds=self.WRITE_BEHIND_CLOCK_SKEW_SECONDS
+                )
+                result["reservations"] += await self._reindex_blobs(
+                    state.get("prefixes", []), since
                 )
-                blob_data = blob_client.download_blob().readall()
-                index_data = json.loads(blob_data.decode("utf-8"))
+            try:
+                await self.backend.delete(blob.name)
             except ResourceNotFoundError:
-                index_data = {"reservations": []}
+                pass
+            result["instances"] += 1
+
+        if result["instances"]:
+            await self.rebuild_calendar()
+            self.write_behind_stats["reconciled"] += result["reservations"]
+            logger.info(
+                f"インデックス再構築完了: {result['instances']}インスタンス"
+                f" / {result['reservations']}件"
+            )
+        return result
 
-            # 新しい予約をインデックスに追加
+    async def _reindex_blobs(self, prefixes: Iterable[str], since: datetime) -> int:
+        """
+        プレフィックス配下で since 以降に更新された予約Blobを
+        日付別・メール別インデックスと突き合わせ、欠けている分を書き込む
+
+        Returns:
+            int: 読み込んだ予約Blob数
+        """
+        blob_names = []
+        for prefix in prefixes:
+            blob_names.extend(await self._list_modified_blobs(prefix, since))
+        await self.reindex_blobs(blob_names)
+        return len(blob_names)
+
+    async def _list_modified_blobs(
+        self, prefix: str, since: Optional[datetime]
+    ) -> List[str]:
+        """プレフィックス配下で since 以降に更新されたJSON Blobの名前（Noneなら全件）"""
+        return [
+            blob.name
+            async for blob in self.backend.list_blobs(prefix)
+            if blob.name.endswith(".json")
+            and (
+                since is None
+                or blob.last_modified is None
+                or blob.last_modified >= since
+            )
+        ]
+
+    async def reindex_blobs(self, blob_names: List[str]) -> Set[Tuple[str, str]]:
+        """
+        予約Blob（定期予約を含む）を日付別・メール別インデックスと突き合わせ、
+        欠けている行・エントリと食い違っているステータスだけを書き込む
+
+        Args:
+            blob_names: 予約BlobのBlob名
+
+        Returns:
+            Set[Tuple[str, str]]: 対象の予約が含まれるレッスン回（クラス名, 予約日）
+        """
+        # 予約日ごとの (予約, Blob名) とメールアドレスごとのエントリにまとめる
+        by_date: Dict[str, List[Tuple[ReservationModel, str]]] = {}
+        by_email: Dict[str, List[Dict[str, Any]]] = {}
+        sessions: Set[Tuple[str, str]] = set()
+        async for blob_name, data in _azip(
+            blob_names, self._iter_json_blobs(blob_names)
+        ):
+            if data is None:
+                continue
+            booking_dates = data.get("booking_dates") or [data.get("booking_date")]
+            for booking_date in booking_dates:
+                reservation = ReservationModel(
+                    **{
+                        **data,
+                        "booking_date": booking_date,
+                        "status": _booking_status(data, booking_date),
+                    }
+                )
+                by_date.setdefault(booking_date, []).append((reservation, blob_name))
+                sessions.add((reservation.class_name, booking_date))
+            by_email.setdefault(_normalize_email(data["customer_email"]), []).append(
+                {
+                    "id": data["id"],
+                    "blob_name": blob_name,
+                    "created_at": data.get("created_at"),
+                    "status": data.get("status"),
+                }
+            )
+
+        lines_by_date: Dict[str, List[bytes]] = {}
+        booking_dates = list(by_date)
+        async for booking_date, index_entries in _azip(
+            booking_dates,
+            self._bounded_in_order(map(self.get_index_entries, booking_dates)),
+        ):
+            indexed = {entry["id"]: entry for entry in index_entries}
+            for reservation, blob_name in by_date[booking_date]:
+                entry = indexed.get(reservation.id)
+                if entry is None:
+                    line = self._get_index_line(reservation, blob_name)
+                elif entry.get("status") != reservation.status:
+                    line = self._get_index_line(reservation, blob_name, "status")
+                else:
+                    continue
+                lines_by_date.setdefault(booking_date, []).append(line)
+
+        entries_by_email: Dict[str, List[Dict[str, Any]]] = {}
+        emails = list(by_email)
+        async for email, index_data in _azip(
+            emails, self._bounded_in_order(map(self._read_email_index, emails))
+        ):
+            indexed = {entry["id"]: entry for entry in index_data["reservations"]}
+            missing = [
+                entry for entry in by_email[email] if indexed.get(entry["id"]) != entry
+            ]
+            if missing:
+                entries_by_email[email] = missing
+
+        await self._apply_index_updates(lines_by_date, entries_by_email)
+        for email in entries_by_email:
+            self._search_cache.invalidate(email)
+        return sessions
+
+    def _get_index_line(
+        self, reservation: ReservationModel, blob_name: str, op: str = "add"
+    ) -> bytes:
+        """日付別インデックスシャードに追記する1行（NDJSON）"""
+        if op == "status":
+            index_entry = {
+                "op": "status",
+                "id": reservation.id,
+                "status": reservation.status,
+            }
+        else:
             index_entry = {
+                "op": "add",
                 "id": reservation.id,
+                "blob_name": blob_name,
                 "customer_email": reservation.customer_email,
                 "class_name": reservation.class_name,
                 "booking_date": reservation.booking_date,
                 "created_at": reservation.created_at,
                 "status": reservation.status,
             }
+        return serializer.dumps(index_entry) + b"\n"
 
-            index_data["reservations"].append(index_entry)
+    async def _append_index_lines(self, booking_date: str, lines: List[bytes]) -> None:
+        """日付別シャードに行を追記（シャードが未作成なら作成してから追記）"""
+        await self.backend.append(
+            self._get_date_index_blob_name(booking_date), b"".join(lines)
+        )
+
+    async def get_index_entries(self, booking_date: str) -> List[Dict[str, Any]]:
+        """
+        指定した予約日のインデックスエントリを取得
+
+        Args:
+            booking_date: 予約日（YYYY-MM-DD形式）
+
+        Returns:
+            List[Dict]: 予約ごとの最新エントリ（シャードが無い場合は空リスト）
+        """
+        try:
+            blob_data, _ = await self.backend.download(
+                self._get_date_index_blob_name(booking_date)
+            )
+        except ResourceNotFoundError:
+            blob_data = b""
+
+        # write-behind で未反映の行も反映して返す
+        pending = self._flushing_lines.get(booking_date, []) + self._pending_lines.get(
+            booking_date, []
+        )
+        if pending:
+            blob_data += b"".join(pending)
+        return _fold_index_lines(blob_data)
+
+    async def iter_bookings(
+        self, booking_dates: Iterable[str], class_name: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        予約日別インデックスを日付順にたどり、レッスン日ごとの予約を順に返す
+
+        日付別シャードと予約Blobは同時実行数を制限して先読みするため、
+        期間が長くても保持するのは先読み分だけで済む。定期予約は
+        レッスン日ごとに1件として返す（id は定期予約ID、series_id 付き）。
+
+        Args:
+            booking_dates: 予約日（YYYY-MM-DD形式）のリスト（この順に返す）
+            class_name: クラス名で絞り込む場合に指定
+
+        Yields:
+            Dict: 予約データ（作成日時順）
+        """
+        async for entries in self._bounded_in_order(
+            self.get_index_entries(booking_date) for booking_date in booking_dates
+        ):
+            entries = sorted(
+                (
+                    entry
+                    for entry in entries
+                    if class_name is None or entry.get("class_name") == class_name
+                ),
+                key=lambda x: (x.get("created_at", ""), x["id"]),
+            )
+            async for entry, data in _azip(
+                entries, self._iter_json_blobs(entry["blob_name"] for entry in entries)
+            ):
+                if data is None:
+                    logger.warning(f"インデックスの予約が見つかりません: {entry['id']}")
+                    continue
+                if "booking_dates" in data:
+                    booking_date = entry["booking_date"]
+                    status = _booking_status(data, booking_date)
+                    data = {
+                        key: value
+                        for key, value in data.items()
+                        if key not in ("booking_dates", "cancelled_dates")
+                    }
+                    data.update(
+                        {
+                            "series_id": data["id"],
+                            "booking_date": booking_date,
+                            "status": status,
+                        }
+                    )
+                yield data
+
+    async def _read_email_index(self, email: str) -> Dict[str, Any]:
+        """メール別インデックスを取得（存在しない場合は空のインデックス）"""
+        index_data = await self._download_json(self._get_email_index_blob_name(email))
+        return index_data or {"reservations": []}
+
+    def _get_email_index_entry(
+        self, reservation: ReservationModel, blob_name: str
+    ) -> Dict[str, Any]:
+        """メール別インデックスの予約エントリ"""
+        return {
+            "id": reservation.id,
+            "blob_name": blob_name,
+            "created_at": reservation.created_at,
+            "status": reservation.status,
+        }
+
+    async def _upsert_email_index(
+        self, email: str, index_entries: List[Dict[str, Any]]
+    ) -> None:
+        """メール別インデックスに複数の予約エントリを1回の書き込みで追加・更新"""
+        entry_ids = {entry["id"] for entry in index_entries}
+
+        def upsert_entries(index_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            index_data = index_data or {"reservations": []}
+            entries = [
+                entry
+                for entry in index_data["reservations"]
+                if entry["id"] not in entry_ids
+            ]
+            entries.extend(index_entries)
+            index_data["reservations"] = entries
             index_data["last_updated"] = datetime.now(timezone.utc).isoformat()
+            return index_data
 
-            # インデックスを保存
-            index_json = json.dumps(index_data, ensure_ascii=False, indent=2)
-            blob_client.upload_blob(index_json, overwrite=True, encoding="utf-8")
+        await self._conditional_update(
+            self._get_email_index_blob_name(email), upsert_entries, compress=True
+        )
 
-        except Exception as e:
-            # インデックス更新失敗は警告レベル（予約自体は成功）
-            logger.warning(f"インデックス更新失敗: {e}")
+    async def _conditional_update(
+        self,
+        blob_name: str,
+        mutate: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]],
+        compress: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        ETagを使った楽観的同時実行制御によるJSON Blobの読み取り・更新・書き込み
+
+        取得時のETagを If-Match 条件として書き込み、他のインスタンスに先に
+        更新された場合は最新の内容を読み直して mutate を再適用する。
+        Blobが存在しない場合は作成のみを許可する条件（If-None-Match: *）で書き込む。
+        リトライ間隔はジッター付きの指数バックオフ。
+
+        Args:
+            blob_name: 対象Blob名
+            mutate: 現在の内容（存在しない場合はNone）を受け取り、書き込む内容を
+                返す関数。Noneを返すと書き込みを行わない
+            compress: 大きい場合にgzip圧縮して保存するか
+
+        Returns:
+            Optional[Dict]: 書き込んだ内容（mutateがNoneを返した場合はNone）
+
+        Raises:
+            ConcurrentUpdateError: リトライ上限まで競合が続いた場合
+        """
+        for attempt in range(self.CONDITIONAL_MAX_ATTEMPTS):
+            try:
+                blob_data, info = await self.backend.download(blob_name)
+                current = serializer.loads(blob_data)
+                etag, metadata = info.etag, info.metadata
+            except ResourceNotFoundError:
+                current, etag, metadata = None, None, None
+
+            updated = mutate(current)
+            if updated is None:
+                return None
+
+            blob_data = serializer.dumps_blob(updated, compress=compress)
+            self.concurrency_stats["writes"] += 1
+            try:
+                if etag:
+                    await self.backend.upload(
+                        blob_name, blob_data, metadata=metadata, etag=etag
+                    )
+                else:
+                    await self.backend.upload(blob_name, blob_data, overwrite=False)
+                return updated
+
+            except (ResourceModifiedError, ResourceExistsError):
+                self.concurrency_stats["conflicts"] += 1
+                if attempt + 1 >= self.CONDITIONAL_MAX_ATTEMPTS:
+                    break
+
+                self.concurrency_stats["retries"] += 1
+                delay = min(
+                    self.CONDITIONAL_BACKOFF_MAX,
+                    self.CONDITIONAL_BACKOFF_BASE * (2**attempt),
+                )
+                logger.info(
+                    f"書き込み競合のためリトライ: {blob_name} ({attempt + 1}回目)"
+                )
+                await asyncio.sleep(random.uniform(0, delay))
+
+        self.concurrency_stats["exhausted"] += 1
+        raise ConcurrentUpdateError(f"同時更新の競合が解消しませんでした: {blob_name}")
+
+    async def get_idempotency_record(
+        self, idempotency_key: str
+    ) -> Optional[Tuple[Dict[str, Any], BlobInfo]]:
+        """
+        冪等キーの記録を取得（1回の読み取り）
+
+        Returns:
+            Optional[Tuple[Dict, BlobInfo]]: 記録とBlobのプロパティ（無い場合はNone）
+        """
+        try:
+            blob_data, info = await self.backend.download(
+                self._get_idempotency_blob_name(idempotency_key)
+            )
+        except ResourceNotFoundError:
+            return None
+        return serializer.loads(blob_data), info
+
+    async def claim_idempotency_key(
+        self,
+        idempotency_key: str,
+        fingerprint: str,
+        etag: Optional[str] = None,
+        reservation_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        冪等キーを処理中として確保し、作成する予約のIDを払い出す
+
+        記録が無い場合は作成のみを許可する条件（If-None-Match: *）で、期限切れ・
+        放棄された記録を引き継ぐ場合は取得時のETag（If-Match）を条件に書き込む。
+
+        Args:
+            idempotency_key: 冪等キー
+            fingerprint: リクエスト内容のハッシュ
+            etag: 引き継ぐ記録のETag
+            reservation_id: 引き継ぐ記録の予約ID（省略時は新しく払い出す）
+
+        Returns:
+            Optional[Dict]: 確保した記録（他のリクエストに先に確保された場合はNone）
+        """
+        now = datetime.now(timezone.utc)
+        record = {
+            "status": "pending",
+            "fingerprint": fingerprint,
+            "reservation_id": reservation_id or self._generate_reservation_id(now),
+            "created_at": now.isoformat(),
+        }
+        blob_name = self._get_idempotency_blob_name(idempotency_key)
+        try:
+            if etag:
+                await self.backend.upload(
+                    blob_name, serializer.dumps_blob(record), etag=etag
+                )
+            else:
+                await self.backend.upload(
+                    blob_name, serializer.dumps_blob(record), overwrite=False
+                )
+        except (ResourceExistsError, ResourceModifiedError):
+            return None
+        return record
+
+    async def complete_idempotency_key(
+        self, idempotency_key: str, record: Dict[str, Any], result: Dict[str, Any]
+    ) -> None:
+        """確保した冪等キーに処理結果を記録（以降の再送にはこの結果を返す）"""
+        await self.backend.upload(
+            self._get_idempotency_blob_name(idempotency_key),
+            serializer.dumps_blob(
+                {
+                    **record,
+                    "status": "completed",
+                    "result": result,
+                    "completed_at": datetime.now(timezone.utc).isoformat(),
+                }
+            ),
+        )
+
+    async def release_idempotency_key(self, idempotency_key: str) -> None:
+        """確保した冪等キーを解放（予約を作成できなかった場合、再送で作り直せるように）"""
+        try:
+            await self.backend.delete(self._get_idempotency_blob_name(idempotency_key))
+        except ResourceNotFoundError:
+            pass
+
+    async def reserve_slots(
+        self, class_type: str, booking_date: str, capacity: int, count: int = 1
+    ) -> bool:
+        """
+        レッスン回の予約枠を確保（カウンターをETag条件付きで加算）
+
+        Args:
+            class_type: クラスタイプ
+            booking_date: 予約日（YYYY-MM-DD形式）
+            capacity: 定員
+            count: 確保する枠数
+
+        Returns:
+            bool: 確保できた場合True、定員超過の場合False
+        """
+
+        def increment(counter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            counter = counter or {
+                "class_type": class_type,
+                "booking_date": booking_date,
+                "booked": 0,
+            }
+            if counter["booked"] + count > capacity:
+                return None
+
+            counter["booked"] += count
+            counter["capacity"] = capacity
+            counter["revision"] = counter.get("revision", 0) + 1
+            counter["updated_at"] = datetime.now(timezone.utc).isoformat()
+            return counter
+
+        counter = await self._conditional_update(
+            self._get_counter_blob_name(class_type, booking_date), increment
+        )
+        if counter is None:
+            return False
+
+        await self._update_calendar(counter)
+        return True
+
+    async def release_slots(
+        self, class_type: str, booking_date: str, count: int = 1
+    ) -> None:
+        """
+        レッスン回の予約枠を解放（カウンターをETag条件付きで減算）
+
+        Args:
+            class_type: クラスタイプ
+            booking_date: 予約日（YYYY-MM-DD形式）
+            count: 解放する枠数
+        """
+
+        def decrement(counter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if not counter:
+                return None
+
+            counter["booked"] = max(0, counter["booked"] - count)
+            counter["revision"] = counter.get("revision", 0) + 1
+            counter["updated_at"] = datetime.now(timezone.utc).isoformat()
+            return counter
+
+        counter = await self._conditional_update(
+            self._get_counter_blob_name(class_type, booking_date), decrement
+        )
+        if counter is not None:
+            await self._update_calendar(counter)
+
+    async def rebuild_indexes(
+        self,
+        recount: Callable[[Set[Tuple[str, str]]], Awaitable[List[Tuple[str, str]]]],
+        full: bool = False,
+        start_month: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        予約Blobからインデックス・予約枠カウンター・カレンダーを再構築
+
+        YYYY/MM/ と series/YYYY/MM/ のプレフィックスを同時実行数を制限して
+        並行に走査し、前回の実行以降に更新された予約Blob（初回・全件の場合は
+        全て）をインデックスと突き合わせる。プレフィックスごとに進捗を
+        チェックポイントへ書き込むため、途中で止まっても次回は続きから再開する。
+
+        Args:
+            recount: 対象のレッスン回（クラス名, 予約日）の予約枠カウンターを
+                数え直す関数。処理中の予約があり数え直せなかったレッスン回を返す
+            full: 前回の実行に関係なく全件を再構築するか
+            start_month: 走査を開始する月（YYYY-MM形式、省略時は
+                初回・全件なら RECONCILE_FULL_MONTHS か月前）
+
+        Returns:
+            Dict: 走査したプレフィックス数・予約Blob数・数え直したレッスン回数など
+        """
+        checkpoint_blob_name = self._get_reconcile_checkpoint_blob_name()
+        checkpoint = await self._download_json(checkpoint_blob_name) or {}
+        now = datetime.now(timezone.utc)
+
+        run = checkpoint.get("run")
+        if run is None or (full and run.get("since")):
+            since = None if full else checkpoint.get("since")
+            run = {
+                "started_at": now.isoformat(),
+                "since": since,
+                "prefixes": self._get_reconcile_prefixes(
+                    datetime.fromisoformat(since) if since else None, start_month
+                ),
+                "done": [],
+                "blobs": 0,
+                # 前回数え直せなかったレッスン回も対象に含める
+                "sessions": checkpoint.get("deferred_sessions", []),
+            }
+        else:
+            logger.info(
+                f"インデックス再構築を再開: {len(run['done'])}プレフィックス処理済み"
+            )
+
+        since = datetime.fromisoformat(run["since"]) if run["since"] else None
+        if since:
+            since -= timedelta(seconds=self.WRITE_BEHIND_CLOCK_SKEW_SECONDS)
+        sessions = {tuple(session) for session in run["sessions"]}
+        remaining = [prefix for prefix in run["prefixes"] if prefix not in run["done"]]
+
+        async def reindex_prefix(prefix: str) -> Tuple[int, Set[Tuple[str, str]]]:
+            blob_names = await self._list_modified_blobs(prefix, since)
+            return len(blob_names), await self.reindex_blobs(blob_names)
+
+        async for prefix, (blob_count, prefix_sessions) in _azip(
+            remaining, self._bounded_in_order(map(reindex_prefix, remaining))
+        ):
+            sessions |= prefix_sessions
+            run["done"].append(prefix)
+            run["blobs"] += blob_count
+            run["sessions"] = sorted(sessions)
+            await self.backend.upload(
+                checkpoint_blob_name,
+                serializer.dumps_blob({**checkpoint, "run": run}, compress=True),
+            )
+
+        deferred = await recount(sessions)
+        await self.rebuild_calendar()
+
+        result = {
+            "started_at": run["started_at"],
+            "since": run["since"],
+            "prefixes": len(run["prefixes"]),
+            "blobs": run["blobs"],
+            "sessions": len(sessions),
+            "deferred_sessions": len(deferred),
+        }
+        await self.backend.upload(
+            checkpoint_blob_name,
+            serializer.dumps_blob(
+                {
+                    # 次回はこの実行の開始時刻以降に更新されたBlobだけを処理する
+                    "since": run["started_at"],
+                    "completed_at": datetime.now(timezone.utc).isoformat(),
+                    "deferred_sessions": sorted(deferred),
+                    "last_run": result,
+                },
+                compress=True,
+            ),
+        )
+        logger.info(
+            f"インデックス再構築完了: 予約Blob {result['blobs']}件"
+            f" / レッスン回 {result['sessions']}件"
+        )
+        return result
+
+    def _get_reconcile_prefixes(
+        self, since: Optional[datetime], start_month: Optional[str]
+    ) -> List[str]:
+        """再構築で走査する月ごとのプレフィックス（予約・定期予約）"""
+        now = datetime.now(timezone.utc)
+        if start_month:
+            year, month = (int(part) for part in start_month.split("-"))
+            start = year * 12 + month - 1
+        elif since:
+            oldest = since - timedelta(days=self.RECONCILE_LOOKBACK_DAYS)
+            start = oldest.year * 12 + oldest.month - 1
+        else:
+            start = now.year * 12 + now.month - 1 - (self.RECONCILE_FULL_MONTHS - 1)
+
+        prefixes = []
+        for index in range(start, now.year * 12 + now.month):
+            year, month = divmod(index, 12)
+            prefixes.append(f"{year:04d}/{month + 1:02d}/")
+            prefixes.append(f"series/{year:04d}/{month + 1:02d}/")
+        return prefixes
+
+    async def recount_slots(
+        self, sessions: List[Tuple[str, str, str, int]]
+    ) -> List[Tuple[str, str, str, int]]:
+        """
+        日付別インデックスからレッスン回の予約数を数え直し、カウンターを修正
+
+        キャンセル以外の予約を数える。直近 RECONCILE_SETTLE_SECONDS 秒以内に
+        更新されたカウンターは処理中の予約があり得るため変更しない。
+
+        Args:
+            sessions: (クラスタイプ, クラス名, 予約日, 定員) のリスト
+
+        Returns:
+            List: 直近に更新されていたため数え直さなかったレッスン回
+        """
+        settled_before = (
+            datetime.now(timezone.utc)
+            - timedelta(seconds=self.RECONCILE_SETTLE_SECONDS)
+        ).isoformat()
+
+        async def recount_session(session: Tuple[str, str, str, int]) -> bool:
+            class_type, class_name, booking_date, capacity = session
+            booked = sum(
+                1
+                for entry in await self.get_index_entries(booking_date)
+                if entry.get("class_name") == class_name
+                and entry.get("status") != "cancelled"
+            )
+            deferred = False
+
+            def recount(counter: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+                nonlocal deferred
+                deferred = False
+                if (counter["booked"] if counter else 0) == booked:
+                    return None
+                if counter and counter.get("updated_at", "") > settled_before:
+                    deferred = True
+                    return None
+
+                counter = counter or {
+                    "class_type": class_type,
+                    "booking_date": booking_date,
+                }
+                logger.info(
+                    f"予約数を修正: {class_type}/{booking_date}"
+                    f" {counter.get('booked', 0)} -> {booked}"
+                )
+                counter["booked"] = booked
+                counter["capacity"] = capacity
+                counter["revision"] = counter.get("revision", 0) + 1
+                counter["updated_at"] = datetime.now(timezone.utc).isoformat()
+                return counter
+
+            await self._conditional_update(
+                self._get_counter_blob_name(class_type, booking_date), recount
+            )
+            return deferred
+
+        return [
+            session
+            async for session, deferred in _azip(
+                sessions, self._bounded_in_order(map(recount_session, sessions))
+            )
+            if deferred
+        ]
+
+    async def get_booked_count(self, class_type: str, booking_date: str) -> int:
+        """
+        レッスン回の予約数を取得
+
+        Args:
+            class_type: クラスタイプ
+            booking_date: 予約日（YYYY-MM-DD形式）
+
+        Returns:
+            int: 予約数（カウンターが無い場合は0）
+        """
+        counter = await self._download_json(
+            self._get_counter_blob_name(class_type, booking_date)
+        )
+        return counter["booked"] if counter else 0
+
+    async def _update_calendar(self, counter: Dict[str, Any]) -> None:
+        """
+        カウンターの最新値をカレンダー文書に反映
+
+        ロック待ちの間に溜まった他のレッスン回の更新もまとめて1回の
+        条件付き書き込みで反映する（write-behind 有効時は次回の一括更新で反映）。
+        カウンターのリビジョンが古い値では上書きしないため、反映の順序が
+        前後しても最新値が残る。過去のレッスン回は書き込みのたびに取り除く。
+        """
+        self._merge_pending_calendar(
+            {f"{counter['class_type']}/{counter['booking_date']}": counter}
+        )
+
+        if self.write_behind:
+            # write-behind 有効時はインデックスと一緒に後からまとめて書き込む
+            self._ensure_index_flusher()
+            return
+        await self._flush_calendar()
+
+    def _merge_pending_calendar(self, counters: Dict[str, Dict[str, Any]]) -> None:
+        """反映待ちのカウンターに追加（同じレッスン回はリビジョンの新しい方を残す）"""
+        for key, counter in counters.items():
+            pending = self._pending_calendar.get(key)
+            if pending is None or pending.get("revision", 0) < counter.get(
+                "revision", 0
+            ):
+                self._pending_calendar[key] = counter
+
+    async def _flush_calendar(self) -> None:
+        """
+        反映待ちのカウンターをカレンダー文書に1回の条件付き書き込みで反映
+
+        書き込みに失敗した分は反映待ちに戻し、バッファの定期書き込みで再試行する。
+        """
+        async with self._calendar_lock:
+            if not self._pending_calendar:
+                # 待っている間に他の呼び出しがまとめて反映済み
+                return
+            updates, self._pending_calendar = self._pending_calendar, {}
+
+            def apply_counters(
+                calendar: Optional[Dict[str, Any]],
+            ) -> Dict[str, Any]:
+                calendar = calendar or {"sessions": {}, "revision": 0}
+                today = datetime.now(timezone.utc).date().isoformat()
+                sessions = {
+                    key: session
+                    for key, session in calendar["sessions"].items()
+                    if key.split("/", 1)[1] >= today
+                }
+                for key, update in updates.items():
+                    session = sessions.get(key)
+                    if session and session["revision"] >= update.get("revision", 0):
+                        continue
+                    sessions[key] = {
+                        "booked": update["booked"],
+                        "capacity": update.get("capacity"),
+                        "revision": update.get("revision", 0),
+                    }
+                calendar["sessions"] = sessions
+                calendar["revision"] += 1
+                calendar["updated_at"] = datetime.now(timezone.utc).isoformat()
+                return calendar
+
+            try:
+                await self._conditional_update(
+                    self._get_calendar_blob_name(), apply_counters, compress=True
+                )
+            except Exception as e:
+                # カレンダー更新失敗は警告レベル（カウンター自体は更新済み）
+                logger.warning(f"カレンダー更新失敗: {e}")
+                self._merge_pending_calendar(updates)
+                self.write_behind_stats["requeued"] += len(updates)
+                self._ensure_index_flusher()
+
+    async def get_calendar(self) -> Dict[str, Dict[str, Any]]:
+        """
+        カレンダー文書を取得（1回の読み取りで全レッスン回の予約数が分かる）
+
+        Returns:
+            Dict: "<クラスタイプ>/<YYYY-MM-DD>" をキーとした予約数・定員
+            （予約の無いレッスン回は含まない）
+        """
+        calendar = await self._download_json(self._get_calendar_blob_name())
+        sessions = dict(calendar["sessions"]) if calendar else {}
+
+        # write-behind で未反映のカウンターも反映して返す
+        for key, counter in list(self._pending_calendar.items()):
+            session = sessions.get(key)
+            if session and session["revision"] >= counter.get("revision", 0):
+                continue
+            sessions[key] = {
+                "booked": counter["booked"],
+                "capacity": counter.get("capacity"),
+                "revision": counter.get("revision", 0),
+            }
+        return sessions
+
+    async def rebuild_calendar(self) -> None:
+        """今日以降の予約枠カウンターを読み直してカレンダー文書に反映"""
+        today = datetime.now(timezone.utc).date().isoformat()
+        blob_names = [
+            blob.name
+            async for blob in self.backend.list_blobs("counters/")
+            if blob.name.rsplit("/", 1)[-1] >= today
+        ]
+        async for counter in self._iter_json_blobs(blob_names):
+            if counter:
+                self._merge_pending_calendar(
+                    {f"{counter['class_type']}/{counter['booking_date']}": counter}
+                )
+        await self._flush_calendar()
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        読み取りキャッシュの統計
+
+        Returns:
+            Dict: キャッシュ種別ごとのヒット・ミス・破棄件数とエントリ数
+        """
+        return {
+            "reservations": self._reservation_cache.get_stats(),
+            "searches": self._search_cache.get_stats(),
+        }
 
     async def health_check(self) -> Dict[str, Any]:
         """
@@ -335,20 +2301,16 @@ class StorageManager:
             Dict: ヘルスチェック結果
         """
         try:
-            container_client = self.blob_service_client.get_container_client(
-                self.container_name
-            )
-            properties = container_client.get_container_properties()
+            properties = await self.backend.get_container_properties()
 
             return {
                 "status": "healthy",
+                "backend": self.backend.name,
                 "storage_account": self.storage_account_name,
                 "container": self.container_name,
-                "last_modified": (
-                    properties.last_modified.isoformat()
-                    if properties.last_modified
-                    else None
-                ),
+                "concurrency": dict(self.concurrency_stats),
+                "cache": self.cache_stats(),
+                "last_modified": properties.get("last_modified"),
             }
         except Exception as e:
             return {
@@ -0,0 +1,285 @@
+"""
+レイテンシ計測
+ストレージ操作とHTTPルートの所要時間・転送バイト数・結果をヒストグラムに記録し、
+リクエストごとの内訳を Server-Timing ヘッダーとして返す
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+
+from storage_backends import BlobInfo, StorageBackend
+
+try:
+    from opentelemetry import metrics as otel_metrics
+except ImportError:  # OpenTelemetryは任意の依存関係
+    otel_metrics = None
+
+# ログ設定
+logger = logging.getLogger(__name__)
+
+# ヒストグラムの境界値（ミリ秒）
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 実行中リクエストの計測内訳（操作名 → [回数, 合計ミリ秒, バイト数]）
+_request_breakdown: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar(
+    "request_breakdown", default=None
+)
+
+
+class Histogram:
+    """累積バケット方式のレイテンシヒストグラム"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+
+    def observe(self, duration_ms: float, size: int = 0) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if duration_ms <= bound:
+                index = i
+                break
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.bytes += size
+
+    def quantile(self, q: float) -> float:
+        """バケット境界による分位点の近似値（ミリ秒）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.bucket_counts):
+            cumulative += count
+            if cumulative >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "bytes": self.bytes,
+            "buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(self.buckets, self.bucket_counts)
+                },
+                "le_inf": self.bucket_counts[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    """
+    ヒストグラムの登録先
+
+    (種別, 操作名, 結果) ごとにヒストグラムを持つ。OpenTelemetryが
+    インストールされている場合は同じ値をOpenTelemetryのヒストグラムにも記録する。
+    """
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._otel_duration = None
+        self._otel_bytes = None
+        if otel_metrics is not None:
+            meter = otel_metrics.get_meter("yoga-reservation-api")
+            self._otel_duration = meter.create_histogram(
+                "yoga.operation.duration", unit="ms"
+            )
+            self._otel_bytes = meter.create_histogram("yoga.operation.bytes", unit="By")
+
+    def record(
+        self,
+        kind: str,
+        operation: str,
+        duration_ms: float,
+        size: int = 0,
+        outcome: str = "ok",
+    ) -> None:
+        """
+        計測値を記録
+
+        Args:
+            kind: "storage" / "http"
+            operation: 操作名（例: download, GET reservations/search）
+            duration_ms: 所要時間（ミリ秒）
+            size: 転送バイト数
+            outcome: 結果（ok, not_found, conflict, error, HTTPステータスなど）
+        """
+        key = (kind, operation, outcome)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(duration_ms, size)
+
+        if self._otel_duration is not None:
+            attributes = {"kind": kind, "operation": operation, "outcome": outcome}
+            self._otel_duration.record(duration_ms, attributes)
+            self._otel_bytes.record(size, attributes)
+
+        breakdown = _request_breakdown.get()
+        if breakdown is not None and kind != "http":
+            entry = breakdown.setdefault(operation, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += duration_ms
+            entry[2] += size
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """全ヒストグラムの現在値"""
+        return [
+            {"kind": kind, "operation": operation, "outcome": outcome, **h.snapshot()}
+            for (kind, operation, outcome), h in sorted(self._histograms.items())
+        ]
+
+    def reset(self) -> None:
+        self._histograms.clear()
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def timed(operation: str, kind: str = "app") -> Iterator[None]:
+    """with ブロックの所要時間を記録"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.record(kind, operation, (time.perf_counter() - started) * 1000)
+
+
+def start_request() -> Any:
+    """リクエスト単位の内訳計測を開始（戻り値は end_request に渡す）"""
+    return _request_breakdown.set({})
+
+
+def end_request(token: Any) -> Dict[str, List[float]]:
+    """内訳計測を終了し、操作ごとの [回数, 合計ミリ秒, バイト数] を返す"""
+    breakdown = _request_breakdown.get() or {}
+    _request_breakdown.reset(token)
+    return breakdown
+
+
+def format_server_timing(breakdown: Dict[str, List[float]], total_ms: float) -> str:
+    """内訳を Server-Timing ヘッダーの形式に整形"""
+    parts = [
+        f"{operation.replace(' ', '_')};dur={duration:.1f}"
+        f';desc="{int(count)}x {int(size)}B"'
+        for operation, (count, duration, size) in breakdown.items()
+    ]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+def _outcome(error: Exception) -> str:
+    if isinstance(error, ResourceNotFoundError):
+        return "not_found"
+    if isinstance(error, (ResourceModifiedError, ResourceExistsError)):
+        return "conflict"
+    return "error"
+
+
+class InstrumentedBackend(StorageBackend):
+    """ストレージバックエンドの各操作の所要時間・バイト数・結果を記録するラッパー"""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.name = backend.name
+
+    async def _call(self, operation: str, coroutine, size: int = 0):
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            result = await coroutine
+            if operation == "download":
+                size = len(result[0])
+            return result
+        except Exception as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            metrics.record(
+                "storage",
+                operation,
+                (time.perf_counter() - started) * 1000,
+                size,
+                outcome,
+            )
+
+    async def warm_up(self) -> Dict[str, Any]:
+        return await self.backend.warm_up()
+
+    async def download(self, blob_name: str) -> Tuple[bytes, BlobInfo]:
+        return await self._call("download", self.backend.download(blob_name))
+
+    async def upload(
+        self,
+        blob_name: str,
+        data: bytes,
+        metadata: Optional[Dict[str, str]] = None,
+        etag: Optional[str] = None,
+        overwrite: bool = True,
+    ) -> BlobInfo:
+        return await self._call(
+            "upload",
+            self.backend.upload(blob_name, data, metadata, etag, overwrite),
+            len(data),
+        )
+
+    async def append(self, blob_name: str, data: bytes) -> None:
+        return await self._call(
+            "append", self.backend.append(blob_name, data), len(data)
+        )
+
+    async def exists(self, blob_name: str) -> bool:
+        return await self._call("properties", self.backend.exists(blob_name))
+
+    async def list_blobs(self, prefix: Optional[str] = None) -> AsyncIterator[BlobInfo]:
+        started = time.perf_counter()
+        outcome = "ok"
+        count = 0
+        try:
+            async for blob in self.backend.list_blobs(prefix):
+                count += 1
+                yield blob
+        except Exception as e:
+            outcome = _outcome(e)
+            raise
+        finally:
+            # 一覧は件数をバイト数の代わりに記録する
+            metrics.record(
+                "storage",
+                "list",
+                (time.perf_counter() - started) * 1000,
+                count,
+                outcome,
+            )
+
+    async def delete(self, blob_name: str) -> None:
+        return await self._call("delete", self.backend.delete(blob_name))
+
+    async def get_container_properties(self) -> Dict[str, Any]:
+        return await self._call("properties", self.backend.get_container_properties())
+
+    async def close(self) -> None:
+        await self.backend.close()
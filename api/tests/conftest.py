@@ -0,0 +1,196 @@
+"""
+テスト共通のフィクスチャ
+
+ストレージはインメモリのバックエンドに遅延・障害を注入して使うため、
+Azure Storage やネットワークが無くても予約の一連の処理を検証できる。
+"""
+
+import asyncio
+import inspect
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Type
+
+import azure.functions as func
+import pytest
+from azure.core.exceptions import AzureError, ServiceRequestError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limiter  # noqa: E402
+import serializer  # noqa: E402
+from reservation_manager import ReservationManager  # noqa: E402
+from storage_backends import InMemoryStorageBackend  # noqa: E402
+from storage_manager import StorageManager  # noqa: E402
+
+# クラスの開催曜日（ReservationManager.CLASS_WEEKDAYS と同じ）
+MONDAY, TUESDAY = 0, 1
+
+
+class FaultyBackend(InMemoryStorageBackend):
+    """
+    遅延と障害を注入できるインメモリバックエンド
+
+    latency 秒の待機を読み書きの前に挟んで同時実行の競合を起こし、
+    fail() で登録したプレフィックスへの書き込みを失敗させる。
+    """
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self._failures: List[Dict[str, Any]] = []
+
+    def fail(
+        self,
+        prefix: str,
+        times: Optional[int] = None,
+        error: Type[AzureError] = ServiceRequestError,
+        after_write: bool = False,
+    ) -> None:
+        """
+        プレフィックスに一致するBlobへの書き込みを失敗させる
+
+        Args:
+            prefix: 対象のBlob名のプレフィックス
+            times: 失敗させる回数（省略時は常に失敗）
+            error: 送出する例外
+            after_write: 書き込んだうえで例外を送出する（応答のタイムアウトの模擬）
+        """
+        self._failures.append(
+            {
+                "prefix": prefix,
+                "times": times,
+                "error": error,
+                "after_write": after_write,
+            }
+        )
+
+    def _take_failure(self, blob_name: str) -> Optional[Dict[str, Any]]:
+        for failure in self._failures:
+            if blob_name.startswith(failure["prefix"]) and failure["times"] != 0:
+                if failure["times"] is not None:
+                    failure["times"] -= 1
+                return failure
+        return None
+
+    async def download(self, blob_name):
+        await asyncio.sleep(self.latency)
+        return await super().download(blob_name)
+
+    async def upload(self, blob_name, data, metadata=None, etag=None, overwrite=True):
+        await asyncio.sleep(self.latency)
+        failure = self._take_failure(blob_name)
+        if failure and not failure["after_write"]:
+            raise failure["error"](f"書き込みに失敗しました: {blob_name}")
+        info = await super().upload(blob_name, data, metadata, etag, overwrite)
+        if failure:
+            raise failure["error"](f"応答がタイムアウトしました: {blob_name}")
+        return info
+
+    async def append(self, blob_name, data):
+        await asyncio.sleep(self.latency)
+        failure = self._take_failure(blob_name)
+        if failure:
+            raise failure["error"](f"追記に失敗しました: {blob_name}")
+        return await super().append(blob_name, data)
+
+    def names(self, prefix: str = "") -> List[str]:
+        """保存されているBlob名（テストでの確認用）"""
+        return sorted(name for name in self._blobs if name.startswith(prefix))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """async def のテストを新しいイベントループで実行"""
+    if inspect.iscoroutinefunction(pyfuncitem.obj):
+        arguments = {
+            name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames
+        }
+        asyncio.run(pyfuncitem.obj(**arguments))
+        return True
+    return None
+
+
+@pytest.fixture
+def backend() -> FaultyBackend:
+    return FaultyBackend()
+
+
+@pytest.fixture
+def storage(backend) -> StorageManager:
+    storage = StorageManager(backend=backend, write_behind=False)
+    storage.CONDITIONAL_BACKOFF_BASE = 0.001
+    return storage
+
+
+@pytest.fixture
+def manager(storage) -> ReservationManager:
+    return ReservationManager(storage)
+
+
+@pytest.fixture
+def app(monkeypatch, storage, manager):
+    """テスト用のストレージと新しいレート制限の状態で動く function_app"""
+    import function_app
+
+    monkeypatch.delenv("RATE_LIMIT_ENABLED", raising=False)
+    monkeypatch.setattr(function_app, "storage_manager", storage)
+    monkeypatch.setattr(function_app, "reservation_manager", manager)
+    monkeypatch.setattr(
+        function_app, "ip_limiter", rate_limiter.TokenBucketLimiter(rate=5, burst=20)
+    )
+    monkeypatch.setattr(
+        function_app, "email_limiter", rate_limiter.TokenBucketLimiter(rate=1, burst=5)
+    )
+    monkeypatch.setattr(
+        function_app, "concurrency_limiter", rate_limiter.ConcurrencyLimiter(64)
+    )
+    return function_app
+
+
+async def call(
+    route,
+    method: str = "GET",
+    body: Any = None,
+    params: Optional[Dict[str, str]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    route_params: Optional[Dict[str, str]] = None,
+) -> func.HttpResponse:
+    """デコレーター込みのHTTPハンドラーを呼び出す"""
+    request = func.HttpRequest(
+        method,
+        "/api/test",
+        body=b"" if body is None else serializer.dumps(body),
+        params=params or {},
+        headers={"x-forwarded-for": "203.0.113.1", **(headers or {})},
+        route_params=route_params or {},
+    )
+    return await route._function.get_user_function()(request)
+
+
+def lesson_date(weekday: int, weeks: int = 0) -> str:
+    """2日後以降で最初の指定曜日（weeks 週後）の日付"""
+    day = date.today() + timedelta(days=2)
+    day += timedelta(days=(weekday - day.weekday()) % 7 + 7 * weeks)
+    return day.isoformat()
+
+
+def reservation_prefix() -> str:
+    """今作成する予約Blobのプレフィックス（予約IDの作成年月）"""
+    return datetime.now(timezone.utc).strftime("%Y/%m/")
+
+
+def reservation_data(
+    booking_date: str,
+    class_name: str = "パワーヨガ",
+    email: str = "tanaka@example.com",
+) -> Dict[str, Any]:
+    return {
+        "class_name": class_name,
+        "class_schedule": "火・木・土 19:00-20:00",
+        "booking_date": booking_date,
+        "customer_name": "田中太郎",
+        "customer_email": email,
+        "customer_phone": "090-1234-5678",
+    }
@@ -0,0 +1,84 @@
+"""インメモリ・ローカルファイルのバックエンドがBlob Storageと同じ意味論で動くこと"""
+
+import pytest
+from azure.core.exceptions import (
+    ResourceExistsError,
+    ResourceModifiedError,
+    ResourceNotFoundError,
+)
+
+from storage_backends import FileSystemStorageBackend, InMemoryStorageBackend
+
+
+@pytest.fixture(params=["memory", "filesystem"])
+def any_backend(request, tmp_path):
+    if request.param == "filesystem":
+        return FileSystemStorageBackend(str(tmp_path))
+    return InMemoryStorageBackend()
+
+
+async def test_missing_blob_is_not_found(any_backend):
+    with pytest.raises(ResourceNotFoundError):
+        await any_backend.download("2026/10/missing.json")
+    assert not await any_backend.exists("2026/10/missing.json")
+
+
+async def test_upload_round_trips_data_and_metadata(any_backend):
+    info = await any_backend.upload(
+        "2026/10/a.json", b'{"id":"a"}', metadata={"customer_email": "a@example.com"}
+    )
+
+    data, downloaded = await any_backend.download("2026/10/a.json")
+    listed = [blob async for blob in any_backend.list_blobs("2026/")]
+
+    assert data == b'{"id":"a"}'
+    assert downloaded.etag == info.etag
+    assert downloaded.metadata == {"customer_email": "a@example.com"}
+    assert [(blob.name, blob.metadata) for blob in listed] == [
+        ("2026/10/a.json", {"customer_email": "a@example.com"})
+    ]
+
+
+async def test_if_match_rejects_stale_etag(any_backend):
+    first = await any_backend.upload("counters/power/2026-10-20.json", b"1")
+    second = await any_backend.upload(
+        "counters/power/2026-10-20.json", b"2", etag=first.etag
+    )
+
+    assert second.etag != first.etag
+    with pytest.raises(ResourceModifiedError):
+        await any_backend.upload(
+            "counters/power/2026-10-20.json", b"3", etag=first.etag
+        )
+    data, _ = await any_backend.download("counters/power/2026-10-20.json")
+    assert data == b"2"
+
+
+async def test_create_only_rejects_existing_blob(any_backend):
+    await any_backend.upload("idempotency/k.json", b"first", overwrite=False)
+
+    with pytest.raises(ResourceExistsError):
+        await any_backend.upload("idempotency/k.json", b"second", overwrite=False)
+    data, _ = await any_backend.download("idempotency/k.json")
+    assert data == b"first"
+
+
+async def test_append_creates_then_appends(any_backend):
+    await any_backend.append("index/dates/2026-10-20.ndjson", b"a\n")
+    await any_backend.append("index/dates/2026-10-20.ndjson", b"b\n")
+
+    data, _ = await any_backend.download("index/dates/2026-10-20.ndjson")
+    assert data == b"a\nb\n"
+
+
+async def test_list_is_sorted_and_delete_is_idempotent(any_backend):
+    for name in ("2026/11/b.json", "2026/10/a.json", "index/x.json"):
+        await any_backend.upload(name, b"{}")
+
+    await any_backend.delete("2026/11/b.json")
+    await any_backend.delete("2026/11/b.json")
+
+    assert [blob.name async for blob in any_backend.list_blobs()] == [
+        "2026/10/a.json",
+        "index/x.json",
+    ]
@@ -0,0 +1,62 @@
+"""一括予約の枠確保・保存に失敗した場合の予約枠の解放"""
+
+from conftest import (
+    MONDAY,
+    TUESDAY,
+    lesson_date,
+    reservation_data,
+    reservation_prefix,
+)
+
+
+async def test_counter_failure_releases_other_sessions(backend, storage, manager):
+    power_date, hatha_date = lesson_date(TUESDAY), lesson_date(MONDAY)
+    backend.fail("counters/hatha/")
+
+    result = await manager.create_reservations(
+        [
+            reservation_data(power_date),
+            reservation_data(power_date, email="suzuki@example.com"),
+            reservation_data(hatha_date, class_name="ハタヨガ"),
+        ]
+    )
+
+    assert result == {"success": False, "error": "予約の作成に失敗しました"}
+    assert await storage.get_booked_count("power", power_date) == 0
+    assert backend.names(reservation_prefix()) == []
+
+
+async def test_save_failure_releases_only_unsaved_slots(backend, storage, manager):
+    booking_date = lesson_date(TUESDAY)
+    backend.fail(reservation_prefix(), times=1)
+
+    result = await manager.create_reservations(
+        [reservation_data(booking_date, email=f"user{i}@example.com") for i in range(3)]
+    )
+
+    assert result["created"] == 2
+    assert result["failed"] == 1
+    assert await storage.get_booked_count("power", booking_date) == 2
+    assert len(await storage.get_index_entries(booking_date)) == 2
+
+
+async def test_items_with_wrong_types_are_rejected_individually(storage, manager):
+    booking_date = lesson_date(TUESDAY)
+
+    result = await manager.create_reservations(
+        [
+            {**reservation_data(booking_date), "customer_email": 123},
+            {**reservation_data(booking_date), "customer_phone": 9012345678},
+            {**reservation_data(booking_date), "class_name": ["x"]},
+            reservation_data(booking_date),
+        ]
+    )
+
+    assert [item["success"] for item in result["results"]] == [
+        False,
+        False,
+        False,
+        True,
+    ]
+    assert result["results"][0]["error"] == "文字列で指定してください: customer_email"
+    assert await storage.get_booked_count("power", booking_date) == 1
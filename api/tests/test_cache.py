@@ -0,0 +1,81 @@
+"""予約データ・メール検索結果の読み取りキャッシュと、書き込み時の無効化"""
+
+import time
+
+import storage_manager
+from storage_manager import TTLCache
+
+from conftest import TUESDAY, lesson_date, reservation_data
+
+
+async def search_ids(manager, email="tanaka@example.com"):
+    result = await manager.get_reservations_by_email(email)
+    return sorted(r["id"] for r in result["reservations"])
+
+
+async def test_repeated_search_is_served_from_cache(backend, storage, manager):
+    created = await manager.create_reservation(reservation_data(lesson_date(TUESDAY)))
+    await search_ids(manager)
+    downloads = []
+    original = backend.download
+
+    async def spy(blob_name):
+        downloads.append(blob_name)
+        return await original(blob_name)
+
+    backend.download = spy
+    found = await search_ids(manager)
+
+    assert found == [created["reservation_id"]]
+    assert downloads == []
+    assert storage.cache_stats()["searches"]["hits"] >= 1
+
+
+async def test_save_invalidates_cached_search(manager):
+    first = await manager.create_reservation(reservation_data(lesson_date(TUESDAY)))
+    assert await search_ids(manager) == [first["reservation_id"]]
+
+    second = await manager.create_reservation(
+        reservation_data(lesson_date(TUESDAY, weeks=1))
+    )
+
+    assert await search_ids(manager) == sorted(
+        [first["reservation_id"], second["reservation_id"]]
+    )
+
+
+async def test_cancel_updates_cached_reservation_and_search(storage, manager):
+    created = await manager.create_reservation(reservation_data(lesson_date(TUESDAY)))
+    reservation_id = created["reservation_id"]
+    assert (await storage.get_reservation(reservation_id))["status"] == "confirmed"
+    await search_ids(manager)
+
+    await manager.cancel_reservation(reservation_id, "tanaka@example.com")
+
+    assert (await storage.get_reservation(reservation_id))["status"] == "cancelled"
+    found = await manager.get_reservations_by_email("tanaka@example.com")
+    assert [r["status"] for r in found["reservations"]] == ["cancelled"]
+
+
+def test_cache_evicts_least_recently_used_and_copies_values():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", {"status": "confirmed"})
+    cache.set("b", {"status": "confirmed"})
+    cache.get("a")["status"] = "cancelled"
+
+    cache.set("c", {"status": "confirmed"})
+
+    assert cache.get("a") == {"status": "confirmed"}
+    assert cache.get("b") is None
+    assert cache.get_stats() == {"hits": 2, "misses": 1, "evictions": 1, "size": 2}
+
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    cache = TTLCache(max_entries=2, ttl_seconds=30)
+    cache.set("a", {"id": "a"})
+    now = time.monotonic()
+
+    monkeypatch.setattr(storage_manager.time, "monotonic", lambda: now + 31)
+
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
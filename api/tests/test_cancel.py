@@ -0,0 +1,71 @@
+"""取得済みの予約をETag条件で1回だけ書き込むキャンセルと、予約枠の解放"""
+
+import asyncio
+
+from conftest import TUESDAY, lesson_date, reservation_data, reservation_prefix
+
+
+async def test_cancel_is_one_get_and_one_put(backend, storage, manager):
+    booking_date = lesson_date(TUESDAY)
+    created = await manager.create_reservation(reservation_data(booking_date))
+    blob_name = f"{reservation_prefix()}{created['reservation_id']}.json"
+    calls = []
+    for method in ("download", "upload"):
+        original = getattr(backend, method)
+
+        async def spy(name, *args, _method=method, _original=original, **kwargs):
+            calls.append((_method, name))
+            return await _original(name, *args, **kwargs)
+
+        setattr(backend, method, spy)
+
+    result = await manager.cancel_reservation(
+        created["reservation_id"], "tanaka@example.com"
+    )
+
+    assert result["success"]
+    assert [method for method, name in calls if name == blob_name] == [
+        "download",
+        "upload",
+    ]
+    assert await storage.get_booked_count("power", booking_date) == 0
+
+
+async def test_second_cancel_does_not_release_again(storage, manager):
+    booking_date = lesson_date(TUESDAY)
+    await manager.create_reservation(
+        reservation_data(booking_date, email="suzuki@example.com")
+    )
+    created = await manager.create_reservation(reservation_data(booking_date))
+
+    first = await manager.cancel_reservation(
+        created["reservation_id"], "tanaka@example.com"
+    )
+    second = await manager.cancel_reservation(
+        created["reservation_id"], "tanaka@example.com"
+    )
+
+    assert first["success"]
+    assert second["error"] == "この予約は既にキャンセルされています"
+    assert await storage.get_booked_count("power", booking_date) == 1
+
+
+async def test_concurrent_cancels_release_the_slot_once(backend, storage, manager):
+    booking_date = lesson_date(TUESDAY)
+    await manager.create_reservation(
+        reservation_data(booking_date, email="suzuki@example.com")
+    )
+    created = await manager.create_reservation(reservation_data(booking_date))
+    # 両方のリクエストが書き込み前に同じ版を読み取るようにする
+    backend.latency = 0.01
+
+    results = await asyncio.gather(
+        *(
+            manager.cancel_reservation(created["reservation_id"], "tanaka@example.com")
+            for _ in range(2)
+        )
+    )
+
+    assert sorted(result["success"] for result in results) == [False, True]
+    assert await storage.get_booked_count("power", booking_date) == 1
+    assert storage.concurrency_stats["conflicts"] >= 1
@@ -0,0 +1,62 @@
+"""予約枠カウンター（ETag条件付き更新）の同時予約"""
+
+import asyncio
+
+from azure.core.exceptions import ResourceModifiedError
+
+from conftest import TUESDAY, lesson_date, reservation_data
+
+
+async def test_concurrent_bookings_never_exceed_capacity(backend, storage, manager):
+    backend.latency = 0.002
+    storage.CONDITIONAL_MAX_ATTEMPTS = 100
+    booking_date = lesson_date(TUESDAY)
+
+    results = await asyncio.gather(
+        *(
+            manager.create_reservation(
+                reservation_data(booking_date, email=f"user{i}@example.com")
+            )
+            for i in range(14)
+        )
+    )
+
+    created = [result for result in results if result["success"]]
+    assert len(created) == 10
+    assert {result["error"] for result in results if not result["success"]} == {
+        "このクラスは満席です"
+    }
+    assert storage.concurrency_stats["conflicts"] > 0
+    assert await storage.get_booked_count("power", booking_date) == 10
+    assert len(await storage.get_index_entries(booking_date)) == 10
+
+
+async def test_exhausted_conflicts_are_retryable(backend, storage, manager):
+    backend.fail("counters/", error=ResourceModifiedError)
+    booking_date = lesson_date(TUESDAY)
+
+    result = await manager.create_reservation(reservation_data(booking_date))
+
+    assert not result["success"]
+    assert result["retryable"]
+    assert storage.concurrency_stats["exhausted"] == 1
+    assert await storage.get_index_entries(booking_date) == []
+
+
+async def test_booking_date_must_be_zero_padded(manager, storage):
+    # 日がゼロ埋めされるレッスン日（2026-11-03 → 2026-11-3）
+    booking_date = next(
+        booking_date
+        for booking_date in (lesson_date(TUESDAY, weeks) for weeks in range(6))
+        if booking_date[8] == "0"
+    )
+
+    result = await manager.create_reservation(
+        reservation_data(booking_date[:8] + booking_date[9])
+    )
+
+    assert result == {
+        "success": False,
+        "error": "日付形式が正しくありません（YYYY-MM-DD）",
+    }
+    assert await storage.get_booked_count("power", booking_date) == 0
@@ -0,0 +1,78 @@
+"""スケジュール・空き状況レスポンスのETagと If-None-Match による304"""
+
+import pytest
+
+from conftest import TUESDAY, call, lesson_date, reservation_data
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    [
+        "{etag}",
+        '"other", {etag}',
+        '"other",{etag} , "another"',
+        "W/{etag}",
+        "*",
+    ],
+)
+async def test_matching_if_none_match_is_304(app, if_none_match):
+    first = await call(app.get_class_schedules)
+    etag = first.headers["ETag"]
+
+    cached = await call(
+        app.get_class_schedules,
+        headers={"If-None-Match": if_none_match.format(etag=etag)},
+    )
+
+    assert first.status_code == 200
+    assert cached.status_code == 304
+    assert cached.get_body() == b""
+    assert cached.headers["ETag"] == etag
+    assert "max-age=" in cached.headers["Cache-Control"]
+
+
+@pytest.mark.parametrize("if_none_match", ['"other"', 'W/"other"', ""])
+async def test_other_if_none_match_gets_body(app, if_none_match):
+    response = await call(
+        app.get_class_schedules, headers={"If-None-Match": if_none_match}
+    )
+
+    assert response.status_code == 200
+    assert response.get_body()
+
+
+async def test_availability_etag_changes_after_booking(app, manager):
+    params = {"date": lesson_date(TUESDAY)}
+    route_params = {"class_type": "power"}
+    before = await call(
+        app.check_availability, params=params, route_params=route_params
+    )
+    again = await call(
+        app.check_availability,
+        params=params,
+        route_params=route_params,
+        headers={"If-None-Match": before.headers["ETag"]},
+    )
+
+    await manager.create_reservation(reservation_data(params["date"]))
+    after = await call(
+        app.check_availability,
+        params=params,
+        route_params=route_params,
+        headers={"If-None-Match": before.headers["ETag"]},
+    )
+
+    assert again.status_code == 304
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+
+
+async def test_error_responses_have_no_etag(app):
+    response = await call(
+        app.check_availability,
+        params={"date": "2026-13-01"},
+        route_params={"class_type": "power"},
+    )
+
+    assert response.status_code == 400
+    assert "ETag" not in response.headers
@@ -0,0 +1,73 @@
+"""予約エクスポートのCSVインジェクション対策と期間の上限"""
+
+import csv
+import io
+from datetime import date, timedelta
+
+import pytest
+
+import serializer
+
+from conftest import TUESDAY, call, lesson_date, reservation_data
+
+
+async def export(app, **params):
+    return await call(app.export_reservations, params=params)
+
+
+async def test_csv_cells_starting_with_formula_characters_are_escaped(app, manager):
+    booking_date = lesson_date(TUESDAY)
+    await manager.create_reservation(
+        {
+            **reservation_data(booking_date),
+            "customer_name": "@田中",
+            "booking_notes": '=HYPERLINK("http://example.com")',
+        }
+    )
+
+    csv_response = await export(app, start=booking_date, end=booking_date)
+    ndjson_response = await export(
+        app, start=booking_date, end=booking_date, format="ndjson"
+    )
+
+    assert csv_response.status_code == 200
+    assert csv_response.headers["Content-Type"] == "text/csv; charset=utf-8"
+    (row,) = csv.DictReader(io.StringIO(csv_response.get_body().decode("utf-8-sig")))
+    assert row["customer_name"] == "'@田中"
+    assert row["booking_notes"] == """'=HYPERLINK("http://example.com")"""
+    assert row["booking_date"] == booking_date
+    # NDJSON は値をそのまま出力する
+    (line,) = ndjson_response.get_body().splitlines()
+    assert serializer.loads(line)["customer_name"] == "@田中"
+
+
+async def test_export_range_is_capped(app):
+    start = date(2026, 1, 1)
+
+    def params(days):
+        end = start + timedelta(days=days - 1)
+        return {"start": start.isoformat(), "end": end.isoformat()}
+
+    allowed = await export(app, **params(app.MAX_HTTP_EXPORT_DAYS))
+    too_long = await export(app, **params(app.MAX_HTTP_EXPORT_DAYS + 1))
+
+    assert allowed.status_code == 200
+    assert too_long.status_code == 400
+    assert serializer.loads(too_long.get_body())["error"] == (
+        f"期間は{app.MAX_HTTP_EXPORT_DAYS}日以内で指定してください"
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"month": "2026-13"},
+        {"start": "2026-10-31", "end": "2026-10-01"},
+        {"month": "2026-10", "format": "xlsx"},
+        {"month": "2026-10", "class_type": "unknown"},
+    ],
+)
+async def test_invalid_export_parameters_are_400(app, params):
+    response = await export(app, **params)
+
+    assert response.status_code == 400
@@ -0,0 +1,59 @@
+"""冪等キー付きの予約作成の再送"""
+
+from conftest import TUESDAY, lesson_date, reservation_data, reservation_prefix
+
+
+async def test_retry_replays_first_result(backend, storage, manager):
+    booking_date = lesson_date(TUESDAY)
+
+    first = await manager.create_reservation(reservation_data(booking_date), "key-1")
+    retry = await manager.create_reservation(reservation_data(booking_date), "key-1")
+
+    assert first["success"]
+    assert retry["replayed"]
+    assert retry["reservation_id"] == first["reservation_id"]
+    assert len(backend.names(reservation_prefix())) == 1
+    assert await storage.get_booked_count("power", booking_date) == 1
+
+
+async def test_key_reused_with_other_content_is_rejected(manager):
+    booking_date = lesson_date(TUESDAY)
+    await manager.create_reservation(reservation_data(booking_date), "key-1")
+
+    result = await manager.create_reservation(
+        reservation_data(booking_date, email="suzuki@example.com"), "key-1"
+    )
+
+    assert result["idempotency_error"] == "mismatch"
+
+
+async def test_lost_response_is_resolved_without_double_booking(
+    backend, storage, manager
+):
+    booking_date = lesson_date(TUESDAY)
+    manager.IDEMPOTENCY_PENDING_SECONDS = 0
+    # 予約Blobは書き込まれたが応答が返らなかった
+    backend.fail(reservation_prefix(), times=1, after_write=True)
+
+    first = await manager.create_reservation(reservation_data(booking_date), "key-1")
+    record, _ = await storage.get_idempotency_record("key-1")
+    retry = await manager.create_reservation(reservation_data(booking_date), "key-1")
+
+    assert not first["success"]
+    assert record["status"] == "pending"
+    assert retry["success"]
+    assert retry["reservation_id"] == record["reservation_id"]
+    assert backend.names(reservation_prefix()) == [
+        f"{reservation_prefix()}{record['reservation_id']}.json"
+    ]
+    assert await storage.get_booked_count("power", booking_date) == 1
+
+
+async def test_full_session_releases_the_key(storage, manager):
+    booking_date = lesson_date(TUESDAY)
+    await storage.reserve_slots("power", booking_date, 10, count=10)
+
+    result = await manager.create_reservation(reservation_data(booking_date), "key-1")
+
+    assert result["error"] == "このクラスは満席です"
+    assert await storage.get_idempotency_record("key-1") is None
@@ -0,0 +1,108 @@
+"""クライアントごとのトークンバケットと同時実行数の上限"""
+
+from azure.core.exceptions import ResourceModifiedError
+
+import rate_limiter
+import serializer
+
+from conftest import TUESDAY, call, lesson_date, reservation_data
+
+
+def test_bucket_allows_burst_then_limits():
+    limiter = rate_limiter.TokenBucketLimiter(rate=1, burst=3)
+
+    waits = [limiter.acquire("203.0.113.1") for _ in range(4)]
+
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert 0 < waits[3] <= 1
+    assert limiter.acquire("203.0.113.2") == 0.0
+
+
+def test_zero_rate_means_no_refill():
+    limiter = rate_limiter.TokenBucketLimiter(rate=0, burst=1)
+
+    assert limiter.acquire("203.0.113.1") == 0.0
+    assert limiter.acquire("203.0.113.1") == limiter.NO_REFILL_WAIT
+
+
+def batch(*emails):
+    booking_date = lesson_date(TUESDAY)
+    return {
+        "reservations": [
+            reservation_data(booking_date, email=email) for email in emails
+        ]
+    }
+
+
+async def test_batch_is_charged_per_reservation(app, monkeypatch):
+    monkeypatch.setattr(
+        app, "ip_limiter", rate_limiter.TokenBucketLimiter(rate=0.01, burst=8)
+    )
+    emails = [f"user{i}@example.com" for i in range(8)]
+
+    first = await call(app.create_reservations, "POST", batch(*emails[:5]))
+    second = await call(app.create_reservations, "POST", batch(*emails[5:]))
+
+    assert first.status_code == 201
+    assert second.status_code == 201
+    limited = await call(app.create_reservations, "POST", batch("user8@example.com"))
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+
+async def test_batch_is_charged_per_email(app):
+    # 同じメールアドレスの予約は、まとめて送っても1件ずつ数える（バケットは5）
+    first = await call(
+        app.create_reservations, "POST", batch(*["tanaka@example.com"] * 3)
+    )
+    second = await call(
+        app.create_reservations, "POST", batch(*["Tanaka@example.com"] * 3)
+    )
+    other = await call(
+        app.create_reservations, "POST", batch(*["suzuki@example.com"] * 3)
+    )
+
+    assert first.status_code == 201
+    assert second.status_code == 429
+    assert other.status_code == 201
+
+
+async def test_health_and_warmup_are_rate_limited(app, monkeypatch):
+    monkeypatch.setattr(
+        app, "ip_limiter", rate_limiter.TokenBucketLimiter(rate=0.01, burst=2)
+    )
+
+    health = await call(app.health_check)
+    warmup = await call(app.warm_up)
+    limited = [await call(app.health_check), await call(app.warm_up)]
+
+    assert health.status_code == 200
+    assert warmup.status_code == 200
+    assert [response.status_code for response in limited] == [429, 429]
+    assert all("Retry-After" in response.headers for response in limited)
+
+
+async def test_overloaded_instance_sheds_with_503(app):
+    app.concurrency_limiter.max_in_flight = 1
+    app.concurrency_limiter.in_flight = 1
+
+    shed = await call(app.get_calendar)
+    app.concurrency_limiter.release()
+    served = await call(app.get_calendar)
+
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    assert served.status_code == 200
+    assert app.concurrency_limiter.in_flight == 0
+
+
+async def test_unresolved_counter_conflict_is_503(app, backend):
+    backend.fail("counters/", error=ResourceModifiedError)
+
+    response = await call(
+        app.create_reservation, "POST", reservation_data(lesson_date(TUESDAY))
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert serializer.loads(response.get_body())["retryable"] is True
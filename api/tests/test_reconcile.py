@@ -0,0 +1,66 @@
+"""予約Blobからのインデックス・予約枠カウンター・カレンダーの再構築"""
+
+from conftest import TUESDAY, lesson_date, reservation_data
+
+
+async def test_rebuilds_lost_indexes_and_drifted_counter(backend, storage, manager):
+    booking_date = lesson_date(TUESDAY)
+    storage.RECONCILE_SETTLE_SECONDS = 0
+    kept = await manager.create_reservation(reservation_data(booking_date))
+    cancelled = await manager.create_reservation(
+        reservation_data(booking_date, email="suzuki@example.com")
+    )
+    await manager.cancel_reservation(cancelled["reservation_id"], "suzuki@example.com")
+
+    # インデックスを失い、カウンターがずれた状態にする
+    for blob_name in backend.names("index/"):
+        await backend.delete(blob_name)
+
+    def drift(counter):
+        return {**counter, "booked": 7, "updated_at": "2000-01-01T00:00:00+00:00"}
+
+    await storage._conditional_update(
+        storage._get_counter_blob_name("power", booking_date), drift
+    )
+
+    result = await manager.reconcile(full=True)
+
+    assert result["success"]
+    assert result["blobs"] == 2
+    statuses = {
+        entry["id"]: entry["status"]
+        for entry in await storage.get_index_entries(booking_date)
+    }
+    assert statuses == {
+        kept["reservation_id"]: "confirmed",
+        cancelled["reservation_id"]: "cancelled",
+    }
+    found = await manager.get_reservations_by_email("tanaka@example.com")
+    assert [r["id"] for r in found["reservations"]] == [kept["reservation_id"]]
+    assert await storage.get_booked_count("power", booking_date) == 1
+    assert (await storage.get_calendar())[f"power/{booking_date}"]["booked"] == 1
+
+
+async def test_cancelled_series_lessons_stay_released(storage, manager):
+    first, second = lesson_date(TUESDAY), lesson_date(TUESDAY, weeks=1)
+    storage.RECONCILE_SETTLE_SECONDS = 0
+    series = await manager.create_series(
+        {
+            **reservation_data(first),
+            "start_date": first,
+            "end_date": second,
+            "weekdays": [TUESDAY],
+        }
+    )
+
+    cancelled = await manager.cancel_reservation(
+        series["series_id"], "tanaka@example.com"
+    )
+    result = await manager.reconcile(full=True)
+
+    assert cancelled["cancelled_dates"] == [first, second]
+    assert result["success"]
+    for booking_date in (first, second):
+        assert await storage.get_booked_count("power", booking_date) == 0
+        entries = await storage.get_index_entries(booking_date)
+        assert [entry["status"] for entry in entries] == ["cancelled"]
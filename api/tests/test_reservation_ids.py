@@ -0,0 +1,78 @@
+"""作成年月を埋め込んだ予約IDからのBlobの位置の決定と、旧形式IDの探索"""
+
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+
+import serializer
+
+from conftest import TUESDAY, lesson_date, reservation_data
+
+
+@pytest.fixture
+def calls(backend, monkeypatch):
+    """バックエンドへの exists / download の呼び出し"""
+    recorded = []
+    for method in ("exists", "download"):
+        original = getattr(backend, method)
+
+        async def spy(blob_name, _method=method, _original=original):
+            recorded.append((_method, blob_name))
+            return await _original(blob_name)
+
+        monkeypatch.setattr(backend, method, spy)
+    return recorded
+
+
+def months_ago(months: int) -> str:
+    now = datetime.now(timezone.utc)
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    return f"{year:04d}/{month + 1:02d}/"
+
+
+async def test_new_id_is_read_with_one_get(storage, manager, calls):
+    created = await manager.create_reservation(reservation_data(lesson_date(TUESDAY)))
+    storage._reservation_cache.invalidate(created["reservation_id"])
+    calls.clear()
+
+    found = await storage.get_reservation(created["reservation_id"])
+
+    assert found["id"] == created["reservation_id"]
+    assert [method for method, _ in calls] == ["download"]
+
+
+async def test_legacy_id_is_probed_in_recent_months(backend, storage, calls):
+    legacy_id = str(uuid4())
+    blob_name = f"{months_ago(2)}{legacy_id}.json"
+    await backend.upload(blob_name, serializer.dumps({"id": legacy_id}))
+
+    found = await storage.get_reservation(legacy_id)
+
+    assert found["id"] == legacy_id
+    probes = [name for method, name in calls if method == "exists"]
+    assert len(probes) == storage.LEGACY_ID_PROBE_MONTHS
+    assert blob_name in probes
+
+
+async def test_legacy_id_outside_probe_window_is_not_found(backend, storage):
+    legacy_id = str(uuid4())
+    await backend.upload(
+        f"{months_ago(storage.LEGACY_ID_PROBE_MONTHS)}{legacy_id}.json",
+        serializer.dumps({"id": legacy_id}),
+    )
+
+    assert await storage.get_reservation(legacy_id) is None
+
+
+@pytest.mark.parametrize(
+    "reservation_id",
+    ["", "not-an-id", "../index/calendar", f"2026/10/{uuid4()}", f"{uuid4()}.json"],
+)
+async def test_malformed_id_is_rejected_without_storage_access(
+    manager, calls, reservation_id
+):
+    result = await manager.get_reservation_by_id(reservation_id)
+
+    assert not result["success"]
+    assert calls == []
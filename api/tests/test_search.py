@@ -0,0 +1,83 @@
+"""メールアドレス検索の作成日時の新しい順のページ分割"""
+
+import pytest
+
+import serializer
+from reservation_manager import ReservationManager
+from storage_manager import StorageManager
+
+from conftest import TUESDAY, call, lesson_date, reservation_data
+
+
+async def create_history(manager, count):
+    created = []
+    for weeks in range(count):
+        result = await manager.create_reservation(
+            reservation_data(lesson_date(TUESDAY, weeks=weeks))
+        )
+        created.append(result["reservation_id"])
+    return created
+
+
+async def search(app, **params):
+    response = await call(
+        app.search_reservations, params={"email": "tanaka@example.com", **params}
+    )
+    return response.status_code, serializer.loads(response.get_body())
+
+
+async def test_pages_follow_cursor_newest_first(app, manager):
+    created = await create_history(manager, 5)
+
+    pages, cursor = [], None
+    while True:
+        status, body = await search(
+            app, limit="2", **({"cursor": cursor} if cursor else {})
+        )
+        assert status == 200
+        pages.append([r["id"] for r in body["reservations"]])
+        cursor = body.get("next_cursor")
+        if not cursor:
+            break
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [rid for page in pages for rid in page] == created[::-1]
+
+
+async def test_only_one_page_of_blobs_is_downloaded(backend, manager):
+    await create_history(manager, 5)
+    # 書き込み時のキャッシュを持たない別のインスタンスで検索する
+    reader = ReservationManager(StorageManager(backend=backend, write_behind=False))
+    downloads = []
+    original = backend.download
+
+    async def spy(blob_name):
+        downloads.append(blob_name)
+        return await original(blob_name)
+
+    backend.download = spy
+
+    result = await reader.get_reservations_by_email("tanaka@example.com", limit=2)
+
+    assert len(result["reservations"]) == 2
+    assert len([name for name in downloads if not name.startswith("index/")]) == 2
+
+
+@pytest.mark.parametrize(
+    "params, error",
+    [
+        ({"cursor": "not-a-cursor"}, "継続トークンが正しくありません"),
+        ({"cursor": "WzEsMl0"}, "継続トークンが正しくありません"),
+        ({"limit": "abc"}, "limitは整数で指定してください"),
+        ({"limit": "0"}, None),
+    ],
+)
+async def test_invalid_page_parameters_are_400(app, manager, params, error):
+    await create_history(manager, 1)
+
+    status, body = await search(app, **params)
+
+    assert status == 400
+    assert not body["success"]
+    if error:
+        assert body["error"] == error
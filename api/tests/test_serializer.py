@@ -0,0 +1,76 @@
+"""コンパクトなJSONでの保存と、以前のインデント付き・gzip圧縮Blobの読み込み"""
+
+import gzip
+import json
+from uuid import uuid4
+
+import pytest
+
+import serializer
+
+from conftest import TUESDAY, lesson_date, reservation_data, reservation_prefix
+
+SERIALIZERS = ["json"] + (["orjson"] if serializer.orjson is not None else [])
+
+
+@pytest.mark.parametrize("name", SERIALIZERS)
+def test_round_trip_is_compact(name):
+    codec = serializer.get_serializer(name)
+    data = {"customer_name": "田中 花子", "booked": 3, "tags": ["a", None]}
+
+    encoded = codec.dumps(data)
+
+    assert (
+        encoded
+        == '{"customer_name":"田中 花子","booked":3,"tags":["a",null]}'.encode("utf-8")
+    )
+    assert codec.loads(encoded) == data
+
+
+def test_loads_legacy_pretty_printed_and_gzip():
+    data = {"id": "a", "customer_name": "田中 花子"}
+    pretty = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+    assert serializer.loads(pretty) == data
+    assert serializer.loads(gzip.compress(pretty)) == data
+
+
+def test_dumps_blob_compresses_only_above_threshold(monkeypatch):
+    monkeypatch.setenv("BLOB_GZIP_THRESHOLD_BYTES", "64")
+    small, large = {"n": 1}, {"entries": ["x" * 16] * 8}
+
+    assert serializer.dumps_blob(small, compress=True) == serializer.dumps(small)
+    assert serializer.dumps_blob(large, compress=True)[:2] == serializer.GZIP_MAGIC
+    assert serializer.dumps_blob(large)[:2] != serializer.GZIP_MAGIC
+
+
+async def test_reads_legacy_pretty_printed_reservation(backend, storage):
+    legacy_id = str(uuid4())
+    data = {**reservation_data(lesson_date(TUESDAY)), "id": legacy_id}
+    await backend.upload(
+        f"{reservation_prefix()}{legacy_id}.json",
+        json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"),
+    )
+
+    assert await storage.get_reservation(legacy_id) == data
+
+
+async def test_large_email_index_is_gzipped_and_searchable(
+    monkeypatch, backend, manager
+):
+    monkeypatch.setenv("BLOB_GZIP_THRESHOLD_BYTES", "256")
+    created = [
+        await manager.create_reservation(
+            reservation_data(lesson_date(TUESDAY, weeks=weeks))
+        )
+        for weeks in range(3)
+    ]
+
+    (index_blob,) = backend.names("index/email/")
+    raw, _ = await backend.download(index_blob)
+    found = await manager.get_reservations_by_email("tanaka@example.com")
+
+    assert raw[:2] == serializer.GZIP_MAGIC
+    assert sorted(r["id"] for r in found["reservations"]) == sorted(
+        r["reservation_id"] for r in created
+    )
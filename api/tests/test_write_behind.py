@@ -0,0 +1,72 @@
+"""write-behind で溜めた更新の書き込み失敗・インスタンス停止からの回復"""
+
+import asyncio
+
+from reservation_manager import ReservationManager
+from storage_manager import StorageManager
+
+from conftest import TUESDAY, lesson_date, reservation_data
+
+
+def write_behind_storage(backend) -> StorageManager:
+    # 定期的な書き込みはテストから明示的に行う
+    storage = StorageManager(backend=backend, write_behind=True)
+    storage.index_flush_interval = 3600
+    return storage
+
+
+async def test_stopped_instance_is_reconciled_from_blobs(backend):
+    booking_date = lesson_date(TUESDAY)
+    stopped = ReservationManager(write_behind_storage(backend))
+    result = await stopped.create_reservation(reservation_data(booking_date))
+    assert result["success"]
+
+    # バッファを書き込む前に停止したインスタンスの分を別のインスタンスが再構築
+    storage = StorageManager(backend=backend, write_behind=False)
+    storage.WRITE_BEHIND_STALE_SECONDS = 0
+    assert await storage.get_index_entries(booking_date) == []
+
+    reconciled = await storage.reconcile_index_updates()
+
+    assert reconciled == {"instances": 1, "reservations": 1}
+    entries = await storage.get_index_entries(booking_date)
+    assert [entry["id"] for entry in entries] == [result["reservation_id"]]
+    found = await ReservationManager(storage).get_reservations_by_email(
+        "tanaka@example.com"
+    )
+    assert [r["id"] for r in found["reservations"]] == [result["reservation_id"]]
+    assert (await storage.get_calendar())[f"power/{booking_date}"]["booked"] == 1
+    assert backend.names(storage.WRITE_BEHIND_STATE_PREFIX) == []
+
+
+async def test_failed_flush_is_requeued(backend):
+    booking_date = lesson_date(TUESDAY)
+    storage = write_behind_storage(backend)
+    manager = ReservationManager(storage)
+    backend.fail("index/dates/", times=1)
+    backend.fail("index/calendar.json", times=1)
+
+    await manager.create_reservation(reservation_data(booking_date))
+    await storage.flush_index_updates()
+
+    assert storage.write_behind_stats["requeued"] >= 2
+    assert backend.names(storage.WRITE_BEHIND_STATE_PREFIX) != []
+
+    await storage.flush_index_updates()
+
+    assert len(await storage.get_index_entries(booking_date)) == 1
+    calendar = await storage._download_json(storage._get_calendar_blob_name())
+    assert calendar["sessions"][f"power/{booking_date}"]["booked"] == 1
+    assert backend.names(storage.WRITE_BEHIND_STATE_PREFIX) == []
+
+
+async def test_failed_calendar_write_is_retried_in_background(backend, storage):
+    booking_date = lesson_date(TUESDAY)
+    storage.index_flush_interval = 0.01
+    backend.fail("index/calendar.json", times=1)
+
+    await storage.reserve_slots("power", booking_date, 10)
+    await asyncio.sleep(0.1)
+
+    calendar = await storage._download_json(storage._get_calendar_blob_name())
+    assert calendar["sessions"][f"power/{booking_date}"]["booked"] == 1